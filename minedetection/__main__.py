@@ -0,0 +1,119 @@
+import argparse
+import importlib
+import os
+import sys
+
+# The modules import each other by their bare names, as when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+# Commands run by the main function of a module, imported only when chosen so headless runs never load Qt
+MODULE_COMMANDS = {
+    "gui": ("renderer", "play a scenario in a window"),
+    "simulate": ("simulation", "play headless Monte Carlo episodes of scenarios"),
+    "replay": ("replay", "replay action traces and rescore them under changed mission times"),
+    "generate": ("generator", "generate random scenarios"),
+    "pack": ("scenario", "pack scenario JSON files into a memory mapped scenario pack"),
+    "convert": ("generate_config", "convert scenario workbooks to scenario JSON files"),
+    "bench": ("benchmark", "time the mission core and renderer, and compare against a baseline"),
+}
+
+
+def plan(argv: list[str]):
+    """
+    Prints the route with the least expected cost across a scenario from what its estimates say
+    """
+
+    from fusion import FusionModel
+    from mission import Mission
+    from scenario import config_path
+
+    parser = argparse.ArgumentParser(prog="python -m minedetection plan", description="Plan the UGV route across a scenario")
+    parser.add_argument("scenario", help="a scenario JSON file, within the config directory if a bare name")
+    parser.add_argument("--destination", help="the label of the hex to plan to, the end node if not given")
+    parser.add_argument("--calibrate", action="store_true", help="fit the fusion model to the scenario's mines first")
+    args = parser.parse_args(argv)
+
+    mission = Mission(args.scenario, log_to_file=False)
+    if args.calibrate:
+        mission.fusion = FusionModel.fit_files([config_path(args.scenario)])
+    route = mission.plan_route(args.destination)
+    if route is None:
+        sys.exit("%s: no route to %s, check the hex exists and can be reached" % (args.scenario, args.destination or mission.end_node))
+    print("%s: expected cost %.1f over %d moves" % (args.scenario, route.cost, len(route.labels) - 1))
+    print(" ".join(route.labels))
+
+
+def advise(argv: list[str]):
+    """
+    Prints the queries and UAV moves available at the start of a scenario, most valuable first
+    """
+
+    from advisor import QueryAdvisor
+    from mission import Mission
+
+    parser = argparse.ArgumentParser(prog="python -m minedetection advise", description="Rank the queries and UAV moves available at the start of a scenario")
+    parser.add_argument("scenario", help="a scenario JSON file, within the config directory if a bare name")
+    parser.add_argument("--depth", type=int, default=2, help="the number of queries looked ahead")
+    parser.add_argument("--top", type=int, default=10, help="the number of actions printed")
+    args = parser.parse_args(argv)
+
+    mission = Mission(args.scenario, log_to_file=False)
+    for advice in QueryAdvisor(mission, depth=args.depth).rank()[:args.top]:
+        print("%-40s %8.2f" % (" ".join(str(part) for part in advice.action), advice.value))
+
+
+def sweep(argv: list[str]):
+    """
+    Prints sweeps of every UAV scanning the hexes around the planned UGV route across a scenario
+    """
+
+    from mission import Mission
+    from scheduler import CoverageScheduler, corridor
+
+    parser = argparse.ArgumentParser(prog="python -m minedetection sweep", description="Plan UAV sweeps over the hexes around the planned UGV route")
+    parser.add_argument("scenario", help="a scenario JSON file, within the config directory if a bare name")
+    parser.add_argument("--width", type=int, default=1, help="the number of hexes either side of the route to scan")
+    parser.add_argument("--balance", type=float, default=0.0, help="the weight of each UAV's finishing time against the total time")
+    args = parser.parse_args(argv)
+
+    mission = Mission(args.scenario, log_to_file=False)
+    targets = corridor(mission, args.width)
+    plan = CoverageScheduler(mission, balance=args.balance).plan(targets)
+    print("%s: %d hexes, total time %.1f, last UAV done at %.1f" % (args.scenario, len(targets), plan.total, plan.makespan))
+    for uav_sweep in plan.sweeps:
+        if uav_sweep.labels:
+            print("UAV %d (%.1f): %s" % (uav_sweep.uav_number, uav_sweep.time, " ".join(uav_sweep.labels)))
+        else:
+            print("UAV %d: no hexes to scan%s" % (uav_sweep.uav_number, ", a --balance above 0 shares them out" if not args.balance else ""))
+
+
+FUNCTION_COMMANDS = {
+    "plan": (plan, "plan the UGV route across a scenario"),
+    "advise": (advise, "rank the queries and UAV moves available at the start of a scenario"),
+    "sweep": (sweep, "plan UAV sweeps over the hexes around the planned UGV route"),
+}
+
+
+def main(argv: list[str] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    commands = {name: help for name, (_, help) in {**MODULE_COMMANDS, **FUNCTION_COMMANDS}.items()}
+    if not argv or argv[0] not in commands:
+        parser = argparse.ArgumentParser(prog="python -m minedetection", description="Run mine detection scenarios, planners and evaluations",
+                                         formatter_class=argparse.RawDescriptionHelpFormatter,
+                                         epilog="commands:\n" + "\n".join("  %-10s %s" % item for item in commands.items()))
+        parser.add_argument("command", choices=sorted(commands))
+        parser.add_argument("arguments", nargs=argparse.REMAINDER, help="the command's own arguments, see its --help")
+        parser.parse_args(argv)
+    command, arguments = argv[0], argv[1:]
+    if command in FUNCTION_COMMANDS:
+        FUNCTION_COMMANDS[command][0](arguments)
+    else:
+        module = importlib.import_module(MODULE_COMMANDS[command][0])
+        # Names the command in the module's usage messages
+        sys.argv[0] = "python -m minedetection " + command
+        module.main(arguments)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import struct
+from array import array
+
+
+# Action opcodes, held in the low bits of each trace word
+SELECT = 0
+QUERY_AI = 1
+QUERY_HUMAN = 2
+MOVE_UAV = 3
+MOVE_UGV = 4
+OPCODE_NAMES = ("select", "query_ai", "query_human", "move_uav", "move_ugv")
+
+OPCODE_BITS = 3
+# Enough for vehicle numbers up to 64, leaving 22 bits of hex index
+VEHICLE_BITS = 7
+INDEX_SHIFT = OPCODE_BITS + VEHICLE_BITS
+# The index recorded for an action naming a hex that doesn't exist, or naming no hex
+NO_HEX = (1 << (32 - INDEX_SHIFT)) - 1
+
+MAGIC = b'AICT'
+VERSION = 2
+# Version 1 traces had 3 vehicle bits, and are read by moving their indices up
+V1_INDEX_SHIFT = OPCODE_BITS + 3
+V1_NO_HEX = (1 << (32 - V1_INDEX_SHIFT)) - 1
+HEADER = struct.Struct('<4sHH')
+
+
+class Trace():
+    def __init__(self, scenario: str, words: array = None):
+        """
+        Creates the Trace object, a compact record of every action taken on a mission
+
+        Each action is a single 32 bit word: the opcode in the low 3 bits, the UAV or UGV number in
+        the next 7 and the hex index above them, so a trace costs 4 bytes per action in memory and on
+        disk.
+
+        Parameters:
+            scenario (str): The scenario JSON file within the config directory the actions were taken on
+            words (array): The encoded actions, empty if not given
+        """
+        self.__scenario = scenario
+        self.__words = words if words is not None else array('I')
+
+    @property
+    def scenario(self) -> str:
+        """
+        Gets the scenario field
+
+        Returns:
+            str - The scenario JSON file within the config directory
+        """
+        return self.__scenario
+
+    @property
+    def words(self) -> array:
+        """
+        Gets the words field
+
+        Returns:
+            array - The encoded actions
+        """
+        return self.__words
+
+    def __len__(self) -> int:
+        return len(self.__words)
+
+    def append(self, opcode: int, index: int = None, vehicle: int = 0):
+        """
+        Records an action
+
+        Parameters:
+            opcode (int): The action's opcode
+            index (int): The index of the hex acted on, None if there is no such hex
+            vehicle (int): The UAV or UGV number, 0 if the action doesn't name one
+        """
+        if index is None:
+            index = NO_HEX
+        if not 0 <= vehicle < 1 << VEHICLE_BITS:
+            vehicle = 0
+        self.__words.append(index << INDEX_SHIFT | vehicle << OPCODE_BITS | opcode)
+
+    def extend(self, opcode: int, indices, vehicle: int = 0):
+        """
+        Records the same action on each of many hexes in turn, as when a vehicle moves along a path
+
+        Parameters:
+            opcode (int): The actions' opcode
+            indices: The indices of the hexes acted on, in order
+            vehicle (int): The UAV or UGV number, 0 if the actions don't name one
+        """
+        if not 0 <= vehicle < 1 << VEHICLE_BITS:
+            vehicle = 0
+        low = vehicle << OPCODE_BITS | opcode
+        self.__words.extend([int(index) << INDEX_SHIFT | low for index in indices])
+
+    def __iter__(self):
+        """
+        Decodes the actions
+
+        Yields:
+            tuple[int, int, int] - The opcode, hex index or None, and vehicle number of each action
+        """
+        vehicle_mask = (1 << VEHICLE_BITS) - 1
+        for word in self.__words:
+            index = word >> INDEX_SHIFT
+            yield word & 7, index if index != NO_HEX else None, (word >> OPCODE_BITS) & vehicle_mask
+
+    def to_bytes(self) -> bytes:
+        """
+        Encodes the trace as a header, the scenario name and the little endian action words
+
+        Returns:
+            bytes - The encoded trace
+        """
+        scenario = self.__scenario.encode('utf-8')
+        words = array('I', self.__words)
+        if struct.pack('=I', 1) != struct.pack('<I', 1):
+            words.byteswap()
+        return HEADER.pack(MAGIC, VERSION, len(scenario)) + scenario + words.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Trace':
+        """
+        Decodes a trace encoded by to_bytes
+
+        Parameters:
+            data (bytes): The encoded trace
+
+        Returns:
+            Trace - The trace
+        """
+        magic, version, length = HEADER.unpack_from(data)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError("Not a version %d action trace" % VERSION)
+        start = HEADER.size + length
+        words = array('I')
+        words.frombytes(data[start:])
+        if struct.pack('=I', 1) != struct.pack('<I', 1):
+            words.byteswap()
+        if version == 1:
+            words = array('I', [(index if index != V1_NO_HEX else NO_HEX) << INDEX_SHIFT | (word & ((1 << V1_INDEX_SHIFT) - 1))
+                                for word, index in ((word, word >> V1_INDEX_SHIFT) for word in words)])
+        return cls(data[HEADER.size:start].decode('utf-8'), words)
+
+    def save(self, filename: str):
+        """
+        Writes the trace to a file
+
+        Parameters:
+            filename (str): The path of the file
+        """
+        with open(filename, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, filename: str) -> 'Trace':
+        """
+        Reads a trace written by save
+
+        Parameters:
+            filename (str): The path of the file
+
+        Returns:
+            Trace - The trace
+        """
+        with open(filename, 'rb') as file:
+            return cls.from_bytes(file.read())
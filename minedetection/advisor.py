@@ -0,0 +1,343 @@
+import time
+from dataclasses import dataclass
+import numpy as np
+from gridstate import AI_1, AI_2, HUMAN, AI_1_QUERIED, AI_2_QUERIED, HUMAN_QUERIED, UAV_1_SCANNED, UAV_2_SCANNED, MINE_FOUND, MINE_CLEARED
+from planner import a_star, cost_field, expected_costs
+
+
+# The flag marking each confidence column as queried and the UAV scan each AI needs, in column order
+QUERIED = {AI_1: AI_1_QUERIED, AI_2: AI_2_QUERIED, HUMAN: HUMAN_QUERIED}
+SCANNED = {AI_1: UAV_1_SCANNED, AI_2: UAV_2_SCANNED, HUMAN: UAV_1_SCANNED | UAV_2_SCANNED}
+
+
+@dataclass
+class Advice:
+    action: tuple
+    value: float
+
+
+class QueryAdvisor():
+    def __init__(self, mission, depth: int = 2, breadth: int = 4, reach: int = 3, budget: float = 0.05):
+        """
+        Creates the QueryAdvisor object, ranking the queries and UAV moves available in a mission by the
+        expected reduction in total mission cost they bring
+
+        The remaining cost of a mission is the expected cost of the UGV's planned route. A query costs
+        its estimate time, and each of its outcomes moves the probability of a mine in its hex and so
+        possibly the route; its value is the route cost now less the query time and the expected route
+        cost after it. The outcomes and their likelihoods come from the mission's fusion model.
+
+        Looking one query ahead only needs the cost of the best routes through and around each hex,
+        which are computed once per ranking. Deeper lookahead considers following a query with one of
+        the breadth most valuable ones, and since the route cost only depends on which outcomes are
+        known, not the order they were learned in, every route cost and expected value is memoized by
+        that knowledge state. Deeper levels are only searched while the time budget allows.
+
+        A UAV move is valued by the best queries it makes possible within reach moves of the UAV, less
+        the flight time there.
+
+        Params:
+            mission (Mission): The mission to advise on
+            depth (int): The most queries looked ahead, including the one being ranked
+            breadth (int): The number of most valuable queries considered as follow ups when looking ahead
+            reach (int): The largest number of UAV moves to a hex whose queries value a move
+            budget (float): The seconds a ranking may spend looking ahead beyond a single query
+        """
+        self.mission = mission
+        self.depth = depth
+        self.breadth = breadth
+        self.reach = reach
+        self.budget = budget
+
+    def rank(self) -> list[Advice]:
+        """
+        Ranks every available query and UAV move
+
+        Returns:
+            list[Advice] - The actions as simulation action tuples with their expected reduction in
+            total mission cost, most valuable first
+        """
+
+        deadline = time.perf_counter() + self.budget
+        if not self.__prepare():
+            return []
+
+        values = {query: self.__value(query, 1) for query in self.__queries}
+        # A query that can't change the route on its own is only worth the follow ups it delays, so
+        # only queries worth more than their time are looked at more deeply
+        informative = [query for query in self.__queries if query not in self.__unlocked and values[query] > -self.__query_times[query[1]] + 1e-9]
+        informative.sort(key=values.get, reverse=True)
+        self.__follow_ups = informative[:self.breadth]
+        for depth in range(2, self.depth + 1):
+            deeper = {}
+            for query in informative:
+                if time.perf_counter() > deadline:
+                    break
+                deeper[query] = self.__value(query, depth)
+            if len(deeper) < len(informative):
+                # Out of time, a partial ranking would mix depths
+                break
+            values.update(deeper)
+
+        advice = [Advice(self.__query_action(query), float(value)) for query, value in values.items() if query not in self.__unlocked]
+        advice.extend(self.__move_advice(values))
+        advice.sort(key=lambda item: item.value, reverse=True)
+        return advice
+
+    def best(self) -> Advice:
+        """
+        Gets the most valuable action, if any is worth its cost
+
+        Returns:
+            Advice - The action expected to reduce the total mission cost the most, or None if none does
+        """
+
+        advice = self.rank()
+        if advice and advice[0].value > 0:
+            return advice[0]
+        return None
+
+    def __prepare(self) -> bool:
+        """
+        Computes the route costs, outcome model and candidate queries of the mission's current state
+
+        Returns:
+            bool - False if the UGV is at the end node or cannot reach it
+        """
+
+        mission = self.mission
+        state = mission.hexagons
+        grid = mission.grid
+        self.__grid = grid
+        self.__start = mission.ugv_location.index
+        self.__goal = grid.index_of(mission.end_node)
+        if self.__start == self.__goal:
+            return False
+
+        probabilities = mission.mine_probabilities()
+        self.__log_odds = np.log(np.clip(probabilities, 1e-12, 1.0)) - np.log(np.clip(1 - probabilities, 1e-12, 1.0))
+        self.__costs = expected_costs(state, probabilities, mission.ugv_traversal_time, mission.ugv_clear_time)
+        self.__step_costs = self.__costs.tolist()
+        likelihoods = mission.fusion.outcome_likelihoods
+        self.__likelihoods = likelihoods.tolist()
+        self.__terms = (np.log(likelihoods[:, 1]) - np.log(likelihoods[:, 0])).tolist()
+        self.__query_times = {AI_1: mission.ai_estimate_time, AI_2: mission.ai_estimate_time, HUMAN: mission.human_estimate_time}
+
+        # The cheapest route through each hex is the cheapest route into it plus the cheapest route
+        # from it to the goal. Its cost less the hex's own cost doesn't depend on that cost.
+        into = cost_field(grid, self.__costs, self.__start)
+        onwards = cost_field(grid, self.__costs, self.__goal, towards=True)
+        self.__cost = float(onwards[self.__start])
+        if self.__cost == float('inf'):
+            return False
+        self.__through = (into + onwards - self.__costs).tolist()
+        self.__around = {}
+        self.__plans = {frozenset(): self.__cost}
+        self.__values = {}
+
+        # Queries on hexes already detected or cleared, or where the UGV is, can't change the route
+        settled = state.has(MINE_FOUND | MINE_CLEARED)
+        settled[self.__start] = True
+        flags = state.flags
+        self.__scanned = state.scanned
+        # The UAVs carrying each AI scan, as a mask of their bits
+        self.__carriers = {AI_1: 0, AI_2: 0}
+        for uav in mission.uavs:
+            self.__carriers[uav.ai_scan] |= 1 << (uav.uav_number - 1)
+        self.__queries = []
+        for column in (AI_1, AI_2, HUMAN):
+            available = (flags & SCANNED[column] != 0) & (flags & QUERIED[column] == 0) & ~settled
+            self.__queries.extend((index, column) for index in np.flatnonzero(available).tolist())
+
+        # Queries a UAV move would make possible, keyed by the UAV and hex
+        self.__unlocked = {}
+        for uav in mission.uavs:
+            number, column = uav.uav_number, uav.ai_scan
+            ring = grid.ring(uav.uav_location.index, self.reach)
+            ring = ring[~settled[ring]]
+            for index, flag in zip(ring.tolist(), flags[ring].tolist()):
+                unlocked = []
+                if not flag & (SCANNED[column] | QUERIED[column]):
+                    unlocked.append((index, column))
+                if not flag & (SCANNED[HUMAN] | QUERIED[HUMAN]):
+                    unlocked.append((index, HUMAN))
+                for query in unlocked:
+                    self.__unlocked.setdefault(query, []).append((number, uav))
+        self.__queries.extend(query for query in self.__unlocked if query not in self.__queries)
+        return True
+
+    def __query_action(self, query: tuple[int, int]) -> tuple:
+        """
+        Converts a query to a simulation action tuple
+
+        Params:
+            query (tuple[int, int]): The hex index and confidence column
+
+        Returns:
+            tuple - The action
+        """
+
+        index, column = query
+        label = self.__grid.labels[index]
+        if column == HUMAN:
+            return ("query_human", label)
+        # Asked of the lowest numbered UAV carrying the scan that has scanned the hex
+        scanned = int(self.__scanned[index]) & self.__carriers[column]
+        return ("query_ai", label, (scanned & -scanned).bit_length())
+
+    def __move_advice(self, values: dict) -> list[Advice]:
+        """
+        Values the first move of each UAV towards the hexes whose queries it would make possible
+
+        Params:
+            values (dict): The value of each query, keyed by hex index and confidence column
+
+        Returns:
+            list[Advice] - The best value of each first move
+        """
+
+        grid = self.__grid
+        best = {}
+        for query, uavs in self.__unlocked.items():
+            index = query[0]
+            for number, uav in uavs:
+                location = uav.uav_location.index
+                neighbors = list(grid.neighbors(location))
+                distances = grid.distances(neighbors, index)
+                step = neighbors[int(distances.argmin())]
+                value = values[query] - (int(distances.min()) + 1) * uav.uav_traversal_time
+                if value > best.get((number, step), -float('inf')):
+                    best[(number, step)] = value
+        return [Advice(("move_uav", number, grid.labels[step]), float(value)) for (number, step), value in best.items()]
+
+    def __value(self, query: tuple[int, int], depth: int) -> float:
+        """
+        Computes the expected reduction in total mission cost from making a query first
+
+        Params:
+            query (tuple[int, int]): The hex index and confidence column
+            depth (int): The most queries looked ahead, including this one
+
+        Returns:
+            float - The route cost now less the query time and expected cost afterwards
+        """
+
+        return self.__cost - self.__expected(frozenset(), query, depth)
+
+    def __outcomes(self, knowledge: frozenset, query: tuple[int, int]):
+        """
+        Yields the outcomes of a query given what is already known
+
+        Params:
+            knowledge (frozenset): The (hex index, column, outcome) of the queries made hypothetically
+            query (tuple[int, int]): The hex index and confidence column
+
+        Yields:
+            tuple[float, frozenset] - The probability of each outcome and the knowledge after it
+        """
+
+        index, column = query
+        log_odds = self.__log_odds[index] + sum(self.__terms[c][o] for i, c, o in knowledge if i == index)
+        p = 1 / (1 + np.exp(-log_odds))
+        likelihoods = self.__likelihoods[column]
+        for outcome in range(len(likelihoods[0])):
+            yield p * likelihoods[1][outcome] + (1 - p) * likelihoods[0][outcome], knowledge | {(index, column, outcome)}
+
+    def __expected(self, knowledge: frozenset, query: tuple[int, int], depth: int) -> float:
+        """
+        Computes the expected remaining cost of making a query and then acting as well as possible
+
+        Params:
+            knowledge (frozenset): The (hex index, column, outcome) of the queries made hypothetically
+            query (tuple[int, int]): The hex index and confidence column
+            depth (int): The most queries looked ahead, including this one
+
+        Returns:
+            float - The query time plus the expected remaining cost afterwards
+        """
+
+        expected = self.__query_times[query[1]]
+        for probability, after in self.__outcomes(knowledge, query):
+            expected += probability * self.__remaining(after, depth - 1)
+        return expected
+
+    def __remaining(self, knowledge: frozenset, depth: int) -> float:
+        """
+        Computes the expected remaining cost once some outcomes are known, stopping or making up to
+        depth more follow up queries, whichever is cheaper
+
+        Params:
+            knowledge (frozenset): The (hex index, column, outcome) of the queries made hypothetically
+            depth (int): The most follow up queries looked ahead
+
+        Returns:
+            float - The expected remaining cost
+        """
+
+        key = (knowledge, depth)
+        if key in self.__values:
+            return self.__values[key]
+
+        remaining = self.__route_cost(knowledge)
+        if depth > 0:
+            made = {(index, column) for index, column, _ in knowledge}
+            for query in self.__follow_ups:
+                if query not in made:
+                    remaining = min(remaining, self.__expected(knowledge, query, depth))
+        self.__values[key] = remaining
+        return remaining
+
+    def __route_cost(self, knowledge: frozenset) -> float:
+        """
+        Computes the expected cost of the best UGV route once some outcomes are known
+
+        Params:
+            knowledge (frozenset): The (hex index, column, outcome) of the queries made hypothetically
+
+        Returns:
+            float - The route cost
+        """
+
+        if knowledge in self.__plans:
+            return self.__plans[knowledge]
+
+        mission = self.mission
+        changed = {}
+        for index, column, outcome in knowledge:
+            changed[index] = changed.get(index, self.__log_odds[index]) + self.__terms[column][outcome]
+        costs = {index: mission.ugv_traversal_time + mission.ugv_clear_time / (1 + np.exp(-log_odds)) for index, log_odds in changed.items()}
+
+        if len(costs) == 1:
+            # Routes either pass through the hex, costing the cheapest route through it with its new
+            # cost, or avoid it entirely
+            (index, cost), = costs.items()
+            route_cost = min(self.__avoiding(index), self.__through[index] + cost)
+        else:
+            step_costs = self.__costs.copy()
+            for index, cost in costs.items():
+                step_costs[index] = cost
+            route = a_star(self.__grid, step_costs, self.__start, self.__goal)
+            route_cost = route.cost if route is not None else float('inf')
+        self.__plans[knowledge] = route_cost
+        return route_cost
+
+    def __avoiding(self, index: int) -> float:
+        """
+        Computes the cost of the best UGV route that avoids a hex
+
+        Params:
+            index (int): The index of the hex
+
+        Returns:
+            float - The route cost, inf if every route passes through the hex
+        """
+
+        if self.__through[index] + self.__step_costs[index] > self.__cost * (1 + 1e-9):
+            # The best route already avoids the hex
+            return self.__cost
+        if index not in self.__around:
+            step_costs = self.__costs.copy()
+            step_costs[index] = float('inf')
+            route = a_star(self.__grid, step_costs, self.__start, self.__goal)
+            self.__around[index] = route.cost if route is not None else float('inf')
+        return self.__around[index]
@@ -0,0 +1,390 @@
+import argparse
+import datetime
+import glob
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+import numpy as np
+from generator import ScenarioGenerator
+from mission import Mission
+from scenario import CONFIG_DIR, Scenario, ScenarioCache
+from scheduler import CoverageScheduler, corridor
+from simulation import POLICIES, run_episode
+
+
+# The side lengths of the synthetic square grids the scaling benchmarks run on
+SIZES = (10, 32, 100, 316)
+QUICK_SIZES = (10, 32, 100)
+# How much slower than the baseline a benchmark may run before it counts as a regression
+TOLERANCE = 0.25
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    params: dict
+    seconds: float
+    best: float
+    calls: int
+    peak_bytes: int = None
+
+
+def time_call(function, target: float = 0.05, repeat: int = 5, setup=None) -> tuple[float, float, int]:
+    """
+    Times a function the way timeit does, calling it enough times per repeat to last the target
+
+    Params:
+        function: The function to time, called with no arguments
+        target (float): The seconds each repeat should last at least
+        repeat (int): The number of repeats
+        setup: A function called once before each repeat, not timed
+
+    Returns:
+        tuple[float, float, int] - The median and best seconds per call, and the calls per repeat
+    """
+
+    number = 1
+    while True:
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= target or number >= 1 << 20:
+            break
+        number *= 2 if elapsed <= 0 else max(2, min(10, int(target / elapsed) + 1))
+    times = [elapsed / number]
+    for _ in range(repeat - 1):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start) / number)
+    return statistics.median(times), min(times), number
+
+
+def peak_memory(function) -> int:
+    """
+    Measures the most memory Python allocated at once during a single call
+
+    Params:
+        function: The function to call with no arguments
+
+    Returns:
+        int - The peak bytes allocated beyond what was allocated before the call
+    """
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        function()
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+class Suite():
+    def __init__(self, quick: bool = False, target: float = 0.05, repeat: int = 5):
+        """
+        Creates the Suite object, collecting benchmark results
+
+        Params:
+            quick (bool): Whether to skip the largest grids and time for less long
+            target (float): The seconds each repeat of a benchmark should last at least
+            repeat (int): The number of repeats of each benchmark
+        """
+        self.quick = quick
+        self.target = target / 5 if quick else target
+        self.repeat = 3 if quick else repeat
+        self.results = []
+
+    def run(self, name: str, function, params: dict = None, memory: bool = False, setup=None, overhead: float = 0.0) -> BenchmarkResult:
+        """
+        Times a function and records the result
+
+        Params:
+            name (str): The name of the benchmark
+            function: The function to time, called with no arguments
+            params (dict): What the benchmark ran on, part of its identity when comparing
+            memory (bool): Whether to also measure the peak memory of one call
+            setup: A function called once before each repeat, not timed
+            overhead (float): Seconds per call to subtract, such as restoring a snapshot between calls
+
+        Returns:
+            BenchmarkResult - The result
+        """
+        seconds, best, calls = time_call(function, self.target, self.repeat, setup)
+        result = BenchmarkResult(name, dict(params or {}), max(0.0, seconds - overhead), max(0.0, best - overhead), calls,
+                                 peak_memory(function) if memory else None)
+        self.results.append(result)
+        print("%-34s %-40s %12.2f us %s" % (name, json.dumps(result.params)[:40], result.seconds * 1e6,
+                                             "%10.1f KiB" % (result.peak_bytes / 1024) if result.peak_bytes is not None else ""))
+        return result
+
+
+def shipped_scenarios() -> list[str]:
+    """
+    Lists the scenario JSON files in the config directory, skipping files in other formats
+
+    Returns:
+        list[str] - The paths of the files
+    """
+
+    paths = []
+    for path in sorted(glob.glob(os.path.join(CONFIG_DIR, '*.json'))):
+        try:
+            Scenario.load(path)
+        except (KeyError, TypeError, ValueError):
+            continue
+        paths.append(path)
+    return paths
+
+
+def bench_loading(suite: Suite, paths: list[str]):
+    """
+    Times parsing scenario files, loading them through a warm cache and constructing missions
+    """
+
+    for path in paths:
+        params = {"scenario": os.path.basename(path)}
+        suite.run("load.parse_json", lambda: Scenario.load(path), params, memory=True)
+        cache = ScenarioCache(directory=None)
+        cache.load(path)
+        suite.run("load.cache_hit", lambda: cache.load(path), params)
+        scenario = Scenario.load(path)
+        suite.run("mission.construct", lambda: Mission(scenario, log_to_file=False), params, memory=True)
+
+
+def bench_grid(suite: Suite, mission: Mission, params: dict):
+    """
+    Times looking hexes up by label and checking and listing their neighbors
+    """
+
+    grid = mission.grid
+    labels = grid.labels
+    middle = len(grid) // 2
+    neighbor = grid.neighbors(middle)[0]
+    suite.run("grid.index_of", lambda: grid.index_of(labels[middle]), params)
+    suite.run("grid.is_adjacent", lambda: grid.is_adjacent(middle, neighbor), params)
+    suite.run("grid.neighbors", lambda: grid.neighbors(middle), params)
+    indices = np.arange(len(grid))
+    suite.run("grid.distances", lambda: grid.distances(indices, [middle]), params)
+
+
+def bench_actions(suite: Suite, mission: Mission, params: dict):
+    """
+    Times each mission action, rolling the mission back between calls where an action can't repeat
+    """
+
+    start = mission.snapshot()
+    first = mission.grid.labels[mission.grid.neighbors(mission.ugv_location.index)[0]]
+    home = mission.ugv_location.label
+    suite.run("mission.snapshot", mission.snapshot, params)
+    restore = suite.run("mission.restore", lambda: mission.restore(start), params).seconds
+    suite.run("mission.clone", mission.clone, params)
+
+    suite.run("action.get_chosen_hex", lambda: mission.get_chosen_hex(first), params)
+    # Flies back and forth between the start and its neighbor, so every call moves
+    moves = [first, home]
+    suite.run("action.move_uav", lambda: mission.move_uav(mission.uav_1, moves[mission.uav_1.uav_location.label == first]), params)
+    mission.restore(start)
+
+    mission.move_uav(mission.uav_1, first)
+    mission.move_uav(mission.uav_2, first)
+    mission.get_chosen_hex(first)
+    scanned = mission.snapshot()
+    suite.run("action.query_ai", lambda: (mission.restore(scanned), mission.query_ai(1)), params, overhead=restore)
+    suite.run("action.query_human", lambda: (mission.restore(scanned), mission.query_human()), params, overhead=restore)
+    suite.run("action.move_ugv", lambda: (mission.restore(start), mission.move_ugv(first)), params, overhead=restore)
+    # Ten moves there and back, ending where they started
+    path = [first, home] * 5
+    suite.run("action.move_uav_path", lambda: mission.move_uav_path(mission.uav_1, path), params)
+    suite.run("action.move_ugv_path", lambda: (mission.restore(start), mission.move_ugv_path(path)), params, overhead=restore)
+    mission.restore(start)
+    suite.run("mission.mine_probabilities", mission.mine_probabilities, params)
+    clone = time_call(mission.clone, suite.target, suite.repeat)[0]
+    suite.run("mission.plan_route.cold", lambda: mission.clone().plan_route(), params, overhead=clone)
+    mission.plan_route()
+    suite.run("mission.plan_route.warm", mission.plan_route, params)
+    targets = corridor(mission, 2)
+    suite.run("scheduler.plan", lambda: CoverageScheduler(mission).plan(targets), params)
+    mission.restore(start)
+
+
+def bench_episodes(suite: Suite, paths: list[str]):
+    """
+    Times whole scripted episodes of each shipped scenario under each deterministic policy
+    """
+
+    for path in paths:
+        for policy_name in ("shortest", "planned", "advised"):
+            policy = POLICIES[policy_name]()
+            params = {"scenario": os.path.basename(path), "policy": policy_name}
+            suite.run("episode", lambda: run_episode(path, policy, 0), params, memory=True)
+
+
+def bench_renderer(suite: Suite, scenarios: list, params: list[dict]):
+    """
+    Times constructing the Renderer window and moving a vehicle marker under the offscreen Qt platform
+    """
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt6.QtWidgets import QApplication
+        from renderer import Renderer
+    except ImportError as error:
+        print("Skipping the renderer benchmarks, %s" % error)
+        return
+    application = QApplication.instance() or QApplication([])
+    for scenario, scenario_params in zip(scenarios, params):
+        windows = []
+
+        def construct():
+            windows.append(Renderer(scenario, log_to_file=False))
+            application.processEvents()
+
+        suite.run("renderer.construct", construct, scenario_params, memory=True)
+        window = windows[-1]
+        grid = window.mission.grid
+        first, second = grid.labels[0], grid.labels[grid.neighbors(0)[0]]
+        moves = itertools.cycle([(first, second), (second, first)])
+        suite.run("renderer.set_hex_color", lambda: window.set_hex_color(*next(moves), "uav2"), scenario_params)
+        for window in windows:
+            window.close()
+            window.deleteLater()
+        application.processEvents()
+
+
+def run_suite(quick: bool = False, renderer: bool = True, sizes: tuple = None) -> list[BenchmarkResult]:
+    """
+    Runs every benchmark on the shipped scenarios and on synthetic grids of increasing size
+
+    Params:
+        quick (bool): Whether to skip the largest grids and time for less long
+        renderer (bool): Whether to include the Qt renderer benchmarks
+        sizes (tuple): The side lengths of the synthetic grids, SIZES or QUICK_SIZES if not given
+
+    Returns:
+        list[BenchmarkResult] - The results
+    """
+
+    suite = Suite(quick)
+    paths = shipped_scenarios()
+    bench_loading(suite, paths)
+    for path in paths:
+        mission = Mission(path, log_to_file=False)
+        params = {"scenario": os.path.basename(path)}
+        bench_grid(suite, mission, params)
+        bench_actions(suite, mission, params)
+    bench_episodes(suite, paths)
+
+    scenarios = []
+    scenario_params = []
+    for size in sizes or (QUICK_SIZES if quick else SIZES):
+        scenario = next(ScenarioGenerator(size, size, seed=size).generate(1, "synthetic_%d" % size))
+        params = {"hexes": size * size}
+        suite.run("mission.construct", lambda: Mission(scenario, log_to_file=False), params, memory=True)
+        mission = Mission(scenario, log_to_file=False)
+        bench_grid(suite, mission, params)
+        bench_actions(suite, mission, params)
+        scenarios.append(scenario)
+        scenario_params.append(params)
+    if renderer:
+        bench_renderer(suite, [os.path.basename(path) for path in paths] + scenarios,
+                       [{"scenario": os.path.basename(path)} for path in paths] + scenario_params)
+    return suite.results
+
+
+def save(results: list[BenchmarkResult], path: str):
+    """
+    Writes results and the machine they ran on to a JSON baseline file
+
+    Params:
+        results (list[BenchmarkResult]): The results
+        path (str): The path of the file
+    """
+
+    meta = {
+        "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+    with open(path, 'w') as file:
+        json.dump({"meta": meta, "results": [asdict(result) for result in results]}, file, indent=1)
+
+
+def result_key(result: dict) -> str:
+    """
+    Identifies a result across runs by its name and parameters
+    """
+
+    return result["name"] + " " + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(results: list[BenchmarkResult], baseline_path: str, tolerance: float = TOLERANCE) -> list[str]:
+    """
+    Prints how each result compares to a baseline file written by save
+
+    Params:
+        results (list[BenchmarkResult]): The results of this run
+        baseline_path (str): The path of the baseline file
+        tolerance (float): How much slower than the baseline, as a fraction, a result may be before it is a regression
+
+    Returns:
+        list[str] - The keys of the results slower than the baseline beyond the tolerance
+    """
+
+    with open(baseline_path) as json_data:
+        baseline = {result_key(result): result for result in json.load(json_data)["results"]}
+    regressions = []
+    for result in results:
+        key = result_key(asdict(result))
+        if key not in baseline:
+            continue
+        # Compared by the best time, the least disturbed by whatever else the machine was doing
+        before = baseline[key]["best"]
+        ratio = result.best / before if before > 0 else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "REGRESSION"
+            regressions.append(key)
+        elif ratio < 1 / (1 + tolerance):
+            flag = "faster"
+        print("%-76s %12.2f us %12.2f us %6.2fx %s" % (key[:76], before * 1e6, result.best * 1e6, ratio, flag))
+    return regressions
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark scenario loading, mission actions, episodes and the renderer")
+    parser.add_argument("--output", help="write the results to a JSON baseline file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare the results to a baseline file, exiting 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="how much slower than the baseline a benchmark may be, as a fraction")
+    parser.add_argument("--quick", action="store_true", help="time for less long and skip the largest grid")
+    parser.add_argument("--sizes", type=int, nargs="+", help="the side lengths of the synthetic grids")
+    parser.add_argument("--no-renderer", action="store_true", help="skip the Qt renderer benchmarks")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.quick, not args.no_renderer, args.sizes)
+    if args.output:
+        save(results, args.output)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        print("%d regressions beyond %d%%" % (len(regressions), args.tolerance * 100))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
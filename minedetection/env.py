@@ -0,0 +1,330 @@
+import numpy as np
+from fusion import QUERIED_FLAGS
+from gridstate import MINE_PRESENT, MINE_FOUND, MINE_CLEARED, HUMAN_QUERIED, SCAN_SCANNED, SCAN_QUERIED, mask_dtype
+from mission import Mission
+
+
+# Actions are integers. The first blocks of six move each UGV then each UAV one hex in the
+# direction of the same index in hexgrid.AXIAL_DIRECTIONS. Then come a query of each UAV's AI and
+# a human query for each UAV, made for the hex that UAV is over. These constants are the layout
+# of the missions of the example scenarios, one UGV and two UAVs.
+MOVE_UGV = 0
+MOVE_UAV_1 = 6
+MOVE_UAV_2 = 12
+QUERY_AI_1 = 18
+QUERY_AI_2 = 19
+QUERY_HUMAN_UAV_1 = 20
+QUERY_HUMAN_UAV_2 = 21
+NUM_ACTIONS = 22
+
+
+class VectorMissionEnv():
+    def __init__(self, scenario: str, num_envs: int, max_steps: int = None, auto_reset: bool = False):
+        """
+        Creates the VectorMissionEnv object, stepping many copies of a mission in lockstep
+
+        Each environment's state is one row of hex flags, one row of the UAVs whose AI has been
+        queried for each hex and the hex index of every vehicle, so a step is a handful of array
+        operations across all environments however many there are, and whatever the size of the
+        fleet. Moves and queries follow the same rules and cost the same as the Mission methods,
+        and an action the Mission would refuse costs nothing and changes nothing. An environment
+        is done once any UGV reaches the end node.
+
+        Observations are a dict of arrays with a leading environment axis:
+            "flags": The (envs, hexes) uint8 flags with the undetected mine bit hidden
+            "positions": The (envs, UGVs + UAVs) hex indices of each UGV then each UAV
+            "confidence": The (envs, hexes, 3) float32 AI 1, AI 2 and human estimates queried so far, 0 otherwise
+
+        Params:
+            scenario (str): The scenario JSON file within the config directory
+            num_envs (int): The number of environments
+            max_steps (int): The number of steps after which an environment is done, unlimited if not given
+            auto_reset (bool): True to reset environments on the step after they are done, ignoring its action
+        """
+        mission = Mission(scenario, log_to_file=False)
+        state = mission.hexagons
+        grid = mission.grid
+        self.__mission = mission
+        self.__neighbors = grid.neighbor_table()
+        self.__confidence = state.confidence.astype(np.float32)
+        self.__goal = grid.index_of(mission.end_node)
+        self.__initial_flags = state.flags.copy()
+        self.__initial_queried = state.ai_queried.copy()
+        ugvs, uavs = mission.ugvs, mission.uavs
+        self.__num_ugvs = len(ugvs)
+        self.__num_uavs = len(uavs)
+        vehicles = len(ugvs) + len(uavs)
+        self.__query_ai = 6 * vehicles
+        self.__query_human = self.__query_ai + len(uavs)
+        self.__num_actions = self.__query_human + len(uavs)
+        self.__initial_positions = np.array([ugv.ugv_location.index for ugv in ugvs] + [uav.uav_location.index for uav in uavs], dtype=np.intp)
+        # Per vehicle, UGVs first: the time of a move, and of clearing a mine for the UGVs
+        self.__traversal_times = np.array([ugv.ugv_traversal_time for ugv in ugvs] + [uav.uav_traversal_time for uav in uavs], dtype=np.float64)
+        self.__clear_times = np.array([ugv.ugv_clear_time for ugv in ugvs], dtype=np.float64)
+        # Per UAV: the flags its scans and AI queries set, and its bit of the queried masks
+        self.__scanned_flags = np.array([SCAN_SCANNED[uav.ai_scan] for uav in uavs], dtype=np.uint8)
+        self.__queried_flags = np.array([SCAN_QUERIED[uav.ai_scan] for uav in uavs], dtype=np.uint8)
+        self.__uav_bits = (np.ones(len(uavs), dtype=np.uint64) << np.arange(len(uavs), dtype=np.uint64)).astype(state.ai_queried.dtype)
+        self.__ai_estimate_time = float(mission.ai_estimate_time)
+        self.__human_estimate_time = float(mission.human_estimate_time)
+        self.__num_envs = num_envs
+        self.__max_steps = max_steps
+        self.__auto_reset = auto_reset
+
+        self.__flags = np.empty((num_envs, len(grid)), dtype=np.uint8)
+        self.__queried = np.empty((num_envs, len(grid)), dtype=mask_dtype(len(uavs)))
+        self.__positions = np.empty((num_envs, vehicles), dtype=np.intp)
+        self.__totals = np.zeros(num_envs, dtype=np.float64)
+        self.__steps = np.zeros(num_envs, dtype=np.int64)
+        self.__done = np.zeros(num_envs, dtype=bool)
+        self.reset()
+
+    @property
+    def mission(self) -> Mission:
+        """
+        Gets the mission field
+
+        Returns:
+            Mission - The mission the environments were loaded from, left in its initial state
+        """
+        return self.__mission
+
+    @property
+    def num_envs(self) -> int:
+        """
+        Gets the num_envs field
+
+        Returns:
+            int - The number of environments
+        """
+        return self.__num_envs
+
+    @property
+    def num_ugvs(self) -> int:
+        """
+        Gets the num_ugvs field
+
+        Returns:
+            int - The number of UGVs, whose moves are the first actions
+        """
+        return self.__num_ugvs
+
+    @property
+    def num_uavs(self) -> int:
+        """
+        Gets the num_uavs field
+
+        Returns:
+            int - The number of UAVs, whose moves follow the UGVs'
+        """
+        return self.__num_uavs
+
+    @property
+    def num_actions(self) -> int:
+        """
+        Gets the num_actions field
+
+        Returns:
+            int - The number of actions, NUM_ACTIONS for one UGV and two UAVs
+        """
+        return self.__num_actions
+
+    @property
+    def totals(self) -> np.ndarray:
+        """
+        Gets the totals field
+
+        Returns:
+            np.ndarray - The float64 mission total of each environment since its last reset
+        """
+        return self.__totals
+
+    @property
+    def done(self) -> np.ndarray:
+        """
+        Gets the done field
+
+        Returns:
+            np.ndarray - True where a UGV has reached the end node or the step limit was reached
+        """
+        return self.__done
+
+    def reset(self, mask: np.ndarray = None) -> dict:
+        """
+        Returns environments to the start of the mission
+
+        Params:
+            mask (np.ndarray): True for the environments to reset, all of them if not given
+
+        Returns:
+            dict - The observations of every environment
+        """
+        if mask is None:
+            mask = slice(None)
+        self.__restart(mask)
+        return self.observe()
+
+    def __restart(self, mask):
+        self.__flags[mask] = self.__initial_flags
+        self.__queried[mask] = self.__initial_queried
+        self.__positions[mask] = self.__initial_positions
+        self.__totals[mask] = 0.0
+        self.__steps[mask] = 0
+        self.__done[mask] = False
+
+    def observe(self) -> dict:
+        """
+        Gets what the operator can see of every environment
+
+        Returns:
+            dict - The "flags", "positions" and "confidence" arrays described by the constructor
+        """
+        flags = self.__flags
+        revealed = (flags[:, :, None] & QUERIED_FLAGS) != 0
+        return {
+            "flags": flags & np.uint8(~MINE_PRESENT & 0xFF),
+            "positions": self.__positions.copy(),
+            "confidence": np.where(revealed, self.__confidence, np.float32(0.0)),
+        }
+
+    def action_mask(self) -> np.ndarray:
+        """
+        Gets the actions each environment would accept
+
+        Returns:
+            np.ndarray - The (envs, num_actions) mask, True where the action is valid
+        """
+        mask = np.zeros((self.__num_envs, self.__num_actions), dtype=bool)
+        mask[:, :self.__query_ai] = (self.__neighbors[self.__positions] >= 0).reshape(self.__num_envs, -1)
+        rows = np.arange(self.__num_envs)[:, None]
+        hexes = self.__positions[:, self.__num_ugvs:]
+        mask[:, self.__query_ai:self.__query_human] = (self.__queried[rows, hexes] & self.__uav_bits) == 0
+        mask[:, self.__query_human:] = (self.__flags[rows, hexes] & HUMAN_QUERIED) == 0
+        mask[self.__done] = False
+        return mask
+
+    def step(self, actions) -> tuple[dict, np.ndarray, np.ndarray]:
+        """
+        Takes one action in every environment
+
+        Params:
+            actions: The integer action of each environment
+
+        Returns:
+            tuple[dict, np.ndarray, np.ndarray] - The observations, the float64 cost of each action and whether each environment is done
+        """
+        actions = np.asarray(actions, dtype=np.intp)
+        flags = self.__flags
+        queried = self.__queried
+        positions = self.__positions
+        num_ugvs = self.__num_ugvs
+        costs = np.zeros(self.__num_envs, dtype=np.float64)
+        active = ~self.__done
+        if self.__auto_reset and not active.all():
+            self.__restart(~active)
+
+        # Moves: look up the destination of every moving vehicle, dropping moves off the grid
+        rows = np.flatnonzero(active & (actions >= 0) & (actions < self.__query_ai))
+        vehicles = actions[rows] // 6
+        destinations = self.__neighbors[positions[rows, vehicles], actions[rows] % 6]
+        on_grid = destinations >= 0
+        rows, vehicles, destinations = rows[on_grid], vehicles[on_grid], destinations[on_grid]
+
+        ugv = vehicles < num_ugvs
+        ugv_rows, ugv_destinations, ugv_vehicles = rows[ugv], destinations[ugv], vehicles[ugv]
+        hex_flags = flags[ugv_rows, ugv_destinations]
+        mine = (hex_flags & MINE_PRESENT) != 0
+        found = (hex_flags & MINE_FOUND) != 0
+        detected = mine & ~found
+        cleared = mine & found
+        # An undetected mine is found and the UGV stays put, a detected one is cleared as the UGV enters
+        hex_flags = np.where(detected, hex_flags | MINE_FOUND, hex_flags)
+        hex_flags = np.where(cleared, (hex_flags | MINE_CLEARED) & np.uint8(~MINE_PRESENT & 0xFF), hex_flags)
+        flags[ugv_rows, ugv_destinations] = hex_flags
+        positions[ugv_rows[~detected], ugv_vehicles[~detected]] = ugv_destinations[~detected]
+        costs[ugv_rows] = np.where(cleared, self.__clear_times[ugv_vehicles], self.__traversal_times[ugv_vehicles])
+
+        uav_rows, uav_destinations, uav_vehicles = rows[~ugv], destinations[~ugv], vehicles[~ugv]
+        positions[uav_rows, uav_vehicles] = uav_destinations
+        flags[uav_rows, uav_destinations] |= self.__scanned_flags[uav_vehicles - num_ugvs]
+        costs[uav_rows] = self.__traversal_times[uav_vehicles]
+
+        # Queries: the hex under a UAV is always scanned by it, so only an earlier query refuses one
+        rows = np.flatnonzero(active & (actions >= self.__query_ai) & (actions < self.__query_human))
+        uavs = actions[rows] - self.__query_ai
+        hexes = positions[rows, num_ugvs + uavs]
+        bits = self.__uav_bits[uavs]
+        allowed = (queried[rows, hexes] & bits) == 0
+        rows, hexes, uavs = rows[allowed], hexes[allowed], uavs[allowed]
+        queried[rows, hexes] |= bits[allowed]
+        flags[rows, hexes] |= self.__queried_flags[uavs]
+        costs[rows] = self.__ai_estimate_time
+
+        rows = np.flatnonzero(active & (actions >= self.__query_human) & (actions < self.__num_actions))
+        hexes = positions[rows, num_ugvs + actions[rows] - self.__query_human]
+        allowed = (flags[rows, hexes] & HUMAN_QUERIED) == 0
+        rows, hexes = rows[allowed], hexes[allowed]
+        flags[rows, hexes] |= HUMAN_QUERIED
+        costs[rows] = self.__human_estimate_time
+
+        self.__totals += costs
+        self.__steps += active
+        self.__done |= active & (positions[:, :num_ugvs] == self.__goal).any(axis=1)
+        if self.__max_steps is not None:
+            self.__done |= self.__steps >= self.__max_steps
+        return self.observe(), costs, self.__done.copy()
+
+
+class MissionEnv():
+    def __init__(self, scenario: str, max_steps: int = None):
+        """
+        Creates the MissionEnv object, a single mission behind a reset and step interface
+
+        Observations are those of VectorMissionEnv without the environment axis.
+
+        Params:
+            scenario (str): The scenario JSON file within the config directory
+            max_steps (int): The number of steps after which the mission is done, unlimited if not given
+        """
+        self.__env = VectorMissionEnv(scenario, 1, max_steps)
+
+    @property
+    def total(self) -> float:
+        """
+        Gets the total field
+
+        Returns:
+            float - The mission total since the last reset
+        """
+        return float(self.__env.totals[0])
+
+    def reset(self) -> dict:
+        """
+        Returns the mission to its start
+
+        Returns:
+            dict - The observation
+        """
+        return {key: value[0] for key, value in self.__env.reset().items()}
+
+    def action_mask(self) -> np.ndarray:
+        """
+        Gets the actions the mission would accept
+
+        Returns:
+            np.ndarray - The num_actions mask, True where the action is valid
+        """
+        return self.__env.action_mask()[0]
+
+    def step(self, action: int) -> tuple[dict, float, bool]:
+        """
+        Takes one action
+
+        Params:
+            action (int): The action
+
+        Returns:
+            tuple[dict, float, bool] - The observation, the cost of the action and whether the mission is done
+        """
+        observation, costs, done = self.__env.step((action,))
+        return {key: value[0] for key, value in observation.items()}, float(costs[0]), bool(done[0])
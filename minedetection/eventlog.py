@@ -0,0 +1,242 @@
+import atexit
+import json
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+
+class Event():
+    __slots__ = ('time', 'action', 'hex', 'outcome', 'cost', 'total', 'template', 'args')
+
+    def __init__(self, time: float, action: str, hex: str, outcome: str, cost: float, total: float, template: str, args: tuple):
+        """
+        Creates an Event object, one structured record of something that happened during a mission
+
+        The human readable message is only formatted when asked for, which most events never are.
+
+        Parameters:
+            time (float): The time of the event in seconds since the epoch
+            action (str): The action taken, such as "move_ugv" or "query_ai"
+            hex (str): The label of the hex acted on, None if there was none
+            outcome (str): What came of the action, such as "moved", "mine_found" or "refused"
+            cost (float): The amount the action added to the mission total
+            total (float): The mission total after the action
+            template (str): The %-style template of the message
+            args (tuple): The values formatted into the template
+        """
+        self.time = time
+        self.action = action
+        self.hex = hex
+        self.outcome = outcome
+        self.cost = cost
+        self.total = total
+        self.template = template
+        self.args = args
+
+    @property
+    def message(self) -> str:
+        """
+        Gets the event's human readable message
+
+        Returns:
+            str - The formatted message
+        """
+        return self.template % self.args if self.args else self.template
+
+    def to_dict(self) -> dict:
+        """
+        Converts the event to a JSON friendly dict
+
+        Returns:
+            dict - The event's fields and formatted message
+        """
+        return {"time": self.time, "action": self.action, "hex": self.hex, "outcome": self.outcome,
+                "cost": self.cost, "total": self.total, "message": self.message}
+
+    def __repr__(self) -> str:
+        return "Event(%s, %s, %s)" % (self.action, self.hex, self.outcome)
+
+
+class EventWriter():
+    def __init__(self, filename: str, batch_size: int = 256, linger: float = 0.05):
+        """
+        Creates the EventWriter object, appending events to a JSON lines file from a background thread
+
+        Recording an event only puts it on a queue. Once an event arrives the writer thread gathers
+        more for up to linger seconds, or until it has batch_size of them, and writes the batch with a
+        single call. Anything still queued is written when the writer is closed, including at
+        interpreter exit. An event or batch that cannot be written is reported on stderr and dropped.
+
+        Parameters:
+            filename (str): The file to append to
+            batch_size (int): The most events written per call
+            linger (float): The longest the first event of a batch waits for others to join it
+        """
+        self.__filename = filename
+        self.__batch_size = batch_size
+        self.__linger = linger
+        self.__queue = queue.SimpleQueue()
+        self.__file = open(filename, 'a', encoding='utf-8')
+        self.__closed = False
+        self.__thread = threading.Thread(target=self.__run, name="EventWriter", daemon=True)
+        self.__thread.start()
+        atexit.register(self.close)
+
+    @property
+    def filename(self) -> str:
+        """
+        Gets the filename field
+
+        Returns:
+            str - The file events are appended to
+        """
+        return self.__filename
+
+    def put(self, event: Event):
+        """
+        Queues an event to be written
+
+        Parameters:
+            event (Event): The event
+        """
+        self.__queue.put(event)
+
+    def flush(self):
+        """
+        Blocks until every event queued so far has been written
+        """
+        if self.__closed:
+            return
+        done = threading.Event()
+        self.__queue.put(done)
+        done.wait()
+
+    def close(self):
+        """
+        Writes every queued event, stops the writer thread and closes the file
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+        self.__queue.put(None)
+        self.__thread.join()
+        self.__file.close()
+        atexit.unregister(self.close)
+
+    def __run(self):
+        events = self.__queue
+        stop = False
+        while not stop:
+            item = events.get()
+            deadline = time.monotonic() + self.__linger
+            batch = []
+            waiting = []
+            try:
+                while True:
+                    if item is None:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        # Someone is flushing, so write what has been gathered without lingering
+                        waiting.append(item)
+                        deadline = 0.0
+                    else:
+                        try:
+                            batch.append(json.dumps(item.to_dict()))
+                        except Exception as error:
+                            print("%s: dropped event %r: %s" % (self.__filename, item, error), file=sys.stderr)
+                    if stop or len(batch) >= self.__batch_size:
+                        break
+                    try:
+                        item = events.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                if batch:
+                    self.__file.write('\n'.join(batch) + '\n')
+                    self.__file.flush()
+            except Exception as error:
+                # Keep writing later batches, and never leave a flush waiting
+                print("%s: dropped %d events: %s" % (self.__filename, len(batch), error), file=sys.stderr)
+            finally:
+                for done in waiting:
+                    done.set()
+
+
+class EventLog():
+    def __init__(self, capacity: int = 256, writer: EventWriter = None):
+        """
+        Creates the EventLog object, the event stream of one mission
+
+        The most recent events are kept in memory for the UI, older ones are dropped. Events are also
+        handed to the writer, if there is one, to be written in the background.
+
+        Parameters:
+            capacity (int): The number of recent events kept in memory
+            writer (EventWriter): The writer persisting every event, None to keep events in memory only
+        """
+        self.__recent = deque(maxlen=capacity)
+        self.__writer = writer
+
+    @property
+    def writer(self) -> EventWriter:
+        """
+        Gets the writer field
+
+        Returns:
+            EventWriter - The writer persisting every event, or None
+        """
+        return self.__writer
+
+    @property
+    def last(self) -> Event:
+        """
+        Gets the most recent event
+
+        Returns:
+            Event - The event, or None if nothing has been recorded
+        """
+        return self.__recent[-1] if self.__recent else None
+
+    def recent(self, count: int = None) -> list[Event]:
+        """
+        Gets the most recent events kept in memory
+
+        Parameters:
+            count (int): The number of events, all of those kept if not given
+
+        Returns:
+            list[Event] - The events, oldest first
+        """
+        if count is None or count >= len(self.__recent):
+            return list(self.__recent)
+        return list(self.__recent)[-count:]
+
+    def record(self, action: str, hex: str, outcome: str, cost: float, total: float, template: str, *args) -> Event:
+        """
+        Records an event
+
+        Parameters:
+            action (str): The action taken
+            hex (str): The label of the hex acted on, None if there was none
+            outcome (str): What came of the action
+            cost (float): The amount the action added to the mission total
+            total (float): The mission total after the action
+            template (str): The %-style template of the message
+            args: The values formatted into the template
+
+        Returns:
+            Event - The recorded event
+        """
+        event = Event(time.time(), action, hex, outcome, cost, total, template, args)
+        self.__recent.append(event)
+        if self.__writer is not None:
+            self.__writer.put(event)
+        return event
+
+    def close(self):
+        """
+        Writes every queued event and closes the writer, if there is one
+        """
+        if self.__writer is not None:
+            self.__writer.close()
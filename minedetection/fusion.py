@@ -0,0 +1,182 @@
+import json
+import numpy as np
+from gridstate import GridState, AI_1_QUERIED, AI_2_QUERIED, HUMAN_QUERIED, MINE_PRESENT
+
+
+# The queried flag of each confidence column, in column order
+QUERIED_FLAGS = np.array([AI_1_QUERIED, AI_2_QUERIED, HUMAN_QUERIED], dtype=np.uint8)
+EPSILON = 1e-6
+# Outcomes of an uncalibrated query, without then with a mine: a report three times as likely with a
+# mine as without, or the reverse
+DEFAULT_OUTCOME_LIKELIHOODS = np.array([[0.75, 0.25], [0.25, 0.75]])
+
+
+def logit(p):
+    """
+    Converts probabilities to log odds, clipping away from 0 and 1
+
+    Params:
+        p: The probabilities
+
+    Returns:
+        The log odds
+    """
+
+    p = np.clip(p, EPSILON, 1 - EPSILON)
+    return np.log(p / (1 - p))
+
+
+def fit_logistic(x: np.ndarray, y: np.ndarray, offset: np.ndarray = 0.0, l2: float = 1e-3, iterations: int = 50) -> tuple[float, float]:
+    """
+    Fits P(y = 1) = sigmoid(offset + slope * x + intercept) by regularized Newton iterations
+
+    Params:
+        x (np.ndarray): The feature of each sample
+        y (np.ndarray): The 0 or 1 outcome of each sample
+        offset (np.ndarray): The fixed log odds of each sample the fit adjusts
+        l2 (float): The L2 penalty on the parameters, keeping separable data finite
+        iterations (int): The maximum number of Newton steps
+
+    Returns:
+        tuple[float, float] - The slope and intercept
+    """
+
+    features = np.column_stack([x, np.ones_like(x)])
+    weights = np.zeros(2)
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(offset + features @ weights)))
+        gradient = features.T @ (p - y) + l2 * weights
+        hessian = (features * (p * (1 - p))[:, None]).T @ features + l2 * np.eye(2)
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-10:
+            break
+    return float(weights[0]), float(weights[1])
+
+
+class FusionModel():
+    def __init__(self, base_rate: float = 0.5, terrain_priors: dict = None, slopes=(1.0, 1.0, 1.0), intercepts=(0.0, 0.0, 0.0), outcome_likelihoods=None):
+        """
+        Creates the FusionModel object, combining the revealed AI 1, AI 2 and human confidences of each
+        hex into the probability a mine is present
+
+        Each source is calibrated against the terrain prior, P(mine | terrain, confidence) =
+        sigmoid(logit(prior) + slope * logit(c) + intercept), so its term is the evidence it adds
+        beyond what the terrain already says. Treating the sources as independent given the mine and
+        terrain, the posterior log odds are the prior's plus the term of every revealed source. The
+        defaults take confidences at face value.
+
+        To look ahead at queries not yet made, what a source can report is summarized as a few outcomes,
+        each with its likelihood without and with a mine.
+
+        Params:
+            base_rate (float): The prior probability of a mine for terrain types without their own
+            terrain_priors (dict): The prior probability of a mine per terrain type, the base rate otherwise
+            slopes: The calibration slope of the AI 1, AI 2 and human confidences
+            intercepts: The calibration intercept of the AI 1, AI 2 and human confidences
+            outcome_likelihoods: The (3, 2, outcomes) likelihood of each outcome without and with a mine
+        """
+        self.base_rate = base_rate
+        self.terrain_priors = dict(terrain_priors or {})
+        self.slopes = np.array(slopes, dtype=np.float64)
+        self.intercepts = np.array(intercepts, dtype=np.float64)
+        if outcome_likelihoods is None:
+            outcome_likelihoods = np.tile(DEFAULT_OUTCOME_LIKELIHOODS, (3, 1, 1))
+        self.outcome_likelihoods = np.array(outcome_likelihoods, dtype=np.float64)
+
+    @classmethod
+    def fit(cls, states: list[GridState], smoothing: float = 2.0, outcomes: int = 3) -> 'FusionModel':
+        """
+        Fits the terrain priors and calibration of each source to the ground truth mines of scenarios
+
+        Params:
+            states (list[GridState]): The grid states of the scenarios, as loaded with no mines cleared
+            smoothing (float): The weight, in hexes, pulling each terrain prior towards the base rate
+            outcomes (int): The number of quantile bins summarizing the terms each source reports
+
+        Returns:
+            FusionModel - The fitted model
+        """
+
+        mines = np.concatenate([state.has(MINE_PRESENT) for state in states]).astype(np.float64)
+        confidence = np.concatenate([state.confidence for state in states])
+        terrain = np.concatenate([np.array(state.terrain_names)[state.terrain] for state in states])
+        base_rate = float(mines.mean())
+
+        terrain_priors = {}
+        for name in np.unique(terrain).tolist():
+            in_terrain = terrain == name
+            terrain_priors[name] = float((mines[in_terrain].sum() + smoothing * base_rate) / (in_terrain.sum() + smoothing))
+        offset = logit(np.array([terrain_priors[name] for name in terrain.tolist()]))
+        calibration = [fit_logistic(logit(confidence[:, column]), mines, offset) for column in range(confidence.shape[1])]
+        slopes = [slope for slope, _ in calibration]
+        intercepts = [intercept for _, intercept in calibration]
+
+        terms = np.array(slopes) * logit(confidence) + np.array(intercepts)
+        outcome_likelihoods = np.zeros((3, 2, outcomes))
+        for column in range(3):
+            edges = np.quantile(terms[:, column], np.linspace(0, 1, outcomes + 1)[1:-1])
+            bins = np.searchsorted(edges, terms[:, column], side='right')
+            for outcome in range(outcomes):
+                in_bin = bins == outcome
+                for mine in (0, 1):
+                    outcome_likelihoods[column, mine, outcome] = (np.count_nonzero(in_bin & (mines == mine)) + 1) / (np.count_nonzero(mines == mine) + outcomes)
+        return cls(base_rate, terrain_priors, slopes, intercepts, outcome_likelihoods)
+
+    @classmethod
+    def fit_files(cls, paths: list[str], smoothing: float = 2.0, outcomes: int = 3) -> 'FusionModel':
+        """
+        Fits the model to the ground truth of scenario JSON files
+
+        Params:
+            paths (list[str]): The paths of the scenario files
+            smoothing (float): The weight, in hexes, pulling each terrain prior towards the base rate
+            outcomes (int): The number of quantile bins summarizing the terms each source reports
+
+        Returns:
+            FusionModel - The fitted model
+        """
+
+        states = []
+        for path in paths:
+            with open(path) as json_data:
+                states.append(GridState.from_json(json.load(json_data)))
+        return cls.fit(states, smoothing, outcomes)
+
+    def evidence(self, state: GridState) -> np.ndarray:
+        """
+        Precomputes the log odds each hex starts at and each source would add if revealed
+
+        Confidences never change during a mission, so this is done once and posterior only has to
+        mask and sum it.
+
+        Params:
+            state (GridState): The grid state of the mission
+
+        Returns:
+            np.ndarray - The (hexes, 4) prior log odds followed by the AI 1, AI 2 and human terms
+        """
+
+        priors = np.array([self.terrain_priors.get(name, self.base_rate) for name in state.terrain_names], dtype=np.float64)
+        evidence = np.empty((len(state), 4), dtype=np.float64)
+        evidence[:, 0] = logit(priors)[state.terrain] if len(priors) else logit(self.base_rate)
+        evidence[:, 1:] = self.slopes * logit(state.confidence) + self.intercepts
+        return evidence
+
+    def posterior(self, state: GridState, evidence: np.ndarray = None) -> np.ndarray:
+        """
+        Computes the probability a mine is present in every hex from the sources revealed so far
+
+        Params:
+            state (GridState): The grid state of the mission
+            evidence (np.ndarray): The result of evidence for this state, computed if not given
+
+        Returns:
+            np.ndarray - The float64 posterior probability of each hex
+        """
+
+        if evidence is None:
+            evidence = self.evidence(state)
+        revealed = (state.flags[:, None] & QUERIED_FLAGS) != 0
+        log_odds = evidence[:, 0] + np.where(revealed, evidence[:, 1:], 0.0).sum(axis=1)
+        return 1 / (1 + np.exp(-log_odds))
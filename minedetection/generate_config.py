@@ -1,13 +1,258 @@
-import openpyxl
+import argparse
+import glob
+import hashlib
 import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+import openpyxl
+from scenario import CONFIG_DIR, DEFAULT_TIMES
+
+
+HEX_SHEET = 'Hex Table'
+MISSION_SHEET = 'Mission'
+# The Hex Table columns copied into each hex, the second scan being optional
+HEX_COLUMNS = ('Terrain', 'AI Confidence', 'Human Confidence', 'Mine')
+SECOND_SCAN_COLUMN = 'AI Second Scan Confidence'
+# Kept beside the outputs, recording the hash each one was built from
+MANIFEST = '.generate_config.json'
+# Changing how workbooks are converted changes every hash, so every workbook is rebuilt
+FORMAT_VERSION = 2
+
+
+def workbook_digest(path: str, overrides: dict) -> str:
+    """
+    Hashes a workbook's content along with everything else its output depends on
+
+    Params:
+        path (str): The path of the workbook
+        overrides (dict): The mission block entries set for every workbook
+
+    Returns:
+        str - The hex SHA-256 digest
+    """
+
+    digest = hashlib.sha256(json.dumps([FORMAT_VERSION, overrides], sort_keys=True).encode('utf-8'))
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_hex_sheet(workbook):
+    """
+    Finds the sheet of hexes of a workbook
+
+    Params:
+        workbook: The workbook
+
+    Returns:
+        The 'Hex Table' sheet, or else the first sheet whose header starts with 'Node'
+    """
+
+    if HEX_SHEET in workbook.sheetnames:
+        return workbook[HEX_SHEET]
+    for sheet in workbook.worksheets:
+        if next(sheet.iter_rows(max_row=1, max_col=1, values_only=True), (None,))[0] == 'Node':
+            return sheet
+    raise ValueError("The workbook has no %s sheet" % HEX_SHEET)
+
+
+def read_hexes(sheet) -> dict:
+    """
+    Reads the hexes of a Hex Table sheet, finding its columns by the header row
+
+    Params:
+        sheet: The worksheet, one row per hex below a header row starting with 'Node'
+
+    Returns:
+        dict - The hexes keyed by label, in row order
+    """
+
+    rows = sheet.iter_rows(values_only=True)
+    header = [name.strip() if isinstance(name, str) else name for name in next(rows, ())]
+    missing = [name for name in ('Node',) + HEX_COLUMNS if name not in header]
+    if missing:
+        raise ValueError("%s has no %s column" % (sheet.title, ", ".join(missing)))
+    node = header.index('Node')
+    columns = [(name, header.index(name)) for name in HEX_COLUMNS]
+    second_scan = header.index(SECOND_SCAN_COLUMN) if SECOND_SCAN_COLUMN in header else None
+
+    hexes = {}
+    for row in rows:
+        if node >= len(row) or row[node] is None:
+            continue
+        values = {name: row[column] for name, column in columns}
+        if second_scan is not None and second_scan < len(row) and row[second_scan] is not None:
+            values[SECOND_SCAN_COLUMN] = row[second_scan]
+        hexes[str(row[node]).strip()] = values
+    return hexes
+
+
+def read_mission(sheet) -> dict:
+    """
+    Reads a Mission sheet of one key and value per row, such as 'UGV clear time' and 60
+
+    Params:
+        sheet: The worksheet
+
+    Returns:
+        dict - The mission block entries
+    """
+
+    return {str(row[0]).strip(): row[1] for row in sheet.iter_rows(max_col=2, values_only=True)
+            if len(row) > 1 and row[0] is not None and row[1] is not None}
+
+
+def convert_workbook(path: str, output: str, overrides: dict = None) -> int:
+    """
+    Converts a workbook to a scenario JSON file
+
+    The workbook is opened read only, so rows stream from the file rather than being loaded into
+    memory up front. The hexes come from the 'Hex Table' sheet, or else the first sheet whose header
+    starts with 'Node'. The mission block starts from the example scenarios' times and the first and
+    last hexes, then takes the workbook's 'Mission' sheet if it has one, then the overrides, so the
+    output depends only on the workbook and the overrides.
+
+    Params:
+        path (str): The path of the workbook
+        output (str): The path of the scenario JSON file to write
+        overrides (dict): Mission block entries set for every workbook
+
+    Returns:
+        int - The number of hexes written
+    """
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        hexes = read_hexes(find_hex_sheet(workbook))
+        if not hexes:
+            raise ValueError("%s has no hexes" % path)
+        mission = dict(DEFAULT_TIMES, start=next(iter(hexes)), end=next(reversed(hexes)))
+        if MISSION_SHEET in workbook.sheetnames:
+            mission.update(read_mission(workbook[MISSION_SHEET]))
+    finally:
+        workbook.close()
+    mission.update(overrides or {})
+
+    # Written aside then moved over the output, so an interrupted build never leaves half a file
+    temporary = output + '.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(dict(mission=mission, **hexes), file)
+    os.replace(temporary, output)
+    return len(hexes)
+
+
+def find_workbooks(inputs: list[str]) -> list[str]:
+    """
+    Lists the workbooks to convert
+
+    Params:
+        inputs (list[str]): Workbook paths and directories, whose .xlsx files are all converted
+
+    Returns:
+        list[str] - The workbook paths, skipping the lock files Excel leaves beside open workbooks
+    """
+
+    paths = []
+    for path in inputs:
+        found = sorted(glob.glob(os.path.join(path, '*.xlsx'))) if os.path.isdir(path) else [path]
+        paths.extend(workbook for workbook in found if not os.path.basename(workbook).startswith('~$'))
+    return paths
+
+
+def build(inputs: list[str], output_dir: str, overrides: dict = None, workers: int = None, force: bool = False) -> dict:
+    """
+    Converts every changed workbook to a scenario JSON file across a pool of worker processes
+
+    Each output directory keeps a manifest of the hash each output was built from. A workbook
+    whose hash matches and whose output still exists is skipped, so rebuilding a directory of
+    hundreds of workbooks only converts the ones analysts changed.
+
+    Params:
+        inputs (list[str]): Workbook paths and directories
+        output_dir (str): The directory to write the scenario JSON files to
+        overrides (dict): Mission block entries set for every workbook
+        workers (int): The number of worker processes, defaults to the number of CPUs; 1 runs in process
+        force (bool): Whether to convert workbooks even if unchanged
+
+    Returns:
+        dict - The 'converted', 'skipped' and 'failed' workbook paths, failures mapped to their error
+    """
+
+    overrides = overrides or {}
+    manifests = {}
+    tasks = []
+    skipped = []
+    for path in find_workbooks(inputs):
+        directory = output_dir
+        output = os.path.join(directory, os.path.splitext(os.path.basename(path))[0] + '.json')
+        if directory not in manifests:
+            os.makedirs(directory, exist_ok=True)
+            try:
+                with open(os.path.join(directory, MANIFEST)) as json_data:
+                    manifests[directory] = json.load(json_data)
+            except (OSError, ValueError):
+                manifests[directory] = {}
+        digest = workbook_digest(path, overrides)
+        key = os.path.relpath(path, directory)
+        if not force and manifests[directory].get(key) == digest and os.path.exists(output):
+            skipped.append(path)
+        else:
+            tasks.append((path, output, directory, key, digest))
+
+    converted = []
+    failed = {}
+    workers = min(workers or os.cpu_count() or 1, max(1, len(tasks)))
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        if executor is not None:
+            futures = [executor.submit(convert_workbook, path, output, overrides) for path, output, _, _, _ in tasks]
+        for position, (path, output, directory, key, digest) in enumerate(tasks):
+            try:
+                if executor is None:
+                    convert_workbook(path, output, overrides)
+                else:
+                    futures[position].result()
+            except Exception as error:
+                failed[path] = str(error)
+                manifests[directory].pop(key, None)
+                continue
+            manifests[directory][key] = digest
+            converted.append(path)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    for directory, manifest in manifests.items():
+        with open(os.path.join(directory, MANIFEST), 'w') as file:
+            json.dump(manifest, file, indent=1, sort_keys=True)
+    return {'converted': converted, 'skipped': skipped, 'failed': failed}
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Convert scenario workbooks to scenario JSON files, skipping unchanged workbooks")
+    parser.add_argument("inputs", nargs="+", help="workbooks and directories of workbooks")
+    parser.add_argument("--output", required=True, help="the directory to write the JSON files to, other than the config directory")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="set one mission block entry for every workbook, such as 'UGV clear time=20' or 'end=JH'")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the number of CPUs")
+    parser.add_argument("--force", action="store_true", help="convert every workbook even if unchanged")
+    args = parser.parse_args(argv)
+    # The shipped scenarios are edited by hand, so converting never overwrites them
+    if os.path.realpath(args.output) == os.path.realpath(CONFIG_DIR):
+        parser.error("--output must not be the config directory %s" % CONFIG_DIR)
 
-wb=openpyxl.load_workbook("../config/example_scenario_1.xlsx")
-sheet = wb['Hex Table']
+    overrides = {}
+    for setting in args.set:
+        key, value = (part.strip() for part in setting.split('=', 1))
+        try:
+            overrides[key] = json.loads(value)
+        except ValueError:
+            overrides[key] = value
+    report = build(args.inputs, args.output, overrides, args.workers, args.force)
+    for path, error in report['failed'].items():
+        print("Failed %s: %s" % (path, error))
+    print("Converted %d workbooks, skipped %d unchanged, %d failed" % (len(report['converted']), len(report['skipped']), len(report['failed'])))
 
-json_data = {}
 
-for col in sheet.iter_rows(values_only=True):
-    if col[0] != 'Node':
-        json_data[col[0]] = {'Terrain': col[1], 'AI Confidence': col[2], 'Human Confidence': col[3], 'Mine': col[4], 'AI Second Scan Confidence': col[5]}
-with open('../config/example_scenario_1.json', 'w') as file:
-    json.dump(json_data, file)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+from dataclasses import dataclass
+import numpy as np
+from fusion import logit
+from hexgrid import HexGrid
+from scenario import DEFAULT_TIMES, Scenario, write_pack
+
+
+@dataclass
+class TerrainModel:
+    weight: float
+    mine_rate: float
+    ai_confidence: float
+    human_confidence: float
+    ai_noise: float = 0.5
+    human_noise: float = 0.5
+    ai_signal: float = 0.0
+    human_signal: float = 0.0
+
+
+# Terrain shares, mine rates and typical confidences of the example scenarios
+DEFAULT_TERRAIN = {
+    "Grassy": TerrainModel(0.23, 0.39, 0.95, 0.91),
+    "Rocky": TerrainModel(0.24, 0.25, 0.62, 0.67),
+    "Sandy": TerrainModel(0.20, 0.40, 0.95, 0.95),
+    "Swampy": TerrainModel(0.11, 0.18, 0.73, 0.75),
+    "Wooded": TerrainModel(0.22, 0.09, 0.76, 0.72),
+}
+
+
+def smooth(field: np.ndarray, neighbors: np.ndarray, passes: int) -> np.ndarray:
+    """
+    Averages every hex with its neighbors, making nearby hexes alike, then restandardizes
+
+    Params:
+        field (np.ndarray): The (scenarios, hexes) standard normal values to smooth
+        neighbors (np.ndarray): The (hexes, 6) neighbor table, -1 where a neighbor is off the grid
+        passes (int): The number of averaging passes, more gives larger patches
+
+    Returns:
+        np.ndarray - The smoothed field with zero mean and unit variance per scenario
+    """
+
+    if passes <= 0:
+        return field
+    hexes = neighbors.shape[0]
+    # Off grid neighbors point at an extra column of zeros and aren't counted
+    table = np.where(neighbors >= 0, neighbors, hexes)
+    counts = 1 + (neighbors >= 0).sum(axis=1)
+    padded = np.zeros((field.shape[0], hexes + 1))
+    for _ in range(passes):
+        padded[:, :hexes] = field
+        field = (field + padded[:, table].sum(axis=2)) / counts
+    field = field - field.mean(axis=1, keepdims=True)
+    return field / np.maximum(field.std(axis=1, keepdims=True), 1e-12)
+
+
+class ScenarioGenerator():
+    def __init__(self, rows: int = 10, cols: int = 10, terrain: dict = None, mine_density: float = None, clustering: float = 0.0,
+                 mine_smoothing: int = 2, terrain_smoothing: int = 2, second_scan_correlation: float = 0.8, times: dict = None,
+                 end: str = None, decimals: int = 2, seed: int = 0, batch_size: int = 1000):
+        """
+        Creates the ScenarioGenerator object, sampling random scenarios from a model of the terrain,
+        mines and estimates
+
+        Every scenario of a batch is sampled at once as (scenarios, hexes) arrays:
+            Terrain: Each hex takes the terrain type with the largest log share plus Gumbel noise,
+                which follows the shares exactly. Smoothing the noise over neighboring hexes first
+                makes the terrain form patches, keeping the shares roughly.
+            Mines: Each hex has a mine with its terrain's mine rate, scaled to mine_density overall
+                if given. Clustering adds a smoothed standard normal field times clustering to the
+                log odds, so mines bunch together.
+            Estimates: A confidence is the logit of its terrain's typical confidence, plus its signal
+                towards 1 with a mine and towards 0 without, plus normal noise with its terrain's
+                spread, mapped back to (0, 1). The second AI scan's noise is correlated with the
+                first's by second_scan_correlation.
+
+        With no signal, as in the defaults, the confidences say how sure the estimate is rather than
+        whether a mine is there, as in the example scenarios.
+
+        Params:
+            rows (int): The number of rows of the grid
+            cols (int): The number of columns of the grid
+            terrain (dict): The TerrainModel of each terrain type, the example scenarios' if not given
+            mine_density (float): The overall share of hexes with a mine, the terrain mine rates' if not given
+            clustering (float): The weight of the smoothed field in the mine log odds, 0 for independent mines
+            mine_smoothing (int): The number of smoothing passes of the mine field
+            terrain_smoothing (int): The number of smoothing passes of the terrain noise, 0 for independent hexes
+            second_scan_correlation (float): The correlation between the noise of the two AI scans of a hex
+            times (dict): The mission block times, the example scenarios' if not given
+            end (str): The label of the end hex, the last hex of the grid if not given
+            decimals (int): The number of decimals confidences are rounded to, None to keep them exact
+            seed (int): The seed of the random generator
+            batch_size (int): The number of scenarios sampled at once
+        """
+        self.grid = HexGrid.from_shape(rows, cols)
+        self.terrain = dict(terrain or DEFAULT_TERRAIN)
+        self.mine_density = mine_density
+        self.clustering = clustering
+        self.mine_smoothing = mine_smoothing
+        self.terrain_smoothing = terrain_smoothing
+        self.second_scan_correlation = second_scan_correlation
+        self.times = dict(times or DEFAULT_TIMES)
+        self.end = end or self.grid.labels[-1]
+        self.decimals = decimals
+        self.seed = seed
+        self.batch_size = batch_size
+
+    def sample(self, count: int, rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Samples the hexes of a number of scenarios at once
+
+        Params:
+            count (int): The number of scenarios
+            rng (np.random.Generator): The random generator
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray] - The (count, hexes) uint8 terrain codes into the
+            sorted terrain names, the (count, hexes, 3) AI 1, AI 2 and human confidences and the
+            (count, hexes) mine flags
+        """
+        names = sorted(self.terrain)
+        models = [self.terrain[name] for name in names]
+        column = lambda field: np.array([getattr(model, field) for model in models], dtype=np.float64)
+        hexes = len(self.grid)
+        neighbors = self.grid.neighbor_table()
+
+        weights = column('weight')
+        gumbel = rng.gumbel(size=(count * len(names), hexes))
+        if self.terrain_smoothing > 0:
+            # Restandardized to the spread of Gumbel noise so the shares still roughly hold
+            gumbel = smooth(gumbel - np.euler_gamma, neighbors, self.terrain_smoothing) * (np.pi / np.sqrt(6))
+        scores = gumbel.reshape(count, len(names), hexes) + np.log(weights / weights.sum())[:, None]
+        terrain = scores.argmax(axis=1).astype(np.uint8)
+
+        rates = column('mine_rate')
+        if self.mine_density is not None:
+            rates = np.clip(rates * self.mine_density / (rates @ weights / weights.sum()), 0.0, 1.0)
+        log_odds = logit(rates)[terrain]
+        if self.clustering:
+            log_odds = log_odds + self.clustering * smooth(rng.standard_normal((count, hexes)), neighbors, self.mine_smoothing)
+        mines = rng.random((count, hexes)) < 1 / (1 + np.exp(-log_odds))
+
+        sign = np.where(mines, 1.0, -1.0)
+        noise = rng.standard_normal((3, count, hexes))
+        rho = self.second_scan_correlation
+        noise[1] = rho * noise[0] + np.sqrt(max(0.0, 1 - rho * rho)) * noise[1]
+        confidence = np.empty((count, hexes, 3))
+        for index, (source, scan) in enumerate((('ai', 0), ('ai', 1), ('human', 2))):
+            center = logit(column(source + '_confidence'))[terrain]
+            signal = column(source + '_signal')[terrain] * sign
+            spread = column(source + '_noise')[terrain]
+            confidence[:, :, index] = 1 / (1 + np.exp(-(center + signal + spread * noise[scan])))
+        if self.decimals is not None:
+            confidence = np.round(confidence, self.decimals)
+        return terrain, confidence, mines
+
+    def generate(self, count: int, prefix: str = "scenario"):
+        """
+        Generates scenarios, sampling them a batch at a time
+
+        The same seed, count and batch size always give the same scenarios.
+
+        Params:
+            count (int): The number of scenarios
+            prefix (str): The start of each scenario's name, followed by its number
+
+        Yields:
+            Scenario - The scenarios, sharing one grid
+        """
+        names = tuple(sorted(self.terrain))
+        mission = dict(self.times, start=self.grid.labels[0], end=self.end)
+        width = len(str(max(count - 1, 0)))
+        for batch, first in enumerate(range(0, count, self.batch_size)):
+            rng = np.random.default_rng([self.seed, batch])
+            size = min(self.batch_size, count - first)
+            terrain, confidence, mines = self.sample(size, rng)
+            for offset in range(size):
+                yield Scenario("%s_%0*d.json" % (prefix, width, first + offset), self.grid, names,
+                               terrain[offset], confidence[offset], mines[offset], dict(mission))
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Generate random scenarios")
+    parser.add_argument("output", help="the directory to write JSON scenarios to, or the pack file to write with --pack")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=10)
+    parser.add_argument("--cols", type=int, default=10)
+    parser.add_argument("--mine-density", type=float, default=None, help="overall share of hexes with a mine")
+    parser.add_argument("--clustering", type=float, default=0.0, help="how strongly mines bunch together")
+    parser.add_argument("--terrain-smoothing", type=int, default=2, help="smoothing passes of the terrain, 0 for independent hexes")
+    parser.add_argument("--second-scan-correlation", type=float, default=0.8)
+    parser.add_argument("--signal", type=float, default=0.0, help="how strongly every estimate leans towards the truth")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prefix", default="scenario")
+    parser.add_argument("--pack", action="store_true", help="write a single scenario pack instead of JSON files")
+    args = parser.parse_args(argv)
+
+    terrain = {name: TerrainModel(**dict(vars(model), ai_signal=args.signal, human_signal=args.signal)) for name, model in DEFAULT_TERRAIN.items()}
+    generator = ScenarioGenerator(args.rows, args.cols, terrain, args.mine_density, args.clustering, terrain_smoothing=args.terrain_smoothing,
+                                  second_scan_correlation=args.second_scan_correlation, seed=args.seed)
+    scenarios = generator.generate(args.count, args.prefix)
+    if args.pack:
+        written = write_pack(args.output, scenarios)
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        written = 0
+        for scenario in scenarios:
+            with open(os.path.join(args.output, scenario.name), 'w') as file:
+                json.dump(scenario.to_json(), file)
+            written += 1
+    print("Generated %d scenarios into %s" % (written, args.output))
+
+
+if __name__ == "__main__":
+    main()
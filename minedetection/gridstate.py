@@ -0,0 +1,306 @@
+import numpy as np
+from hexagon import Hexagon, MINE_PRESENT, MINE_FOUND, MINE_CLEARED, AI_1_QUERIED, AI_2_QUERIED, HUMAN_QUERIED, UAV_1_SCANNED, UAV_2_SCANNED, AI_1, AI_2, HUMAN, SCAN_SCANNED, SCAN_QUERIED  # noqa: F401
+from hexgrid import HexGrid
+
+
+# The most UAVs a grid state can track, one bit each of the per UAV masks
+MAX_UAVS = 64
+
+
+def mask_dtype(uavs: int) -> np.dtype:
+    """
+    Gets the smallest unsigned integer type with a bit per UAV
+
+    Parameters:
+        uavs (int): The number of UAVs
+
+    Returns:
+        np.dtype - uint8 for up to 8 UAVs, then uint16, uint32 and uint64
+    """
+    for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+        if uavs <= np.iinfo(dtype).bits:
+            return np.dtype(dtype)
+    raise ValueError("A mission can have at most %d UAVs" % MAX_UAVS)
+
+
+class GridState():
+    def __init__(self, grid: HexGrid, terrain_names: tuple[str], terrain: np.ndarray, confidence: np.ndarray, mines: np.ndarray, uavs: int = 2):
+        """
+        Creates the GridState object holding every hex of a mission as columns of arrays
+
+        Per hex the state is a terrain code, the three confidences and one byte of flag bits, so whole
+        grid questions such as "which hexes has either UAV scanned" are single array operations.
+        Which UAVs scanned a hex and had their AI queried for it are two masks of a bit per UAV, as
+        small an integer as holds them, so sixteen UAVs take two bytes per hex each and checking or
+        setting a UAV's bit takes the same time however many there are. Indexing or iterating yields
+        lightweight Hexagon views over a row.
+
+        Parameters:
+            grid (HexGrid): The labels and layout of the hexes
+            terrain_names (tuple[str]): The terrain type of each terrain code
+            terrain (np.ndarray): The terrain code of each hex
+            confidence (np.ndarray): The (hexes, 3) AI 1, AI 2 and human confidences a mine is present
+            mines (np.ndarray): True where a mine is present
+            uavs (int): The number of UAVs whose scans and queries are tracked
+        """
+        self.__grid = grid
+        self.__terrain_names = tuple(terrain_names)
+        self.__terrain = np.ascontiguousarray(terrain, dtype=np.uint8)
+        self.__confidence = np.ascontiguousarray(confidence, dtype=np.float64)
+        self.__flags = np.where(np.asarray(mines, dtype=bool), MINE_PRESENT, 0).astype(np.uint8)
+        self.__uavs = uavs
+        self.__scanned = np.zeros(len(self.__flags), dtype=mask_dtype(uavs))
+        self.__ai_queried = np.zeros(len(self.__flags), dtype=mask_dtype(uavs))
+
+    @classmethod
+    def from_json(cls, data: dict) -> 'GridState':
+        """
+        Creates the grid state from the hexes of a scenario JSON object
+
+        Parameters:
+            data (dict): The scenario keyed by hex label, any "mission" entry is skipped
+
+        Returns:
+            GridState - The grid state with no hexes scanned or queried
+        """
+        labels = [label for label in data.keys() if label != "mission"]
+        terrain_names = sorted({data[label]['Terrain'] for label in labels})
+        terrain_codes = {name: code for code, name in enumerate(terrain_names)}
+        terrain = [terrain_codes[data[label]['Terrain']] for label in labels]
+        confidence = [(data[label]['AI Confidence'],
+                       data[label].get('AI Second Scan Confidence', data[label]['AI Confidence']),
+                       data[label]['Human Confidence']) for label in labels]
+        mines = [data[label]['Mine'] == 1 for label in labels]
+        return cls(HexGrid(labels), terrain_names, terrain, np.array(confidence, dtype=np.float64).reshape(-1, 3), mines)
+
+    @property
+    def grid(self) -> HexGrid:
+        """
+        Gets the grid field
+
+        Returns:
+            HexGrid - The labels and layout of the hexes
+        """
+        return self.__grid
+
+    @property
+    def terrain_names(self) -> tuple[str]:
+        """
+        Gets the terrain_names field
+
+        Returns:
+            tuple[str] - The terrain type of each terrain code
+        """
+        return self.__terrain_names
+
+    @property
+    def terrain(self) -> np.ndarray:
+        """
+        Gets the terrain field
+
+        Returns:
+            np.ndarray - The uint8 terrain code of every hex
+        """
+        return self.__terrain
+
+    @property
+    def confidence(self) -> np.ndarray:
+        """
+        Gets the confidence field
+
+        Returns:
+            np.ndarray - The (hexes, 3) AI 1, AI 2 and human confidences
+        """
+        return self.__confidence
+
+    @property
+    def flags(self) -> np.ndarray:
+        """
+        Gets the flags field
+
+        Returns:
+            np.ndarray - The uint8 flag bits of every hex
+        """
+        return self.__flags
+
+    @property
+    def uavs(self) -> int:
+        """
+        Gets the uavs field
+
+        Returns:
+            int - The number of UAVs whose scans and queries are tracked
+        """
+        return self.__uavs
+
+    @property
+    def scanned(self) -> np.ndarray:
+        """
+        Gets the scanned field
+
+        Returns:
+            np.ndarray - The mask of every hex, bit n - 1 set once UAV n has scanned it
+        """
+        return self.__scanned
+
+    @property
+    def ai_queried(self) -> np.ndarray:
+        """
+        Gets the ai_queried field
+
+        Returns:
+            np.ndarray - The mask of every hex, bit n - 1 set once UAV n's AI has been queried for it
+        """
+        return self.__ai_queried
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Gets the memory held by the per hex arrays, not counting the grid
+
+        Returns:
+            int - The number of bytes
+        """
+        return self.__terrain.nbytes + self.__confidence.nbytes + self.__flags.nbytes + self.__scanned.nbytes + self.__ai_queried.nbytes
+
+    def copy(self) -> 'GridState':
+        """
+        Creates a grid state sharing this one's grid, terrain and confidences, which never change
+        during a mission, with its own copy of the flags and UAV masks
+
+        Returns:
+            GridState - The copy
+        """
+        state = GridState.__new__(GridState)
+        state.__dict__.update(self.__dict__)
+        state.__flags = self.__flags.copy()
+        state.__scanned = self.__scanned.copy()
+        state.__ai_queried = self.__ai_queried.copy()
+        return state
+
+    def __len__(self) -> int:
+        return len(self.__flags)
+
+    def __getitem__(self, index: int) -> Hexagon:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("hex index out of range")
+        return Hexagon(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield Hexagon(self, index)
+
+    def test(self, index: int, flag: int) -> bool:
+        """
+        Checks whether a hex has any of the flag bits set
+
+        Parameters:
+            index (int): The index of the hex
+            flag (int): The flag bits to check
+
+        Returns:
+            bool - True if any of the bits are set
+        """
+        return bool(self.__flags[index] & flag)
+
+    def set(self, index: int, flag: int, value: bool = True):
+        """
+        Sets or clears flag bits of a hex
+
+        Parameters:
+            index (int): The index of the hex, or an array of the indices of many hexes
+            flag (int): The flag bits to change
+            value (bool): True to set the bits, False to clear them
+        """
+        if value:
+            self.__flags[index] |= flag
+        else:
+            self.__flags[index] &= ~flag & 0xFF
+
+    def has(self, flag: int) -> np.ndarray:
+        """
+        Checks every hex for any of the flag bits
+
+        Parameters:
+            flag (int): The flag bits to check
+
+        Returns:
+            np.ndarray - True where any of the bits are set
+        """
+        return (self.__flags & flag) != 0
+
+    def has_all(self, flag: int) -> np.ndarray:
+        """
+        Checks every hex for all of the flag bits
+
+        Parameters:
+            flag (int): The flag bits to check
+
+        Returns:
+            np.ndarray - True where all of the bits are set
+        """
+        return (self.__flags & flag) == flag
+
+    def count(self, flag: int) -> int:
+        """
+        Counts the hexes with any of the flag bits set
+
+        Parameters:
+            flag (int): The flag bits to check
+
+        Returns:
+            int - The number of hexes
+        """
+        return int(np.count_nonzero(self.__flags & flag))
+
+    def scan(self, index: int, uav_number: int, ai_scan: int):
+        """
+        Marks a hex scanned by a UAV
+
+        Parameters:
+            index (int): The index of the hex, or an array of the indices of many hexes
+            uav_number (int): The number of the UAV
+            ai_scan (int): The AI scan the UAV carries, whose scanned flag is also set
+        """
+        self.__scanned[index] |= 1 << (uav_number - 1)
+        self.__flags[index] |= SCAN_SCANNED[ai_scan]
+
+    def is_scanned(self, index: int, uav_number: int) -> bool:
+        """
+        Checks whether a UAV has scanned a hex
+
+        Parameters:
+            index (int): The index of the hex
+            uav_number (int): The number of the UAV
+
+        Returns:
+            bool - True if the UAV has scanned the hex
+        """
+        return bool(int(self.__scanned[index]) >> (uav_number - 1) & 1)
+
+    def query_ai(self, index: int, uav_number: int, ai_scan: int):
+        """
+        Marks a UAV's AI queried for a hex
+
+        Parameters:
+            index (int): The index of the hex
+            uav_number (int): The number of the UAV
+            ai_scan (int): The AI scan the UAV carries, whose queried flag is also set
+        """
+        self.__ai_queried[index] |= 1 << (uav_number - 1)
+        self.__flags[index] |= SCAN_QUERIED[ai_scan]
+
+    def is_ai_queried(self, index: int, uav_number: int) -> bool:
+        """
+        Checks whether a UAV's AI has been queried for a hex
+
+        Parameters:
+            index (int): The index of the hex
+            uav_number (int): The number of the UAV
+
+        Returns:
+            bool - True if the UAV's AI has been queried for the hex
+        """
+        return bool(int(self.__ai_queried[index]) >> (uav_number - 1) & 1)
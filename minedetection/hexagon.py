@@ -1,32 +1,165 @@
+# Bits of the per hex flags held by a GridState. The AI and UAV bits are per AI scan: AI_1_QUERIED
+# is set once any UAV carrying the first scan has been queried for the hex, UAV_1_SCANNED once any
+# such UAV has scanned it, which for the default pair of UAVs is UAV 1 itself. Which UAVs did so is
+# kept in the GridState's per UAV masks.
+MINE_PRESENT = 1
+MINE_FOUND = 2
+MINE_CLEARED = 4
+AI_1_QUERIED = 8
+AI_2_QUERIED = 16
+HUMAN_QUERIED = 32
+UAV_1_SCANNED = 64
+UAV_2_SCANNED = 128
+
+# Columns of the confidence array held by a GridState, the AI columns being the two AI scans
+AI_1 = 0
+AI_2 = 1
+HUMAN = 2
+
+# The scanned and queried flag bits of each AI scan
+SCAN_SCANNED = (UAV_1_SCANNED, UAV_2_SCANNED)
+SCAN_QUERIED = (AI_1_QUERIED, AI_2_QUERIED)
+
+
+def _flag_property(flag: int, doc: str) -> property:
+    """
+    Creates a read/write bool property over one flag bit of the hexagon's row
+
+    Parameters:
+        flag (int): The flag bit
+        doc (str): The property's docstring
+
+    Returns:
+        property - The property
+    """
+
+    def getter(self) -> bool:
+        return self._Hexagon__state.test(self._Hexagon__index, flag)
+
+    def setter(self, value: bool):
+        self._Hexagon__state.set(self._Hexagon__index, flag, value)
+
+    return property(getter, setter, doc=doc)
+
+
 class Hexagon():
-    def __init__(self, label: str, terrain: str, ai_1_confidence: float, ai_2_confidence: float, human_confidence: float, mine_present: int):
+    __slots__ = ('__state', '__index')
+
+    def __init__(self, state, index: int):
         """
-        Creates a Hexagon object
+        Creates a Hexagon object, a view over one row of a mission's GridState
 
         Parameters:
-            label (str): The hexagon's label
-            terrain (str): Terrain type associated with the hex
-            ai_confidence_1 (float): The AI confidence a mine is present for the first UAV
-            ai_confidence_2 (float): The AI confidence a mine is present for the second UAV
-            human_confidence (float): The human confidence a mine is present
-            mine_present (int): 1 if a mine is present within this hex, 0 otherwise
-        """
-        self.label = label
-        self.terrain = terrain
-        self.ai_1_confidence = ai_1_confidence
-        self.ai_2_confidence = ai_2_confidence
-        self.human_confidence = human_confidence
-        if mine_present == 1:
-            self.landmine_present = True
-        else:
-            self.landmine_present = False
-        self.landmine_found = False
-        self.landmine_cleared = False
-        self.ai_1_queried = False
-        self.ai_2_queried = False
-        self.human_queried = False
-        self.uav_1_scanned = False
-        self.uav_2_scanned = False
+            state (GridState): The grid state holding the hexagon's data
+            index (int): The index of the hexagon within the grid state
+        """
+        self.__state = state
+        self.__index = index
+
+    @property
+    def index(self) -> int:
+        """
+        Gets the index field
+
+        Returns:
+            int - The index of the hexagon within the grid state
+        """
+        return self.__index
+
+    @property
+    def label(self) -> str:
+        """
+        Gets the hexagon's label
+
+        Returns:
+            str - The label
+        """
+        return self.__state.grid.labels[self.__index]
+
+    @property
+    def terrain(self) -> str:
+        """
+        Gets the terrain type associated with the hex
+
+        Returns:
+            str - The terrain type
+        """
+        return self.__state.terrain_names[self.__state.terrain[self.__index]]
+
+    @property
+    def ai_1_confidence(self) -> float:
+        """
+        Gets the AI confidence a mine is present for the first UAV
+
+        Returns:
+            float - The confidence
+        """
+        return float(self.__state.confidence[self.__index, AI_1])
+
+    @property
+    def ai_2_confidence(self) -> float:
+        """
+        Gets the AI confidence a mine is present for the second UAV
+
+        Returns:
+            float - The confidence
+        """
+        return float(self.__state.confidence[self.__index, AI_2])
+
+    @property
+    def human_confidence(self) -> float:
+        """
+        Gets the human confidence a mine is present
+
+        Returns:
+            float - The confidence
+        """
+        return float(self.__state.confidence[self.__index, HUMAN])
+
+    def ai_confidence(self, ai_scan: int) -> float:
+        """
+        Gets the AI confidence a mine is present from one of the AI scans
+
+        Parameters:
+            ai_scan (int): 0 for the first scan, 1 for the second
+
+        Returns:
+            float - The confidence
+        """
+        return float(self.__state.confidence[self.__index, ai_scan])
+
+    def scanned_by(self, uav_number: int) -> bool:
+        """
+        Checks whether a UAV has scanned this hex
+
+        Parameters:
+            uav_number (int): The number of the UAV
+
+        Returns:
+            bool - True if the UAV has scanned the hex
+        """
+        return self.__state.is_scanned(self.__index, uav_number)
+
+    def ai_queried_by(self, uav_number: int) -> bool:
+        """
+        Checks whether a UAV's AI has been queried for this hex
+
+        Parameters:
+            uav_number (int): The number of the UAV
+
+        Returns:
+            bool - True if the UAV's AI has been queried for the hex
+        """
+        return self.__state.is_ai_queried(self.__index, uav_number)
+
+    landmine_present = _flag_property(MINE_PRESENT, "True if a mine is present within this hex")
+    landmine_found = _flag_property(MINE_FOUND, "True if the UGV has detected the mine within this hex")
+    landmine_cleared = _flag_property(MINE_CLEARED, "True if the UGV has cleared the mine within this hex")
+    ai_1_queried = _flag_property(AI_1_QUERIED, "True if the first AI scan's estimate has been queried for this hex")
+    ai_2_queried = _flag_property(AI_2_QUERIED, "True if the second AI scan's estimate has been queried for this hex")
+    human_queried = _flag_property(HUMAN_QUERIED, "True if the human has been queried for this hex")
+    uav_1_scanned = _flag_property(UAV_1_SCANNED, "True if a UAV carrying the first AI scan has scanned this hex")
+    uav_2_scanned = _flag_property(UAV_2_SCANNED, "True if a UAV carrying the second AI scan has scanned this hex")
 
     def __eq__(self, other) -> bool:
         """
@@ -46,10 +179,13 @@ class Hexagon():
 
     def __hash__(self) -> int:
         """
-        Hash function for NetworkEdge
+        Hash function for Hexagon
 
         Returns:
-            int - The hash code for the NetworkEdge
+            int - The hash code for the Hexagon
         """
 
-        return hash((self.label, self.terrain, self.ai_1_confidence, self.ai_2_confidence, self.human_confidence, self.landmine_present))
\ No newline at end of file
+        return hash((self.label, self.terrain, self.ai_1_confidence, self.ai_2_confidence, self.human_confidence, self.landmine_present))
+
+    def __repr__(self) -> str:
+        return "Hexagon(%s)" % self.label
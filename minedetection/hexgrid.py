@@ -0,0 +1,367 @@
+from array import array
+import numpy as np
+
+
+# Axial (q, r) steps to the six neighbors of a hex
+AXIAL_DIRECTIONS = np.array([(1, 0), (1, -1), (0, -1), (-1, 0), (-1, 1), (0, 1)], dtype=np.int32)
+
+
+def letters_to_number(letters: str) -> int:
+    """
+    Decodes a spreadsheet style letter number, where A is 0, Z is 25 and AA is 26
+
+    Parameters:
+        letters (str): The upper case letters
+
+    Returns:
+        int - The decoded number
+    """
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - ord('A') + 1
+    return number - 1
+
+
+def number_to_letters(number: int) -> str:
+    """
+    Encodes a number as spreadsheet style letters, the inverse of letters_to_number
+
+    Parameters:
+        number (int): The number to encode
+
+    Returns:
+        str - The upper case letters
+    """
+    letters = ""
+    number += 1
+    while number > 0:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def parse_label(label: str) -> tuple[int, int]:
+    """
+    Gets the row and column of a hex label
+
+    Labels on grids of up to 26x26 are two letters, the row followed by the column (e.g. "JH"). Larger
+    grids separate the row and column letters with a dash (e.g. "AB-CD").
+
+    Parameters:
+        label (str): The label of the hex
+
+    Returns:
+        tuple[int, int] - The row and column of the hex
+    """
+    if '-' in label:
+        row, col = label.split('-')
+        return letters_to_number(row), letters_to_number(col)
+    if len(label) != 2:
+        raise ValueError("Hex label %s is not a row and column" % label)
+    return letters_to_number(label[0]), letters_to_number(label[1])
+
+
+def format_label(row: int, col: int) -> str:
+    """
+    Gets the label of the hex at a row and column, the inverse of parse_label
+
+    Parameters:
+        row (int): The row of the hex
+        col (int): The column of the hex
+
+    Returns:
+        str - The label of the hex
+    """
+    if row < 26 and col < 26:
+        return chr(ord('A') + row) + chr(ord('A') + col)
+    return number_to_letters(row) + '-' + number_to_letters(col)
+
+
+class HexGrid():
+    def __init__(self, labels: list[str], rows: np.ndarray = None, cols: np.ndarray = None):
+        """
+        Creates the HexGrid object, indexing the labels and precomputing every hex's neighbors
+
+        Hexes are laid out in rows and columns with the odd columns shifted down half a hex. Internally
+        each hex also has axial coordinates (q, r), in which the six neighbors are fixed steps and the
+        distance between hexes is a closed form, so neighbor, distance and ring queries are computed
+        over whole arrays at once. The neighbor table is stored CSR-style: the neighbors of hex i are
+        indices[offsets[i]:offsets[i + 1]].
+
+        Parameters:
+            labels (list[str]): The hex labels, in the order the hexes are stored
+            rows (np.ndarray): The row of each hex, parsed from the labels if not given
+            cols (np.ndarray): The column of each hex, parsed from the labels if not given
+        """
+        self.__labels = list(labels)
+        self.__index = {label: i for i, label in enumerate(self.__labels)}
+        if len(self.__index) != len(self.__labels):
+            raise ValueError("Hex labels are not unique")
+        if rows is None or cols is None:
+            coordinates = np.array([parse_label(label) for label in self.__labels], dtype=np.int32).reshape(-1, 2)
+            rows, cols = coordinates[:, 0], coordinates[:, 1]
+        self.__row = np.ascontiguousarray(rows, dtype=np.int32)
+        self.__col = np.ascontiguousarray(cols, dtype=np.int32)
+        self.__q = self.__col
+        self.__r = self.__row - (self.__col - (self.__col & 1)) // 2
+
+        self.__rows = int(self.__row.max()) + 1 if len(self) else 0
+        self.__cols = int(self.__col.max()) + 1 if len(self) else 0
+        self.__position = np.full((self.__rows, self.__cols), -1, dtype=np.int32)
+        self.__position[self.__row, self.__col] = np.arange(len(self), dtype=np.int32)
+        if (self.__position >= 0).sum() != len(self):
+            raise ValueError("More than one hex label refers to the same row and column")
+
+        neighbors = self.neighbor_table()
+        present = neighbors >= 0
+        # Scalar adjacency checks slice these directly, vectorized callers get zero copy views
+        self.__offsets = array('i', np.concatenate(([0], np.cumsum(present.sum(axis=1)))).astype(np.int32).tobytes())
+        self.__indices = array('i', neighbors[present].astype(np.int32).tobytes())
+        self.__neighbor_lists = None
+
+    @classmethod
+    def from_shape(cls, rows: int, cols: int) -> 'HexGrid':
+        """
+        Creates a full rectangular grid with its hexes stored row by row
+
+        Parameters:
+            rows (int): The number of rows
+            cols (int): The number of columns
+
+        Returns:
+            HexGrid - The grid
+        """
+        row, col = np.divmod(np.arange(rows * cols, dtype=np.int32), cols)
+        return cls([format_label(r, c) for r, c in zip(row.tolist(), col.tolist())], row, col)
+
+    def __lookup(self, q: np.ndarray, r: np.ndarray) -> np.ndarray:
+        """
+        Gets the indices of the hexes at axial coordinates
+
+        Parameters:
+            q (np.ndarray): The axial q coordinates
+            r (np.ndarray): The axial r coordinates
+
+        Returns:
+            np.ndarray - The hex indices, -1 where there is no hex
+        """
+        row = r + (q - (q & 1)) // 2
+        inside = (q >= 0) & (q < self.__cols) & (row >= 0) & (row < self.__rows)
+        found = np.full(np.shape(q), -1, dtype=np.int32)
+        found[inside] = self.__position[row[inside], q[inside]]
+        return found
+
+    @property
+    def labels(self) -> list[str]:
+        """
+        Gets the labels field
+
+        Returns:
+            list[str] - The hex labels in index order
+        """
+        return self.__labels
+
+    @property
+    def rows(self) -> int:
+        """
+        Gets the number of rows spanned by the grid
+
+        Returns:
+            int - The number of rows
+        """
+        return self.__rows
+
+    @property
+    def cols(self) -> int:
+        """
+        Gets the number of columns spanned by the grid
+
+        Returns:
+            int - The number of columns
+        """
+        return self.__cols
+
+    @property
+    def row(self) -> np.ndarray:
+        """
+        Gets the row of every hex
+
+        Returns:
+            np.ndarray - The int32 rows in index order
+        """
+        return self.__row
+
+    @property
+    def col(self) -> np.ndarray:
+        """
+        Gets the column of every hex
+
+        Returns:
+            np.ndarray - The int32 columns in index order
+        """
+        return self.__col
+
+    @property
+    def q(self) -> np.ndarray:
+        """
+        Gets the axial q coordinate of every hex
+
+        Returns:
+            np.ndarray - The int32 q coordinates in index order
+        """
+        return self.__q
+
+    @property
+    def r(self) -> np.ndarray:
+        """
+        Gets the axial r coordinate of every hex
+
+        Returns:
+            np.ndarray - The int32 r coordinates in index order
+        """
+        return self.__r
+
+    @property
+    def offsets(self) -> np.ndarray:
+        """
+        Gets the CSR row offsets of the neighbor table
+
+        Returns:
+            np.ndarray - The int32 offsets, one more than the number of hexes
+        """
+        return np.frombuffer(self.__offsets, dtype=np.int32)
+
+    @property
+    def indices(self) -> np.ndarray:
+        """
+        Gets the CSR neighbor indices of the neighbor table
+
+        Returns:
+            np.ndarray - The int32 neighbor indices
+        """
+        return np.frombuffer(self.__indices, dtype=np.int32)
+
+    @property
+    def neighbor_lists(self) -> list[tuple[int]]:
+        """
+        Gets the neighbors of every hex as tuples, built on first use for tight search loops
+
+        Returns:
+            list[tuple[int]] - The neighbor indices of each hex
+        """
+        if self.__neighbor_lists is None:
+            offsets = self.__offsets.tolist()
+            indices = self.__indices.tolist()
+            self.__neighbor_lists = [tuple(indices[offsets[i]:offsets[i + 1]]) for i in range(len(self))]
+        return self.__neighbor_lists
+
+    def __len__(self) -> int:
+        return len(self.__labels)
+
+    def index_of(self, label: str) -> int:
+        """
+        Gets the index of a hex
+
+        Parameters:
+            label (str): The label of the hex
+
+        Returns:
+            int - The index of the hex or None if there is no such hex
+        """
+        return self.__index.get(label)
+
+    def neighbors(self, index: int) -> array:
+        """
+        Gets the indices of the hexes adjacent to a hex
+
+        Parameters:
+            index (int): The index of the hex
+
+        Returns:
+            array - The neighbor indices
+        """
+        return self.__indices[self.__offsets[index]:self.__offsets[index + 1]]
+
+    def is_adjacent(self, index: int, other: int) -> bool:
+        """
+        Checks whether or not two hexes are adjacent to one another
+
+        Parameters:
+            index (int): The index of the first hex
+            other (int): The index of the second hex
+
+        Returns:
+            bool - True if the hexes are adjacent
+        """
+        return other in self.__indices[self.__offsets[index]:self.__offsets[index + 1]]
+
+    def are_adjacent(self, indices: np.ndarray, others: np.ndarray) -> np.ndarray:
+        """
+        Checks adjacency for many pairs of hexes at once
+
+        Parameters:
+            indices (np.ndarray): The indices of the first hexes
+            others (np.ndarray): The indices of the second hexes, broadcast against indices
+
+        Returns:
+            np.ndarray - True where the pair of hexes are adjacent
+        """
+        return self.distances(indices, others) == 1
+
+    def distance(self, index: int, other: int) -> int:
+        """
+        Gets the number of moves between two hexes on an unobstructed grid
+
+        Parameters:
+            index (int): The index of the first hex
+            other (int): The index of the second hex
+
+        Returns:
+            int - The hex distance
+        """
+        dq = int(self.__q[index]) - int(self.__q[other])
+        dr = int(self.__r[index]) - int(self.__r[other])
+        return (abs(dq) + abs(dr) + abs(dq + dr)) // 2
+
+    def distances(self, indices, others=None) -> np.ndarray:
+        """
+        Gets the hex distances for many pairs of hexes at once
+
+        Parameters:
+            indices: The index or indices of the first hexes
+            others: The indices of the second hexes broadcast against indices, every hex if not given
+
+        Returns:
+            np.ndarray - The int32 hex distances
+        """
+        if others is None:
+            others = slice(None)
+        dq = self.__q[indices] - self.__q[others]
+        dr = self.__r[indices] - self.__r[others]
+        return (np.abs(dq) + np.abs(dr) + np.abs(dq + dr)) // 2
+
+    def ring(self, index: int, radius: int) -> np.ndarray:
+        """
+        Gets the hexes within a number of moves of a hex, including the hex itself
+
+        Parameters:
+            index (int): The index of the central hex
+            radius (int): The largest hex distance to include
+
+        Returns:
+            np.ndarray - The int32 indices of the hexes in the ring
+        """
+        steps = np.arange(-radius, radius + 1, dtype=np.int32)
+        dq, dr = np.meshgrid(steps, steps, indexing='ij')
+        within = np.abs(dq + dr) <= radius
+        found = self.__lookup(self.__q[index] + dq[within], self.__r[index] + dr[within])
+        return found[found >= 0]
+
+    def neighbor_table(self) -> np.ndarray:
+        """
+        Gets the neighbors of every hex as a dense table
+
+        Returns:
+            np.ndarray - The int32 (hexes, 6) neighbor indices, -1 where a neighbor is off the grid
+        """
+        return self.__lookup(self.__q[:, None] + AXIAL_DIRECTIONS[:, 0], self.__r[:, None] + AXIAL_DIRECTIONS[:, 1])
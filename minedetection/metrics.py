@@ -0,0 +1,468 @@
+import cProfile
+import glob
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+# The mission operations timed when metrics are attached; the actions among them are the steps of a mission
+ACTIONS = ('move_ugv', 'move_uav', 'move_ugv_path', 'move_uav_path', 'query_ai', 'query_human')
+LOOKUPS = ('get_chosen_hex', 'adjacent_hexagons', 'mine_probabilities', 'plan_route')
+OPERATIONS = ACTIONS + LOOKUPS + ('snapshot', 'restore', 'clone')
+# Upper bounds of the latency histogram buckets in seconds, from a microsecond to a second
+LATENCY_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+# Upper bounds of the buckets of lookups made between two steps
+LOOKUP_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128)
+PROMETHEUS_PREFIX = 'aic_mission'
+
+
+class Histogram():
+    def __init__(self, buckets: tuple):
+        """
+        Creates the Histogram object, counting observations into buckets the way Prometheus does
+
+        Parameters:
+            buckets (tuple): The ascending upper bounds of the buckets, observations above the last go to an overflow bucket
+        """
+        self.__buckets = tuple(buckets)
+        self.__counts = [0] * (len(self.__buckets) + 1)
+        self.__sum = 0.0
+
+    @property
+    def buckets(self) -> tuple:
+        """
+        Gets the buckets field
+
+        Returns:
+            tuple - The upper bounds of the buckets
+        """
+        return self.__buckets
+
+    @property
+    def counts(self) -> list[int]:
+        """
+        Gets the counts field
+
+        Returns:
+            list[int] - The observations in each bucket, not cumulative, the overflow bucket last
+        """
+        return self.__counts
+
+    @property
+    def sum(self) -> float:
+        """
+        Gets the sum field
+
+        Returns:
+            float - The sum of every observation
+        """
+        return self.__sum
+
+    @property
+    def count(self) -> int:
+        """
+        Gets the number of observations
+
+        Returns:
+            int - The number of observations
+        """
+        return sum(self.__counts)
+
+    def observe(self, value: float):
+        """
+        Counts an observation
+
+        Parameters:
+            value (float): The observation
+        """
+        self.__counts[bisect_left(self.__buckets, value)] += 1
+        self.__sum += value
+
+    def merge(self, other: 'Histogram'):
+        """
+        Adds the observations of a histogram with the same buckets to this one
+
+        Parameters:
+            other (Histogram): The histogram
+        """
+        if other.buckets != self.__buckets:
+            raise ValueError("Histograms with different buckets can't be merged")
+        for bucket, count in enumerate(other.counts):
+            self.__counts[bucket] += count
+        self.__sum += other.sum
+
+    def to_dict(self) -> dict:
+        """
+        Converts the histogram to a JSON friendly dict
+
+        Returns:
+            dict - The bucket bounds, counts, sum and number of observations
+        """
+        return {"buckets": list(self.__buckets), "counts": list(self.__counts), "sum": self.__sum, "count": self.count}
+
+
+class MissionMetrics():
+    def __init__(self, latency_buckets: tuple = LATENCY_BUCKETS, lookup_buckets: tuple = LOOKUP_BUCKETS):
+        """
+        Creates the MissionMetrics object, collecting call counts, latencies and costs from missions
+
+        Metrics are attached to a mission by setting Mission.metrics, which replaces the mission's
+        operations with timed wrappers on that mission alone. Missions without metrics run the plain
+        methods, so instrumentation costs nothing until it is turned on. One MissionMetrics can be
+        attached to many missions, such as every episode of a batch run, to aggregate across them.
+
+        Parameters:
+            latency_buckets (tuple): The upper bounds of the latency histogram buckets in seconds
+            lookup_buckets (tuple): The upper bounds of the buckets of lookups made between steps
+        """
+        self.__latency_buckets = tuple(latency_buckets)
+        self.__lookup_buckets = tuple(lookup_buckets)
+        self.__calls = {}
+        self.__latency = {}
+        self.__costs = {}
+        self.__lookups = Histogram(self.__lookup_buckets)
+        self.__started = time.time()
+
+    @property
+    def calls(self) -> dict:
+        """
+        Gets the calls field
+
+        Returns:
+            dict - The number of calls of each operation
+        """
+        return self.__calls
+
+    @property
+    def latency(self) -> dict:
+        """
+        Gets the latency field
+
+        Returns:
+            dict - The Histogram of the seconds each operation took
+        """
+        return self.__latency
+
+    @property
+    def costs(self) -> dict:
+        """
+        Gets the costs field
+
+        Returns:
+            dict - The mission cost each type of action accumulated
+        """
+        return self.__costs
+
+    @property
+    def lookups(self) -> Histogram:
+        """
+        Gets the lookups field
+
+        Returns:
+            Histogram - The number of hex selections, neighbor lookups, probability and route queries made before each step
+        """
+        return self.__lookups
+
+    def empty(self) -> 'MissionMetrics':
+        """
+        Creates empty metrics with the same buckets, such as for a worker process to fill and merge back
+
+        Returns:
+            MissionMetrics - The empty metrics
+        """
+        return MissionMetrics(self.__latency_buckets, self.__lookup_buckets)
+
+    def record(self, operation: str, seconds: float, cost: float = None):
+        """
+        Records one call of an operation
+
+        Parameters:
+            operation (str): The name of the operation
+            seconds (float): The time the call took
+            cost (float): The mission cost the call added, if it was an action
+        """
+        self.__calls[operation] = self.__calls.get(operation, 0) + 1
+        histogram = self.__latency.get(operation)
+        if histogram is None:
+            histogram = self.__latency[operation] = Histogram(self.__latency_buckets)
+        histogram.observe(seconds)
+        if cost is not None:
+            self.__costs[operation] = self.__costs.get(operation, 0) + cost
+
+    def attach(self, mission):
+        """
+        Replaces a mission's operations with wrappers recording to these metrics
+
+        Parameters:
+            mission (Mission): The mission
+        """
+        # Counts the lookups since the mission's last step, per mission
+        pending = [0]
+        for name in OPERATIONS:
+            method = getattr(type(mission), name).__get__(mission)
+            if name in ACTIONS:
+                wrapper = self.__timed_action(mission, name, method, pending)
+            else:
+                wrapper = self.__timed(name, method, pending if name in LOOKUPS else None)
+            setattr(mission, name, wrapper)
+
+    def detach(self, mission):
+        """
+        Restores a mission's plain operations
+
+        Parameters:
+            mission (Mission): The mission
+        """
+        for name in OPERATIONS:
+            mission.__dict__.pop(name, None)
+
+    def __timed(self, name: str, method, pending: list):
+        record = self.record
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - start)
+                if pending is not None:
+                    pending[0] += 1
+        return timed
+
+    def __timed_action(self, mission, name: str, method, pending: list):
+        record = self.record
+        lookups = self.__lookups
+        perf_counter = time.perf_counter
+
+        def timed(*args, **kwargs):
+            total = mission.total
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record(name, perf_counter() - start, mission.total - total)
+                lookups.observe(pending[0])
+                pending[0] = 0
+        return timed
+
+    def merge(self, other: 'MissionMetrics'):
+        """
+        Adds the metrics collected elsewhere, such as in a worker process, to these
+
+        Parameters:
+            other (MissionMetrics): The metrics, with the same buckets
+        """
+        for operation, calls in other.calls.items():
+            self.__calls[operation] = self.__calls.get(operation, 0) + calls
+        for operation, histogram in other.latency.items():
+            if operation not in self.__latency:
+                self.__latency[operation] = Histogram(self.__latency_buckets)
+            self.__latency[operation].merge(histogram)
+        for action, cost in other.costs.items():
+            self.__costs[action] = self.__costs.get(action, 0) + cost
+        self.__lookups.merge(other.lookups)
+
+    def to_dict(self) -> dict:
+        """
+        Converts the metrics to a JSON friendly dict
+
+        Returns:
+            dict - The calls, latency histograms, costs and lookups per step
+        """
+        return {
+            "started": self.__started,
+            "time": time.time(),
+            "calls": dict(self.__calls),
+            "latency_seconds": {operation: histogram.to_dict() for operation, histogram in list(self.__latency.items())},
+            "cost": dict(self.__costs),
+            "lookups_per_step": self.__lookups.to_dict(),
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Formats the metrics in the Prometheus text exposition format
+
+        Returns:
+            str - The metrics, one sample per line
+        """
+        lines = ["# HELP %s_calls_total Calls of each mission operation" % PROMETHEUS_PREFIX,
+                 "# TYPE %s_calls_total counter" % PROMETHEUS_PREFIX]
+        lines += ['%s_calls_total{operation="%s"} %d' % (PROMETHEUS_PREFIX, operation, calls) for operation, calls in list(self.__calls.items())]
+        lines += ["# HELP %s_latency_seconds Time each mission operation took" % PROMETHEUS_PREFIX,
+                  "# TYPE %s_latency_seconds histogram" % PROMETHEUS_PREFIX]
+        for operation, histogram in list(self.__latency.items()):
+            lines += prometheus_histogram(PROMETHEUS_PREFIX + "_latency_seconds", histogram, 'operation="%s",' % operation)
+        lines += ["# HELP %s_cost_total Mission cost accumulated by each type of action" % PROMETHEUS_PREFIX,
+                  "# TYPE %s_cost_total counter" % PROMETHEUS_PREFIX]
+        lines += ['%s_cost_total{action="%s"} %s' % (PROMETHEUS_PREFIX, action, repr(float(cost))) for action, cost in list(self.__costs.items())]
+        lines += ["# HELP %s_lookups_per_step Hex selections, neighbor lookups, probability and route queries before each step" % PROMETHEUS_PREFIX,
+                  "# TYPE %s_lookups_per_step histogram" % PROMETHEUS_PREFIX]
+        lines += prometheus_histogram(PROMETHEUS_PREFIX + "_lookups_per_step", self.__lookups)
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, format: str = None):
+        """
+        Writes the metrics to a file, replacing it in one step so readers never see half a file
+
+        Parameters:
+            path (str): The path of the file
+            format (str): "json" or "prometheus", json if the path ends in .json and prometheus otherwise
+        """
+        format = format or ('json' if path.endswith('.json') else 'prometheus')
+        text = json.dumps(self.to_dict(), indent=1) if format == 'json' else self.to_prometheus()
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary, 'w') as file:
+            file.write(text)
+        os.replace(temporary, path)
+
+
+def prometheus_histogram(name: str, histogram: Histogram, labels: str = "") -> list[str]:
+    """
+    Formats a histogram as Prometheus samples with cumulative buckets
+
+    Parameters:
+        name (str): The metric name
+        histogram (Histogram): The histogram
+        labels (str): Labels added to every sample, each followed by a comma
+
+    Returns:
+        list[str] - The sample lines
+    """
+    lines = []
+    cumulative = 0
+    counts = list(histogram.counts)
+    for bound, count in zip(histogram.buckets + ("+Inf",), counts):
+        cumulative += count
+        lines.append('%s_bucket{%sle="%s"} %d' % (name, labels, bound, cumulative))
+    labels = "{%s}" % labels.rstrip(",") if labels else ""
+    lines.append('%s_sum%s %s' % (name, labels, repr(float(histogram.sum))))
+    lines.append('%s_count%s %d' % (name, labels, cumulative))
+    return lines
+
+
+class MetricsExporter():
+    def __init__(self, metrics: MissionMetrics, path: str, interval: float = 10.0, format: str = None):
+        """
+        Creates the MetricsExporter object, writing metrics to a file every interval from a background thread
+
+        The file is rewritten whole each time, so a Prometheus node exporter's textfile collector or
+        anything polling the file always reads a complete set. A write that fails is reported on
+        stderr and tried again at the next interval. The metrics are written a last time when the
+        exporter is closed.
+
+        Parameters:
+            metrics (MissionMetrics): The metrics to export
+            path (str): The path of the file
+            interval (float): The seconds between writes
+            format (str): "json" or "prometheus", chosen by the file extension if not given
+        """
+        self.__metrics = metrics
+        self.__path = path
+        self.__interval = interval
+        self.__format = format
+        self.__stop = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name="MetricsExporter", daemon=True)
+        self.__thread.start()
+
+    @property
+    def path(self) -> str:
+        """
+        Gets the path field
+
+        Returns:
+            str - The file the metrics are written to
+        """
+        return self.__path
+
+    def write(self):
+        """
+        Writes the metrics now
+        """
+        self.__metrics.write(self.__path, self.__format)
+
+    def close(self):
+        """
+        Stops the exporter thread and writes the metrics a last time
+        """
+        if self.__stop.is_set():
+            return
+        self.__stop.set()
+        self.__thread.join()
+        self.write()
+
+    def __enter__(self) -> 'MetricsExporter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __run(self):
+        while not self.__stop.wait(self.__interval):
+            try:
+                self.write()
+            except Exception as error:
+                # Keep exporting, the next write may succeed
+                print("%s: metrics not written: %s" % (self.__path, error), file=sys.stderr)
+
+
+# The profiler of this process, kept across profiled blocks so each worker's file aggregates every task it ran
+_PROFILER = None
+
+
+@contextmanager
+def profiled(directory: str):
+    """
+    Profiles a block with cProfile, dumping the stats of every block this process has profiled so far
+
+    Each process writes its own profile_<pid>.prof file in the directory, so wrapping each task
+    of a worker pool leaves one file per worker aggregating all of the tasks it ran.
+
+    Parameters:
+        directory (str): The directory to write the stats file to, None to run the block unprofiled
+    """
+    global _PROFILER
+    if directory is None:
+        yield None
+        return
+    if _PROFILER is None:
+        _PROFILER = cProfile.Profile()
+    _PROFILER.enable()
+    try:
+        yield _PROFILER
+    finally:
+        _PROFILER.disable()
+        os.makedirs(directory, exist_ok=True)
+        _PROFILER.dump_stats(os.path.join(directory, "profile_%d.prof" % os.getpid()))
+
+
+def clear_profiles(directory: str):
+    """
+    Removes the stats files of earlier runs from a directory, and forgets what this process has profiled
+
+    Parameters:
+        directory (str): The directory of profile_<pid>.prof files
+    """
+    global _PROFILER
+    _PROFILER = None
+    for path in glob.glob(os.path.join(directory, "profile_*.prof")):
+        os.remove(path)
+
+
+def load_profiles(directory: str) -> pstats.Stats:
+    """
+    Loads and aggregates the stats every process profiled into a directory
+
+    Parameters:
+        directory (str): The directory of profile_<pid>.prof files
+
+    Returns:
+        pstats.Stats - The aggregated stats, or None if there are none
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "profile_*.prof")))
+    return pstats.Stats(*paths) if paths else None
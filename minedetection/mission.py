@@ -1,62 +1,105 @@
-import json
-import logging
+import dataclasses
 import datetime
 import os
+from dataclasses import dataclass
+import numpy as np
+from actiontrace import Trace, SELECT, QUERY_AI, QUERY_HUMAN, MOVE_UAV, MOVE_UGV
+from eventlog import Event, EventLog, EventWriter
+from fusion import FusionModel
+from gridstate import GridState, MINE_PRESENT, MINE_FOUND, MINE_CLEARED, UAV_1_SCANNED, UAV_2_SCANNED
 from hexagon import Hexagon
+from hexgrid import HexGrid
+from metrics import MissionMetrics
+from planner import IncrementalPlanner, Route, a_star, cost_field, expected_costs
+from scenario import Scenario, SCENARIO_CACHE, config_path, fleet
 from uav import UAV
+from ugv import UGV
+
+
+# The directory mission logs and traces are written to, beside the config directory
+LOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs')
+
+
+@dataclass
+class MissionSnapshot:
+    flags: np.ndarray
+    scanned: np.ndarray
+    ai_queried: np.ndarray
+    uavs: list[int]
+    ugvs: list[int]
+    selected: int
+    total: int
+    event: Event
+    actions: int
 
 
 class Mission():
-    def __init__(self, config_filename: str):
+    def __init__(self, config_filename, log_to_file: bool = True, events: EventLog = None):
         """
         Constructor for the Mission object
 
         Params:
-            data - The JSON mission object
-        """
-
-        log_dir = os.path.join(os.path.normpath(os.getcwd() + os.sep + os.pardir), 'logs')
-        filename=f"log_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.log"
-        log_filename = os.path.join(log_dir, filename)
-        logging.basicConfig(
-            filename=log_filename,
-            level=logging.INFO,
-            format='%(asctime)s %(message)s'
-        )
-        self.__current_log = ""
-        with open('../config/' + config_filename) as json_data:
-            data = json.load(json_data)
-            self.__hexagons = []
-            self.__selected_hexagon = None
-            for label in data.keys():
-                if label != "mission":
-                    content = data[label]
-                    self.__hexagons.append(Hexagon(label, content['Terrain'], content['AI Confidence'], content['AI Second Scan Confidence'], content['Human Confidence'], content['Mine']))
-            data = data['mission']
-            self.__start_node = data['start']
-            self.__end_node = data['end']
-            self.__human_estimate_time = data["human estimate time"]
-            self.__ai_estimate_time = data["AI estimate time"]
-            self.__ugv_traversal_time = data["UGV traversal time"]
-            self.__ugv_clear_time = data["UGV clear time"]
-            self.__uav_1 = UAV(1, self.__hexagons[0], data["UAV traversal time"])
-            self.__uav_2 = UAV(2, self.__hexagons[0], data["UAV traversal time"])
-            self.__ugv_location = self.__hexagons[0]
-            self.__hexagons[0].landmine_present = False
-            self.__hexagons[0].uav_1_scanned = True
-            self.__hexagons[0].uav_2_scanned = True
+            config_filename: The scenario JSON file within the config directory, the path of one
+                elsewhere, or a Scenario such as one from a ScenarioPack. Files are loaded through
+                SCENARIO_CACHE, so missions on the same scenario share its parsed data
+            log_to_file (bool): False to keep events in memory only, as done by headless batch runs
+            events (EventLog): The event log to record to, a new one writing to its own file in the logs directory if not given
+        """
+
+        if events is None:
+            events = EventLog(writer=self.__open_log_file() if log_to_file else None)
+        self.__events = events
+        self.__last_event = None
+        if isinstance(config_filename, Scenario):
+            scenario = config_filename
+            self.__scenario = scenario.name
+        else:
+            scenario = SCENARIO_CACHE.load(config_path(config_filename))
+            self.__scenario = config_filename
+        # Missions logging to file also keep a trace of their actions, saved beside the log on close
+        self.__trace = Trace(self.__scenario) if log_to_file else None
+        data = scenario.mission
+        uavs, ugvs = fleet(data)
+        self.__hexagons = scenario.state(len(uavs))
+        self.__selected_hexagon = None
+        self.__grid = self.__hexagons.grid
+        self.__start_node = data['start']
+        self.__end_node = data['end']
+        self.__human_estimate_time = data["human estimate time"]
+        self.__ai_estimate_time = data["AI estimate time"]
+        # Every vehicle starts on the first hex, which each UAV has scanned
+        start = self.__hexagons[0]
+        self.__uavs = [UAV(number, start, uav['traversal time'], uav['AI scan']) for number, uav in enumerate(uavs, 1)]
+        self.__ugvs = [UGV(number, start, ugv['traversal time'], ugv['clear time']) for number, ugv in enumerate(ugvs, 1)]
+        start.landmine_present = False
+        for uav in self.__uavs:
+            self.__hexagons.scan(start.index, uav.uav_number, uav.ai_scan)
         self.__total = 0
+        self.__planners = [None] * len(self.__ugvs)
+        self.__planned_goals = [None] * len(self.__ugvs)
+        self.__metrics = None
+        self.fusion = FusionModel()
 
     @property
-    def hexagons(self) -> list[Hexagon]:
+    def hexagons(self) -> GridState:
         """
         Gets the hexagons field
 
         Returns:
-            Set[Hexagon] - The hexagons
+            GridState - The hexagons, a sequence of Hexagon views over the grid state arrays
         """
         return self.__hexagons
 
+    @property
+    def grid(self) -> HexGrid:
+        """
+        Gets the grid field
+
+        Returns:
+            HexGrid - The label index and neighbor table of the hexagons
+        """
+        return self.__grid
+
     @property
     def selected_hexagon(self) -> Hexagon:
         """
@@ -75,6 +118,9 @@ class Mission():
         Parameters:
             hex - The hexagon to make current
         """
+        if self.__trace is not None:
+            # Unlike selecting a label that doesn't exist, clearing the selection is marked with vehicle 1
+            self.__trace.append(SELECT, hex.index if hex is not None else None, 0 if hex is not None else 1)
         self.__selected_hexagon = hex
 
     @property
@@ -117,55 +163,95 @@ class Mission():
         """
         return self.__ai_estimate_time
 
+    @property
+    def uav_traversal_time(self) -> int:
+        """
+        Gets the first UAV's traversal time
+
+        Returns:
+            int - The uav traversal time
+        """
+        return self.__uavs[0].uav_traversal_time
+
     @property
     def ugv_traversal_time(self) -> int:
         """
-        Gets the ugv_traversal_time field
+        Gets the first UGV's traversal time
 
         Returns:
             int - The ugv traversal time
         """
-        return self.__ugv_traversal_time
+        return self.__ugvs[0].ugv_traversal_time
 
     @property
     def ugv_clear_time(self) -> int:
         """
-        Gets the ugv_clear_time field
+        Gets the first UGV's clear time
 
         Returns:
             int - The ugv clear time
         """
-        return self.__ugv_clear_time
+        return self.__ugvs[0].ugv_clear_time
+
+    @property
+    def uavs(self) -> list[UAV]:
+        """
+        Gets the uavs field
+
+        Returns:
+            list[UAV] - The UAVs, UAV n at position n - 1
+        """
+        return self.__uavs
 
     @property
-    def uav_1(self) -> int:
+    def ugvs(self) -> list[UGV]:
         """
-        Gets the ugv_1 field
+        Gets the ugvs field
 
         Returns:
-            int - The first uav
+            list[UGV] - The UGVs, UGV n at position n - 1
         """
-        return self.__uav_1
+        return self.__ugvs
 
     @property
-    def uav_2(self) -> int:
+    def uav_1(self) -> UAV:
         """
-        Gets the ugv_2 field
+        Gets the first UAV
 
         Returns:
-            int - The second uav
+            UAV - The first uav
         """
-        return self.__uav_2
+        return self.__uavs[0]
+
+    @property
+    def uav_2(self) -> UAV:
+        """
+        Gets the second UAV
+
+        Returns:
+            UAV - The second uav, or None if the mission has one UAV
+        """
+        return self.__uavs[1] if len(self.__uavs) > 1 else None
 
     @property
     def ugv_location(self) -> Hexagon:
         """
-        Gets the ugv_location field
+        Gets the first UGV's location
 
         Returns:
-            str - The ugv location
+            Hexagon - The ugv location
         """
-        return self.__ugv_location
+        return self.__ugvs[0].ugv_location
+
+    @property
+    def complete(self) -> bool:
+        """
+        Checks whether the mission has succeeded
+
+        Returns:
+            bool - True once any UGV has reached the end node
+        """
+        return any(ugv.ugv_location.label == self.__end_node for ugv in self.__ugvs)
 
     @property
     def total(self) -> int:
@@ -177,6 +263,28 @@ class Mission():
         """
         return self.__total
 
+    @property
+    def fusion(self) -> FusionModel:
+        """
+        Gets the fusion field
+
+        Returns:
+            FusionModel - The model combining revealed estimates into mine probabilities
+        """
+        return self.__fusion
+
+    @fusion.setter
+    def fusion(self, fusion: FusionModel):
+        """
+        Sets the fusion field
+
+        Parameters:
+            fusion (FusionModel): The model combining revealed estimates into mine probabilities
+        """
+        self.__fusion = fusion
+        # Computed on first use, so missions that never ask for probabilities don't pay for it
+        self.__evidence = None
+
     @property
     def current_log(self) -> str:
         """
@@ -185,7 +293,159 @@ class Mission():
         Returns:
             str - The current log message
         """
-        return self.__current_log
+        return self.__last_event.message if self.__last_event is not None else ""
+
+    @property
+    def scenario(self) -> str:
+        """
+        Gets the scenario field
+
+        Returns:
+            str - The scenario JSON file or path the mission was loaded from, or the name of its Scenario
+        """
+        return self.__scenario
+
+    @property
+    def trace(self) -> Trace:
+        """
+        Gets the trace field
+
+        Returns:
+            Trace - The trace every action is recorded to, or None if actions aren't recorded
+        """
+        return self.__trace
+
+    @trace.setter
+    def trace(self, trace: Trace):
+        """
+        Sets the trace field
+
+        Parameters:
+            trace (Trace): The trace to record every action to, None to stop recording
+        """
+        self.__trace = trace
+
+    @property
+    def events(self) -> EventLog:
+        """
+        Gets the events field
+
+        Returns:
+            EventLog - The structured log of everything done during the mission
+        """
+        return self.__events
+
+    @property
+    def metrics(self) -> MissionMetrics:
+        """
+        Gets the metrics field
+
+        Returns:
+            MissionMetrics - The metrics the mission's operations are recorded to, or None if they aren't
+        """
+        return self.__metrics
+
+    @metrics.setter
+    def metrics(self, metrics: MissionMetrics):
+        """
+        Sets the metrics field, timing the mission's operations only while it is set
+
+        Parameters:
+            metrics (MissionMetrics): The metrics to record to, None to stop recording
+        """
+        if self.__metrics is not None:
+            self.__metrics.detach(self)
+        self.__metrics = metrics
+        if metrics is not None:
+            metrics.attach(self)
+
+    def close(self):
+        """
+        Writes any events still queued and closes the log file, saving the action trace beside it
+        """
+
+        writer = self.__events.writer
+        if writer is not None and self.__trace is not None:
+            self.__trace.save(os.path.splitext(writer.filename)[0] + '.trace')
+        self.__events.close()
+
+    def __open_log_file(self) -> EventWriter:
+        """
+        Opens a JSON lines log file of its own in the logs directory for this mission
+
+        Returns:
+            EventWriter - The writer appending to the file
+        """
+
+        filename = f"log_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')}.jsonl"
+        return EventWriter(os.path.join(LOG_DIR, filename))
+
+    def snapshot(self) -> MissionSnapshot:
+        """
+        Records the mutable state of the mission so it can be rolled back with restore
+
+        Returns:
+            MissionSnapshot - The hex flags and UAV masks, vehicle and selected hex indices, total, last event and trace length
+        """
+
+        hexagons = self.__hexagons
+        selected = self.__selected_hexagon.index if self.__selected_hexagon is not None else None
+        return MissionSnapshot(hexagons.flags.copy(), hexagons.scanned.copy(), hexagons.ai_queried.copy(),
+                               [uav.uav_location.index for uav in self.__uavs], [ugv.ugv_location.index for ugv in self.__ugvs],
+                               selected, self.__total, self.__last_event, len(self.__trace) if self.__trace is not None else 0)
+
+    def restore(self, snapshot: MissionSnapshot):
+        """
+        Rolls the mission back to a snapshot taken of it or of a clone of it, dropping the actions
+        recorded to the trace since
+
+        Params:
+            snapshot (MissionSnapshot): The snapshot to restore
+        """
+
+        hexagons = self.__hexagons
+        np.copyto(hexagons.flags, snapshot.flags)
+        np.copyto(hexagons.scanned, snapshot.scanned)
+        np.copyto(hexagons.ai_queried, snapshot.ai_queried)
+        for uav, index in zip(self.__uavs, snapshot.uavs):
+            uav.uav_location = hexagons[index]
+        for ugv, index in zip(self.__ugvs, snapshot.ugvs):
+            ugv.ugv_location = hexagons[index]
+        self.__selected_hexagon = hexagons[snapshot.selected] if snapshot.selected is not None else None
+        self.__total = snapshot.total
+        self.__last_event = snapshot.event
+        if self.__trace is not None:
+            del self.__trace.words[snapshot.actions:]
+
+    def clone(self) -> 'Mission':
+        """
+        Creates an independent copy of the mission to try actions on
+
+        The scenario data, costs and fusion model are shared, only the hex flags, vehicles, selection
+        and total are copied, so a clone is cheap enough to make per search node. Events from the
+        clone are recorded to this mission's event log, its actions aren't traced.
+
+        Returns:
+            Mission - The copy
+        """
+
+        clone = Mission.__new__(Mission)
+        clone.__dict__.update(self.__dict__)
+        hexagons = self.__hexagons.copy()
+        clone.__hexagons = hexagons
+        clone.__uavs = [dataclasses.replace(uav, uav_location=hexagons[uav.uav_location.index]) for uav in self.__uavs]
+        clone.__ugvs = [dataclasses.replace(ugv, ugv_location=hexagons[ugv.ugv_location.index]) for ugv in self.__ugvs]
+        if self.__selected_hexagon is not None:
+            clone.__selected_hexagon = hexagons[self.__selected_hexagon.index]
+        # The incremental planners' searches are mutable, the clone starts its own on first use
+        clone.__planners = [None] * len(self.__ugvs)
+        clone.__planned_goals = [None] * len(self.__ugvs)
+        clone.__trace = None
+        # Searches run on clones aren't steps of the mission, so their operations aren't recorded
+        if self.__metrics is not None:
+            self.__metrics.detach(clone)
+            clone.__metrics = None
+        return clone
 
     def __increment_total(self, value):
         """
@@ -207,22 +467,21 @@ class Mission():
             True if the AI was queried
         """
 
-        if num_uav == 1:
-            if self.selected_hexagon is not None and self.selected_hexagon.uav_1_scanned and not self.selected_hexagon.ai_1_queried:
-                self.selected_hexagon.ai_1_queried = True
-                self.__increment_total(self.ai_estimate_time)
-                self.__log_message("AI %d queried for hex %s. The estimate was %s." % (num_uav, self.selected_hexagon.label, self.selected_hexagon.ai_1_confidence))
-                return True
-        elif num_uav == 2:
-            if self.selected_hexagon is not None and self.selected_hexagon.uav_2_scanned and not self.selected_hexagon.ai_2_queried:
-                self.selected_hexagon.ai_2_queried = True
+        if self.__trace is not None:
+            self.__trace.append(QUERY_AI, None, num_uav)
+        hex = self.__selected_hexagon
+        if hex is not None and 0 < num_uav <= len(self.__uavs):
+            index = hex.index
+            if self.__hexagons.is_scanned(index, num_uav) and not self.__hexagons.is_ai_queried(index, num_uav):
+                ai_scan = self.__uavs[num_uav - 1].ai_scan
+                self.__hexagons.query_ai(index, num_uav, ai_scan)
                 self.__increment_total(self.ai_estimate_time)
-                self.__log_message("AI %d queried for hex %s. The estimate was %s." % (num_uav, self.selected_hexagon.label, self.selected_hexagon.ai_2_confidence))
+                self.__log_message("query_ai", hex.label, "queried", self.ai_estimate_time, "AI %d queried for hex %s. The estimate was %s.", num_uav, hex.label, hex.ai_confidence(ai_scan))
                 return True
         if self.selected_hexagon:
-            self.__log_message("AI %d could not be queried for hex %s. This occurs if a the AI has already been queried, or the UAV has not scanned the current hex." % (num_uav, self.selected_hexagon.label))
+            self.__log_message("query_ai", self.selected_hexagon.label, "refused", 0, "AI %d could not be queried for hex %s. This occurs if a the AI has already been queried, or the UAV has not scanned the current hex.", num_uav, self.selected_hexagon.label)
         else:
-            self.__log_message("AI could not be queried as no hex is selected.")
+            self.__log_message("query_ai", None, "refused", 0, "AI could not be queried as no hex is selected.")
         return False
 
     def query_human(self) -> bool:
@@ -233,50 +492,62 @@ class Mission():
             True if the AI was queried
         """
 
-        if self.selected_hexagon is not None and (self.selected_hexagon.uav_1_scanned or self.selected_hexagon.uav_2_scanned) and not self.selected_hexagon.human_queried:
+        if self.__trace is not None:
+            self.__trace.append(QUERY_HUMAN)
+        if self.selected_hexagon is not None and self.__hexagons.test(self.selected_hexagon.index, UAV_1_SCANNED | UAV_2_SCANNED) and not self.selected_hexagon.human_queried:
             self.selected_hexagon.human_queried = True
             self.__increment_total(self.human_estimate_time)
-            self.__log_message("Human queried for hex %s. The estimate was %s." % (self.selected_hexagon.label, self.selected_hexagon.human_confidence))
+            self.__log_message("query_human", self.selected_hexagon.label, "queried", self.human_estimate_time, "Human queried for hex %s. The estimate was %s.", self.selected_hexagon.label, self.selected_hexagon.human_confidence)
             return True
+        elif self.selected_hexagon:
+            self.__log_message("query_human", self.selected_hexagon.label, "refused", 0, "Human could not be queried for hex %s. This occurs if an hex is not selected, the human has already been queried, or the UAV has not scanned the current hex.", self.selected_hexagon.label)
         else:
-            self.__log_message("Human could not be queried for hex %s. This occurs if an hex is not selected, the human has already been queried, or the UAV has not scanned the current hex." % (self.selected_hexagon.label))
-            return False
+            self.__log_message("query_human", None, "refused", 0, "Human could not be queried as no hex is selected.")
+        return False
 
-    def move_ugv(self, destination_node: str) -> int:
+    def move_ugv(self, destination_node: str, num_ugv: int = 1) -> int:
         """
         Move the UGV to a valid adjacent location and increase the cost
 
         Params:
             destination_node (str): The destination node for the UGV to move to
+            num_ugv (int): The number of the UGV to move
 
         Returns:
-            0 if a landmine was found, 1 if a landmine was cleared, and -1 if the UGV could not be moved
-        """
-
-        for hex in self.hexagons:
-            if hex.label == destination_node and self.__is_adjacent(self.ugv_location, hex):
-                if hex.landmine_present and not hex.landmine_found:
-                    self.__increment_total(self.ugv_traversal_time)
-                    hex.landmine_found = True
-                    self.__log_message("Landmine detected along hex %s. UGV returned to orginal passageway. Move UGV again to clear landmine and complete traversal." % destination_node)
-                    return 0
-                elif hex.landmine_present and hex.landmine_found:
-                    self.__increment_total(self.ugv_clear_time)
-                    hex.landmine_cleared = True
-                    hex.landmine_present = False
-                    self.__ugv_location = hex
-                    self.__log_message("Landmine cleared. UGV moved to passage %s." % destination_node)
-                    if destination_node == self.end_node:
-                        self.__log_message("MISSION SUCCESS")
-                    return 1
-                else:
-                    self.__increment_total(self.ugv_traversal_time)
-                    self.__ugv_location = hex
-                    self.__log_message("UGV moved to passage %s." % destination_node)
-                    if destination_node == self.end_node:
-                        self.__log_message("MISSION SUCCESS")
-                    return 2
-        self.__log_message("UGV could not be moved to passage %s. Please check the destination exists and is adjacent to the UGV's current location" % destination_node)
+            0 if a landmine was found, 1 if a landmine was cleared, 2 if the UGV moved, and -1 if the UGV could not be moved
+        """
+
+        index = self.__grid.index_of(destination_node)
+        if self.__trace is not None:
+            # The first UGV is recorded as no vehicle, as traces of single UGV missions always have
+            self.__trace.append(MOVE_UGV, index, num_ugv if num_ugv != 1 else 0)
+        ugv = self.__ugvs[num_ugv - 1] if 0 < num_ugv <= len(self.__ugvs) else None
+        # Missions with one UGV keep the messages they always had
+        name = "UGV" if len(self.__ugvs) == 1 else "UGV %d" % num_ugv
+        if ugv is not None and index is not None and self.__is_adjacent(ugv.ugv_location, index):
+            hex = self.__hexagons[index]
+            if hex.landmine_present and not hex.landmine_found:
+                self.__increment_total(ugv.ugv_traversal_time)
+                hex.landmine_found = True
+                self.__log_message("move_ugv", destination_node, "mine_found", ugv.ugv_traversal_time, "Landmine detected along hex %s. %s returned to orginal passageway. Move UGV again to clear landmine and complete traversal.", destination_node, name)
+                return 0
+            elif hex.landmine_present and hex.landmine_found:
+                self.__increment_total(ugv.ugv_clear_time)
+                hex.landmine_cleared = True
+                hex.landmine_present = False
+                ugv.ugv_location = hex
+                self.__log_message("move_ugv", destination_node, "mine_cleared", ugv.ugv_clear_time, "Landmine cleared. %s moved to passage %s.", name, destination_node)
+                if destination_node == self.end_node:
+                    self.__log_message("move_ugv", destination_node, "mission_success", 0, "MISSION SUCCESS")
+                return 1
+            else:
+                self.__increment_total(ugv.ugv_traversal_time)
+                ugv.ugv_location = hex
+                self.__log_message("move_ugv", destination_node, "moved", ugv.ugv_traversal_time, "%s moved to passage %s.", name, destination_node)
+                if destination_node == self.end_node:
+                    self.__log_message("move_ugv", destination_node, "mission_success", 0, "MISSION SUCCESS")
+                return 2
+        self.__log_message("move_ugv", destination_node, "refused", 0, "%s could not be moved to passage %s. Please check the destination exists and is adjacent to the UGV's current location", name, destination_node)
         return -1
 
     def move_uav(self, uav: UAV, destination_node: str) -> Hexagon:
@@ -291,41 +562,219 @@ class Mission():
             The hex scanned by the UAV or None otherwise
         """
 
-        for hex in self.hexagons:
-            if hex.label == destination_node and self.__is_adjacent(uav.uav_location, hex):
-                self.__increment_total(uav.uav_traversal_time)
-                uav.uav_location = hex
-                if uav.uav_number == 1:
-                    hex.uav_1_scanned = True
-                elif uav.uav_number == 2:
-                    hex.uav_2_scanned = True
-                self.__log_message("UAV %d moved to passage %s. Estimates can now be obtained for hex %s." % (uav.uav_number, destination_node, destination_node))
-                return hex
-        self.__log_message("UAV %d could not be moved to passage %s. Please check the destination exists and is adjacent to the UAV's current location" % (uav.uav_number, destination_node))
+        index = self.__grid.index_of(destination_node)
+        if self.__trace is not None:
+            self.__trace.append(MOVE_UAV, index, uav.uav_number)
+        if index is not None and self.__is_adjacent(uav.uav_location, index):
+            hex = self.__hexagons[index]
+            self.__increment_total(uav.uav_traversal_time)
+            uav.uav_location = hex
+            self.__hexagons.scan(index, uav.uav_number, uav.ai_scan)
+            self.__log_message("move_uav", destination_node, "moved", uav.uav_traversal_time, "UAV %d moved to passage %s. Estimates can now be obtained for hex %s.", uav.uav_number, destination_node, destination_node)
+            return hex
+        self.__log_message("move_uav", destination_node, "refused", 0, "UAV %d could not be moved to passage %s. Please check the destination exists and is adjacent to the UAV's current location", uav.uav_number, destination_node)
         return None
     
-    def __is_adjacent(self, current_hex: Hexagon, destination_hex: Hexagon) -> bool:
+    def move_ugv_path(self, path: list[str], num_ugv: int = 1) -> int:
+        """
+        Move the UGV along a route of adjacent hexes in one step and increase the cost
+
+        The route is taken as the same run of move_ugv calls would take it: landmines already detected
+        are cleared on the way, and the UGV stops short of the first undetected landmine, detecting it.
+        The whole route is checked before the UGV moves and refused if any hex doesn't exist or isn't
+        adjacent to the one before it. One event is logged for the route, and the trace records each
+        move taken so replays take them one at a time.
+
+        Params:
+            path (list[str]): The labels of the hexes to move through in order, not including the UGV's own
+            num_ugv (int): The number of the UGV to move
+
+        Returns:
+            0 if the UGV stopped at a landmine it found, 1 if it cleared a landmine on the last hex, 2 if it moved along the whole route, and -1 if the route was refused
+        """
+
+        ugv = self.__ugvs[num_ugv - 1] if 0 < num_ugv <= len(self.__ugvs) else None
+        indices = self.__path_indices(ugv.ugv_location, path) if ugv is not None else None
+        name = "UGV" if len(self.__ugvs) == 1 else "UGV %d" % num_ugv
+        if indices is None:
+            self.__log_message("move_ugv_path", path[-1] if path else None, "refused", 0, "%s could not be moved along %s. Please check every hex exists and is adjacent to the one before it, starting from the UGV's current location", name, " ".join(path))
+            return -1
+        flags = self.__hexagons.flags[indices]
+        mines = (flags & MINE_PRESENT) != 0
+        undetected = mines & ((flags & MINE_FOUND) == 0)
+        stop = int(undetected.argmax()) if undetected.any() else len(indices)
+        if self.__trace is not None:
+            self.__trace.extend(MOVE_UGV, indices[:stop + 1], num_ugv if num_ugv != 1 else 0)
+        taken = indices[:stop]
+        # A detected landmine is cleared on the first visit to its hex, later visits are plain moves
+        clearing = mines[:stop]
+        if clearing.any():
+            clearing = np.zeros(stop, dtype=bool)
+            clearing[np.unique(taken, return_index=True)[1]] = True
+            clearing &= mines[:stop]
+        cleared = taken[clearing]
+        if len(cleared):
+            self.__hexagons.set(cleared, MINE_CLEARED)
+            self.__hexagons.set(cleared, MINE_PRESENT, False)
+        cost = (len(taken) - len(cleared)) * ugv.ugv_traversal_time + len(cleared) * ugv.ugv_clear_time
+        if len(taken):
+            ugv.ugv_location = self.__hexagons[int(taken[-1])]
+        if stop < len(indices):
+            self.__hexagons.set(int(indices[stop]), MINE_FOUND)
+            cost += ugv.ugv_traversal_time
+        self.__increment_total(cost)
+        if stop < len(indices):
+            self.__log_message("move_ugv_path", path[stop], "mine_found", cost, "%s moved %d of %d hexes to passage %s, clearing %d landmines. Landmine detected along hex %s. Move UGV again to clear landmine and complete traversal.",
+                               name, stop, len(path), ugv.ugv_location.label, len(cleared), path[stop])
+        else:
+            self.__log_message("move_ugv_path", path[-1], "moved", cost, "%s moved along %d hexes to passage %s, clearing %d landmines.", name, len(path), path[-1], len(cleared))
+        # Passing through the end node succeeds even if the UGV stops at a landmine further on
+        if self.__grid.index_of(self.end_node) in taken:
+            self.__log_message("move_ugv_path", self.end_node, "mission_success", 0, "MISSION SUCCESS")
+        if stop < len(indices):
+            return 0
+        return 1 if clearing[-1] else 2
+
+    def move_uav_path(self, uav: UAV, path: list[str]) -> Hexagon:
+        """
+        Move the UAV along a route of adjacent hexes in one step, scanning each, and increase the cost
+
+        The whole route is checked before the UAV moves and refused if any hex doesn't exist or isn't
+        adjacent to the one before it. One event is logged for the route, and the trace records each
+        move so replays take them one at a time.
+
+        Params:
+            uav (UAV): The UAV to be moved
+            path (list[str]): The labels of the hexes to move through in order, not including the UAV's own
+
+        Returns:
+            The last hex scanned by the UAV or None if the route was refused
+        """
+
+        indices = self.__path_indices(uav.uav_location, path)
+        if indices is None:
+            self.__log_message("move_uav_path", path[-1] if path else None, "refused", 0, "UAV %d could not be moved along %s. Please check every hex exists and is adjacent to the one before it, starting from the UAV's current location", uav.uav_number, " ".join(path))
+            return None
+        if self.__trace is not None:
+            self.__trace.extend(MOVE_UAV, indices, uav.uav_number)
+        cost = len(indices) * uav.uav_traversal_time
+        self.__increment_total(cost)
+        uav.uav_location = self.__hexagons[int(indices[-1])]
+        self.__hexagons.scan(indices, uav.uav_number, uav.ai_scan)
+        self.__log_message("move_uav_path", path[-1], "moved", cost, "UAV %d moved along %d hexes to passage %s. Estimates can now be obtained for hexes %s.", uav.uav_number, len(path), path[-1], " ".join(path))
+        return uav.uav_location
+
+    def __path_indices(self, current_hex: Hexagon, path: list[str]) -> np.ndarray:
         """
-        Checks whether or not two hexagons are adjacent to one another
+        Looks up the hexes of a route and checks each is adjacent to the one before it
+
+        Params:
+            current_hex (Hexagon): The hexagon the route starts from
+            path (list[str]): The labels of the hexes along the route
+
+        Returns:
+            np.ndarray - The indices of the hexes, or None if the route is empty or broken
+        """
+
+        indices = [self.__grid.index_of(label) for label in path]
+        if not indices or None in indices:
+            return None
+        indices = np.array(indices, dtype=np.intp)
+        previous = np.concatenate(([current_hex.index], indices[:-1]))
+        if not self.__grid.are_adjacent(previous, indices).all():
+            return None
+        return indices
+
+    def adjacent_hexagons(self, hex: Hexagon) -> list[Hexagon]:
+        """
+        Gets the hexagons adjacent to a hexagon
+
+        Params:
+            hex (Hexagon): The hexagon to find the neighbors of
+
+        Returns:
+            list[Hexagon] - The hexagons a vehicle at hex can move to
+        """
+
+        return [self.__hexagons[index] for index in self.__grid.neighbors(hex.index)]
+
+    def __is_adjacent(self, current_hex: Hexagon, destination_index: int) -> bool:
+        """
+        Checks whether or not a hexagon is adjacent to another
         
         Parameters:
             current_hex (Hexagon): The current hexagon selected
-            destination_hex (Hexagon): The hexagon to check adjacency to the current
+            destination_index (int): The index of the hexagon to check adjacency to the current
         
         Returns:
-            True if the current_hex and destination_hex are adjacent
+            True if the current_hex and destination hexagon are adjacent
         """
-        if current_hex == destination_hex:
-            return False
-        letter_map = {'A': 0, 'B': 1, 'C': 2, 'D': 3,'E': 4, 'F': 5, 'G': 6, 'H': 7, 'I': 8, 'J': 9}
-        current_code = (letter_map[current_hex.label[0]], letter_map[current_hex.label[1]])
-        destination_code = (letter_map[destination_hex.label[0]], letter_map[destination_hex.label[1]])
-        return (
-            (current_code[0] == destination_code[0] and (current_code[1] + 1 - destination_code[1]) in [0, 1, 2]) or
-            (current_code[1] == destination_code[1] and (current_code[0] + 1 - destination_code[0]) in [0, 1, 2]) or
-            (current_code[1] % 2 == 0 and current_code[0] - 1 == destination_code[0] and (current_code[1] + 1 - destination_code[1]) in [0, 1, 2]) or
-            (current_code[1] % 2 == 1 and current_code[0] + 1 == destination_code[0] and (current_code[1] + 1 - destination_code[1]) in [0, 1, 2])
-        )
+        return self.__grid.is_adjacent(current_hex.index, destination_index)
+
+    def mine_probabilities(self) -> np.ndarray:
+        """
+        Gets the probability a mine is present in each hexagon from what has been revealed so far
+
+        The AI and human estimates queried for each hexagon are fused by the fusion model. Detected
+        mines are certain and cleared hexagons are safe.
+
+        Returns:
+            np.ndarray - The float64 probability of each hexagon
+        """
+        return self.__mine_probabilities()
+
+    def __mine_probabilities(self) -> np.ndarray:
+        """
+        Gets the probability a mine is present in each hexagon, for planning without counting as a lookup
+
+        Returns:
+            np.ndarray - The float64 probability of each hexagon
+        """
+
+        if self.__evidence is None:
+            self.__evidence = self.__fusion.evidence(self.__hexagons)
+        probabilities = self.__fusion.posterior(self.__hexagons, self.__evidence)
+        probabilities[self.__hexagons.has_all(MINE_PRESENT | MINE_FOUND)] = 1.0
+        probabilities[self.__hexagons.has(MINE_CLEARED)] = 0.0
+        return probabilities
+
+    def plan_route(self, destination_node: str = None, num_ugv: int = 1) -> Route:
+        """
+        Plans the UGV route with the least expected cost from its current location
+
+        The first plan to a goal is an A* search. Planning to the same goal again seeds an incremental
+        search with every hex's exact cost to the goal, which is kept between calls and repaired where
+        hex costs have changed since the last plan, such as a detected mine or new estimates, rather
+        than rerun from scratch.
+
+        Params:
+            destination_node (str): The label of the hex to plan to, the end node if not given
+            num_ugv (int): The number of the UGV to plan for
+
+        Returns:
+            Route - The labels along the route starting at the UGV and its expected cost, or None if unreachable
+        """
+
+        goal = self.__grid.index_of(destination_node or self.end_node)
+        if goal is None:
+            return None
+        ugv = self.__ugvs[num_ugv - 1]
+        costs = expected_costs(self.__hexagons, self.__mine_probabilities(), ugv.ugv_traversal_time, ugv.ugv_clear_time)
+        planner = self.__planners[num_ugv - 1]
+        if planner is not None and planner.goal == goal:
+            changed = np.flatnonzero(costs != planner.costs)
+            planner.update_costs(changed, costs[changed])
+            planner.move_start(ugv.ugv_location.index)
+            return planner.plan()
+        if self.__planned_goals[num_ugv - 1] != goal:
+            # A one off plan, far cheaper than an incremental search from scratch
+            self.__planned_goals[num_ugv - 1] = goal
+            self.__planners[num_ugv - 1] = None
+            return a_star(self.__grid, costs, ugv.ugv_location.index, goal)
+        cost_to_goal = cost_field(self.__grid, costs, goal, towards=True)
+        planner = IncrementalPlanner(self.__grid, costs, ugv.ugv_location.index, goal, min(ugv.ugv_traversal_time, ugv.ugv_clear_time), cost_to_goal)
+        self.__planners[num_ugv - 1] = planner
+        return planner.plan()
 
     def get_chosen_hex(self, label: str) -> Hexagon:
         """
@@ -338,21 +787,28 @@ class Mission():
             The hex that was chosen or None otherwise
         """
 
-        for hex in self.hexagons:
-            if hex.label == label:
-                self.__selected_hexagon = hex
-                self.__log_message("Selected hex %s" % (hex.label))
-                return hex
-        self.__log_message("Hex %s could not be found" % (label))
+        index = self.__grid.index_of(label)
+        if self.__trace is not None:
+            self.__trace.append(SELECT, index)
+        if index is not None:
+            hex = self.__hexagons[index]
+            self.__selected_hexagon = hex
+            self.__log_message("select", hex.label, "selected", 0, "Selected hex %s", hex.label)
+            return hex
+        self.__log_message("select", label, "refused", 0, "Hex %s could not be found", label)
         return None
 
-    def __log_message(self, msg: str):
+    def __log_message(self, action: str, hex: str, outcome: str, cost: float, template: str, *args):
         """
-        Logs a message to the log file
-        
+        Records an event to the mission's event log
+
         Params:
-            msg (str): The message to be logged
+            action (str): The action taken
+            hex (str): The label of the hex acted on, None if there was none
+            outcome (str): What came of the action
+            cost (float): The amount the action added to the total
+            template (str): The %-style template of the message, only formatted when it is read
+            args: The values formatted into the template
         """
 
-        self.__current_log = msg
-        logging.log(level=logging.INFO, msg=msg)
+        self.__last_event = self.__events.record(action, hex, outcome, cost, self.__total, template, *args)
@@ -0,0 +1,342 @@
+import heapq
+from dataclasses import dataclass
+import numpy as np
+from gridstate import GridState, MINE_PRESENT, MINE_FOUND
+from hexgrid import HexGrid
+
+
+@dataclass
+class Route:
+    labels: list[str]
+    cost: float
+
+
+def expected_costs(state: GridState, probabilities: np.ndarray, traversal_time: float, clear_time: float) -> np.ndarray:
+    """
+    Computes the expected cost for the UGV to move into each hex
+
+    Moving onto an undetected mine costs a traversal and leaves the UGV where it was, and the next
+    move clears it, so a hex with mine probability p costs traversal_time + p * clear_time. A hex
+    whose mine has already been detected costs clear_time.
+
+    Params:
+        state (GridState): The grid state of the mission
+        probabilities (np.ndarray): The probability a mine is present in each hex
+        traversal_time (float): The UGV traversal time
+        clear_time (float): The UGV clear time
+
+    Returns:
+        np.ndarray - The float64 expected cost of entering each hex
+    """
+
+    costs = traversal_time + probabilities * clear_time
+    detected = state.has_all(MINE_PRESENT | MINE_FOUND)
+    costs[detected] = clear_time
+    return costs
+
+
+def cost_field(grid: HexGrid, costs: np.ndarray, source: int, towards: bool = False) -> np.ndarray:
+    """
+    Finds the cheapest route cost between a hex and every other hex, where each move costs the cost
+    of the hex entered
+
+    Params:
+        grid (HexGrid): The grid to route across
+        costs (np.ndarray): The cost of entering each hex
+        source (int): The index of the hex routes start from, or end at if towards is True
+        towards (bool): True for the cost of routes from every hex to the source instead
+
+    Returns:
+        np.ndarray - The float64 route cost of each hex, inf where unreachable
+    """
+
+    step_costs = costs.tolist()
+    best = [float('inf')] * len(grid)
+    closed = bytearray(len(grid))
+    neighbors = grid.neighbor_lists
+    best[source] = 0.0
+    frontier = [(0.0, source)]
+    while frontier:
+        cost, index = heapq.heappop(frontier)
+        if closed[index]:
+            continue
+        closed[index] = 1
+        for neighbor in neighbors[index]:
+            # Routes into the source pay for the hex moved into from the neighbor rather than the neighbor
+            candidate = cost + (step_costs[index] if towards else step_costs[neighbor])
+            if candidate < best[neighbor]:
+                best[neighbor] = candidate
+                heapq.heappush(frontier, (candidate, neighbor))
+    return np.array(best)
+
+
+def a_star(grid: HexGrid, costs: np.ndarray, start: int, goal: int) -> Route:
+    """
+    Finds the cheapest route between two hexes, where each move costs the cost of the hex entered
+
+    The heuristic is the hex distance to the goal times the cheapest hex, which never overestimates
+    and is consistent, so every hex is expanded at most once.
+
+    Params:
+        grid (HexGrid): The grid to route across
+        costs (np.ndarray): The cost of entering each hex
+        start (int): The index of the first hex
+        goal (int): The index of the last hex
+
+    Returns:
+        Route - The labels along the route including start and goal and its cost, or None if unreachable
+    """
+
+    step_costs = costs.tolist()
+    heuristic = (grid.distances(goal) * float(costs.min())).tolist()
+    best = [float('inf')] * len(grid)
+    previous = [-1] * len(grid)
+    closed = bytearray(len(grid))
+    neighbors = grid.neighbor_lists
+    best[start] = 0.0
+    # Ties on the estimated total are broken towards the goal, which keeps plateaus of equally good
+    # routes from being expanded breadth first
+    frontier = [(heuristic[start], heuristic[start], start)]
+    while frontier:
+        _, _, index = heapq.heappop(frontier)
+        if closed[index]:
+            continue
+        if index == goal:
+            break
+        closed[index] = 1
+        cost = best[index]
+        for neighbor in neighbors[index]:
+            candidate = cost + step_costs[neighbor]
+            if candidate < best[neighbor]:
+                best[neighbor] = candidate
+                previous[neighbor] = index
+                heapq.heappush(frontier, (candidate + heuristic[neighbor], heuristic[neighbor], neighbor))
+    if best[goal] == float('inf'):
+        return None
+
+    labels = grid.labels
+    route = []
+    index = goal
+    while index != -1:
+        route.append(labels[index])
+        index = previous[index]
+    return Route(route[::-1], best[goal])
+
+
+class IncrementalPlanner():
+    def __init__(self, grid: HexGrid, costs: np.ndarray, start: int, goal: int, min_cost: float, cost_to_goal: np.ndarray = None):
+        """
+        Creates the IncrementalPlanner object, a D* Lite search that repairs its previous result when
+        hex costs change or the start moves instead of planning from scratch
+
+        The search runs backwards from the goal, so g[s] is the cost from hex s to the goal. Changing
+        the cost of entering a hex only disturbs the neighbors that could enter it, and the repair
+        work is limited to the part of the grid whose cost to go actually changes.
+
+        Searching from scratch only has the cheapest possible hex to bound costs by, which expands much
+        of the grid. Given the exact cost to the goal of every hex, such as cost_field towards the goal
+        gives, the search starts out complete and only ever repairs.
+
+        Parameters:
+            grid (HexGrid): The grid to route across
+            costs (np.ndarray): The cost of entering each hex
+            start (int): The index of the hex routes start from
+            goal (int): The index of the hex routes end at
+            min_cost (float): A lower bound on the cost of entering any hex, now and after any update
+            cost_to_goal (np.ndarray): The cost from every hex to the goal under costs, searched for if not given
+        """
+        self.__grid = grid
+        self.__costs = np.array(costs, dtype=np.float64)
+        self.__step_costs = self.__costs.tolist()
+        self.__neighbors = grid.neighbor_lists
+        self.__q = grid.q.tolist()
+        self.__r = grid.r.tolist()
+        self.__min_cost = float(min_cost)
+        self.__start = start
+        self.__goal = goal
+        self.__km = 0.0
+        self.__keys = [None] * len(grid)
+        self.__queue = []
+        if cost_to_goal is not None:
+            # Every hex is consistent, so nothing is queued until costs change
+            self.__g = np.asarray(cost_to_goal, dtype=np.float64).tolist()
+            self.__rhs = list(self.__g)
+            return
+        self.__g = [float('inf')] * len(grid)
+        self.__rhs = [float('inf')] * len(grid)
+        self.__rhs[goal] = 0.0
+        self.__push(goal)
+
+    @property
+    def costs(self) -> np.ndarray:
+        """
+        Gets the costs field
+
+        Returns:
+            np.ndarray - The cost of entering each hex the planner currently assumes
+        """
+        return self.__costs
+
+    @property
+    def goal(self) -> int:
+        """
+        Gets the goal field
+
+        Returns:
+            int - The index of the hex routes end at
+        """
+        return self.__goal
+
+    def __heuristic(self, index: int) -> float:
+        """
+        Lower bound on the cost between the start and a hex
+
+        Parameters:
+            index (int): The index of the hex
+
+        Returns:
+            float - The hex distance from the start times the cheapest possible hex
+        """
+        dq = self.__q[index] - self.__q[self.__start]
+        dr = self.__r[index] - self.__r[self.__start]
+        return (abs(dq) + abs(dr) + abs(dq + dr)) // 2 * self.__min_cost
+
+    def __key(self, index: int) -> tuple[float, float]:
+        best = min(self.__g[index], self.__rhs[index])
+        return (best + self.__heuristic(index) + self.__km, best)
+
+    def __push(self, index: int):
+        key = self.__key(index)
+        self.__keys[index] = key
+        heapq.heappush(self.__queue, (key[0], key[1], index))
+
+    def __top(self) -> tuple:
+        """
+        Drops queue entries superseded by a later push or removal
+
+        Returns:
+            tuple - The (key 1, key 2, index) entry with the smallest key, or None if the queue is empty
+        """
+        queue = self.__queue
+        keys = self.__keys
+        while queue:
+            entry = queue[0]
+            key = keys[entry[2]]
+            if key is not None and key[0] == entry[0] and key[1] == entry[1]:
+                return entry
+            heapq.heappop(queue)
+        return None
+
+    def __lookahead(self, index: int) -> float:
+        """
+        Computes the best cost to the goal through the neighbors of a hex
+
+        Parameters:
+            index (int): The index of the hex
+
+        Returns:
+            float - The smallest cost of entering a neighbor plus its cost to the goal
+        """
+        g = self.__g
+        step_costs = self.__step_costs
+        return min((step_costs[neighbor] + g[neighbor] for neighbor in self.__neighbors[index]), default=float('inf'))
+
+    def __update(self, index: int):
+        if self.__g[index] != self.__rhs[index]:
+            self.__push(index)
+        else:
+            self.__keys[index] = None
+
+    def __compute(self):
+        g = self.__g
+        rhs = self.__rhs
+        step_costs = self.__step_costs
+        neighbors = self.__neighbors
+        start = self.__start
+        goal = self.__goal
+        while True:
+            top = self.__top()
+            if top is None:
+                break
+            start_key = self.__key(start)
+            if (top[0], top[1]) >= start_key and rhs[start] == g[start]:
+                break
+            index = top[2]
+            key = self.__key(index)
+            if (top[0], top[1]) < key:
+                self.__push(index)
+            elif g[index] > rhs[index]:
+                g[index] = rhs[index]
+                self.__keys[index] = None
+                entry = step_costs[index] + g[index]
+                for neighbor in neighbors[index]:
+                    if neighbor != goal and entry < rhs[neighbor]:
+                        rhs[neighbor] = entry
+                    self.__update(neighbor)
+            else:
+                old = step_costs[index] + g[index]
+                g[index] = float('inf')
+                for neighbor in neighbors[index]:
+                    if neighbor != goal and rhs[neighbor] == old:
+                        rhs[neighbor] = self.__lookahead(neighbor)
+                    self.__update(neighbor)
+                if index != goal:
+                    rhs[index] = self.__lookahead(index)
+                self.__update(index)
+
+    def update_costs(self, indices, costs):
+        """
+        Changes the cost of entering some hexes
+
+        Parameters:
+            indices: The indices of the hexes whose cost changed
+            costs: The new cost of each of those hexes
+        """
+        g = self.__g
+        rhs = self.__rhs
+        step_costs = self.__step_costs
+        for index, cost in zip(np.asarray(indices).tolist(), np.asarray(costs, dtype=np.float64).tolist()):
+            old = step_costs[index]
+            if cost == old:
+                continue
+            step_costs[index] = cost
+            self.__costs[index] = cost
+            for neighbor in self.__neighbors[index]:
+                if neighbor == self.__goal:
+                    continue
+                if cost < old:
+                    rhs[neighbor] = min(rhs[neighbor], cost + g[index])
+                elif rhs[neighbor] == old + g[index]:
+                    rhs[neighbor] = self.__lookahead(neighbor)
+                self.__update(neighbor)
+
+    def move_start(self, start: int):
+        """
+        Moves the hex routes start from, such as after the UGV moves
+
+        Parameters:
+            start (int): The index of the new start hex
+        """
+        if start != self.__start:
+            self.__km += self.__heuristic(start)
+            self.__start = start
+
+    def plan(self) -> Route:
+        """
+        Brings the search up to date and follows it from the start to the goal
+
+        Returns:
+            Route - The labels along the route including start and goal and its cost, or None if unreachable
+        """
+        self.__compute()
+        g = self.__g
+        if g[self.__start] == float('inf'):
+            return None
+        step_costs = self.__step_costs
+        labels = self.__grid.labels
+        index = self.__start
+        route = [labels[index]]
+        while index != self.__goal:
+            index = min(self.__neighbors[index], key=lambda neighbor: step_costs[neighbor] + g[neighbor])
+            route.append(labels[index])
+        return Route(route, g[self.__start])
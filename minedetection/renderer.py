@@ -1,19 +1,76 @@
-import pyqtgraph as pg
+import argparse
 import math
-from PyQt6.QtWidgets import QMainWindow, QApplication, QGridLayout, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QGraphicsPolygonItem, QGraphicsScene, QGraphicsView, QGraphicsTextItem
-from PyQt6.QtCore import QPointF, Qt
-from PyQt6.QtGui import QPolygonF, QColor
+import numpy as np
+from PyQt6.QtWidgets import QMainWindow, QApplication, QGridLayout, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QLineEdit, QCheckBox, QGraphicsItem, QGraphicsPathItem, QGraphicsPolygonItem, QGraphicsScene, QGraphicsView, QGraphicsTextItem
+from PyQt6.QtCore import QPointF, QRectF, Qt
+from PyQt6.QtGui import QBrush, QImage, QPainter, QPainterPath, QPen, QPolygonF, QColor
+from gridstate import MINE_FOUND, MINE_CLEARED, AI_1_QUERIED, AI_2_QUERIED, HUMAN_QUERIED, UAV_1_SCANNED, UAV_2_SCANNED
+from hexgrid import HexGrid
 from mission import Mission
 
 
+# The fill of a hex by what is on it, shared by every hex
+HEX_BRUSHES = {"ugv": QBrush(QColor("red")), "uav": QBrush(QColor("green")), "empty": QBrush(QColor(0, 0, 0, 127))}
+HEX_PEN = QColor(255, 255, 255, 127)
+
+# Grids with more hexes than this are drawn by a single HexLayerItem rather than an item per hex
+BATCH_THRESHOLD = 2500
+# The on screen hex radius in pixels from which hexes are drawn as polygons rather than an image, and labelled
+POLYGON_PIXELS = 5
+LABEL_PIXELS = 16
+
+# Overlay opacity by what is known of a hex, and the fill of hexes whose mine was found or cleared
+OVERLAY_ALPHA_UNSCANNED = 70
+OVERLAY_ALPHA_SCANNED = 150
+OVERLAY_ALPHA_QUERIED = 235
+OVERLAY_FOUND = QColor(40, 0, 60).rgba()
+OVERLAY_CLEARED = QColor(40, 110, 255).rgba()
+# The share of a hex the overlay covers, leaving the vehicle colors of the map showing around it
+OVERLAY_INSET = 0.7
+ROUTE_PEN = QColor(0, 220, 255)
+
+
+def overlay_colors(mission: Mission) -> np.ndarray:
+    """
+    Colors every hex by what is known of it, as one array operation over the grid state
+
+    The hue runs from green to red with the fused mine probability, and the opacity rises from
+    hexes no UAV has scanned, to scanned ones, to ones with any estimate. Hexes whose mine was
+    found or cleared take their own colors.
+
+    Params:
+        mission (Mission): The mission
+
+    Returns:
+        np.ndarray - The uint32 ARGB color of each hex
+    """
+
+    hexagons = mission.hexagons
+    probabilities = mission.mine_probabilities()
+    red = np.minimum(255, np.round(510 * probabilities)).astype(np.uint32)
+    green = np.minimum(255, np.round(510 * (1 - probabilities))).astype(np.uint32)
+    alpha = np.full(len(hexagons), OVERLAY_ALPHA_UNSCANNED, dtype=np.uint32)
+    alpha[hexagons.has(UAV_1_SCANNED | UAV_2_SCANNED)] = OVERLAY_ALPHA_SCANNED
+    alpha[hexagons.has(AI_1_QUERIED | AI_2_QUERIED | HUMAN_QUERIED)] = OVERLAY_ALPHA_QUERIED
+    colors = alpha << 24 | red << 16 | green << 8
+    colors[hexagons.has(MINE_FOUND)] = OVERLAY_FOUND
+    colors[hexagons.has(MINE_CLEARED)] = OVERLAY_CLEARED
+    return colors
+
+
 class Renderer(QMainWindow):
-    def __init__(self):
+    def __init__(self, scenario="example_scenario_two_scans.json", batched: bool = None, log_to_file: bool = True):
         """
         Creates the Renderer object
+
+        Params:
+            scenario: The scenario JSON file within the config directory, the path of one, or a Scenario
+            batched (bool): Whether to draw the map as one batched layer, by default for grids of more than BATCH_THRESHOLD hexes
+            log_to_file (bool): False to keep the mission's events in memory only
         """
         super().__init__()
 
-        self.mission = Mission("example_scenario_two_scans.json")
+        self.mission = Mission(scenario, log_to_file)
 
         self.show_flag = 0
         win_width = 1400
@@ -21,12 +78,11 @@ class Renderer(QMainWindow):
         self.resize(win_width, win_height)
         self.showMaximized()
 
-        hexagon_labels = []
-        for hex in self.mission.hexagons:
-            hexagon_labels.append(hex.label)
-        self.hex_map = Renderer.HexagonMap(self, hexagon_labels)
+        self.hex_map = Renderer.HexagonMap(self, self.mission.grid, batched)
 
         self.setWindowTitle('Scenario')
+        # Imported here as only the window needs it, and it takes as long to import as Qt itself
+        import pyqtgraph as pg
         pg.setConfigOption('background', 'w')
         pg.setConfigOption('foreground', 'w')
         self.background = "background-color: white; color: white;"
@@ -39,6 +95,16 @@ class Renderer(QMainWindow):
         self.widget.setLayout(self.main_panel)
         self.setCentralWidget(self.widget)
 
+    def closeEvent(self, event):
+        """
+        Writes out the mission's log as the window closes
+
+        Params:
+            event (QCloseEvent): The close event
+        """
+        self.mission.close()
+        super().closeEvent(event)
+
     def render(self):
         """
         Render the window by calling show and processing all events
@@ -53,9 +119,17 @@ class Renderer(QMainWindow):
         """
         self.ui_layout = QVBoxLayout()
 
+        mission = self.mission
+        ugv_names = ["UGV"] if len(mission.ugvs) == 1 else ["UGV %d" % ugv.ugv_number for ugv in mission.ugvs]
+
         #  Mission Details
+        details = ["Start Node - %s" % mission.start_node, "End Node - %s" % mission.end_node]
+        details += ["UAV %d Traversal Time - %s" % (uav.uav_number, uav.uav_traversal_time) for uav in mission.uavs]
+        details += ["Cost of Human Estimate - %s" % mission.human_estimate_time, "Cost of AI Estimate - %s" % mission.ai_estimate_time]
+        for name, ugv in zip(ugv_names, mission.ugvs):
+            details += ["%s Traversal Time - %s" % (name, ugv.ugv_traversal_time), "%s Clear Time - %s" % (name, ugv.ugv_clear_time)]
         self.add_custom_h_box_to_ui([
-            [QLabel(), "Mission Details: Start Node - %s, End Node - %s, UAV 1 Traversal Time - %s, UAV 2 Traversal Time - %s, Cost of Human Estimate - %s, Cost of AI Estimate - %s, UGV Traversal Time - %s, UGV Clear Time - %s" % (self.mission.start_node, self.mission.end_node, self.mission.uav_1.uav_traversal_time, self.mission.uav_2.uav_traversal_time, self.mission.human_estimate_time, self.mission.ai_estimate_time, self.mission.ugv_traversal_time, self.mission.ugv_clear_time)]  # noqa: E501
+            [QLabel(), "Mission Details: " + ", ".join(details)]
         ])
 
         #  Mission Report (Error Reporting)
@@ -65,21 +139,15 @@ class Renderer(QMainWindow):
             [self.mission_report, ""]
         ])
 
-        #  AI 1 Mine Estimate
-        self.ai_1_query_value_label = QLabel()
-        self.add_custom_h_box_to_ui([
-            [QLabel(), "AI 1 Mine Estimate: "],
-            [self.ai_1_query_value_label, "N/A"],
-            [QPushButton(), "Get AI 1 Estimate", self.query_ai, 1]
-        ])
-
-        #  AI 2 Mine Estimate
-        self.ai_2_query_value_label = QLabel()
-        self.add_custom_h_box_to_ui([
-            [QLabel(), "AI 2 Mine Estimate: "],
-            [self.ai_2_query_value_label, "N/A"],
-            [QPushButton(), "Get AI 2 Estimate", self.query_ai, 2]
-        ])
+        #  AI Mine Estimate of each UAV
+        self.ai_query_value_labels = []
+        for uav in mission.uavs:
+            self.ai_query_value_labels.append(QLabel())
+            self.add_custom_h_box_to_ui([
+                [QLabel(), "AI %d Mine Estimate: " % uav.uav_number],
+                [self.ai_query_value_labels[-1], "N/A"],
+                [QPushButton(), "Get AI %d Estimate" % uav.uav_number, self.query_ai, uav.uav_number]
+            ])
 
         #  Human Mine Estimate
         self.human_query_value_label = QLabel()
@@ -89,6 +157,13 @@ class Renderer(QMainWindow):
             [QPushButton(), "Get Human Estimate", self.query_human]
         ])
 
+        #  Fused Mine Probability
+        self.probability_value_label = QLabel()
+        self.add_custom_h_box_to_ui([
+            [QLabel(), "Mine Probability: "],
+            [self.probability_value_label, "N/A"]
+        ])
+
         #  Terrain Type
         self.terrain_value_label = QLabel()
         self.add_custom_h_box_to_ui([
@@ -96,38 +171,33 @@ class Renderer(QMainWindow):
             [self.terrain_value_label, "N/A"]
         ])
 
-        #  UAV 1 Location and Moving
-        self.uav_1_value_label = QLabel(self.mission.uav_1.uav_location.label)
-        self.move_uav_1_box = QLineEdit()
-        self.add_custom_h_box_to_ui([
-            [QLabel(), "UAV 1 Location: "],
-            [self.uav_1_value_label, self.mission.uav_1.uav_location.label],
-            [QLabel(), "Move UAV 1 To: "],
-            [self.move_uav_1_box],
-            [QPushButton(), "Move", self.move_uav, 1]
-        ])
-
-        #  UAV 2 Location and Moving
-        self.uav_2_value_label = QLabel(self.mission.uav_2.uav_location.label)
-        self.move_uav_2_box = QLineEdit()
-        self.add_custom_h_box_to_ui([
-            [QLabel(), "UAV 2 Location: "],
-            [self.uav_2_value_label, self.mission.uav_2.uav_location.label],
-            [QLabel(), "Move UAV 2 To: "],
-            [self.move_uav_2_box],
-            [QPushButton(), "Move", self.move_uav, 2]
-        ])
-
-        #  UGV Location and Moving
-        self.ugv_value_label = QLabel(self.mission.ugv_location.label)
-        self.move_ugv_box = QLineEdit()
-        self.add_custom_h_box_to_ui([
-            [QLabel(), "UGV Location: "],
-            [self.ugv_value_label, self.mission.ugv_location.label],
-            [QLabel(), "Move UGV To: "],
-            [self.move_ugv_box],
-            [QPushButton(), "Move", self.move_ugv]
-        ])
+        #  Location and Moving of each UAV
+        self.uav_value_labels = []
+        self.move_uav_boxes = []
+        for uav in mission.uavs:
+            self.uav_value_labels.append(QLabel(uav.uav_location.label))
+            self.move_uav_boxes.append(QLineEdit())
+            self.add_custom_h_box_to_ui([
+                [QLabel(), "UAV %d Location: " % uav.uav_number],
+                [self.uav_value_labels[-1], uav.uav_location.label],
+                [QLabel(), "Move UAV %d To: " % uav.uav_number],
+                [self.move_uav_boxes[-1]],
+                [QPushButton(), "Move", self.move_uav, uav.uav_number]
+            ])
+
+        #  Location and Moving of each UGV
+        self.ugv_value_labels = []
+        self.move_ugv_boxes = []
+        for name, ugv in zip(ugv_names, mission.ugvs):
+            self.ugv_value_labels.append(QLabel(ugv.ugv_location.label))
+            self.move_ugv_boxes.append(QLineEdit())
+            self.add_custom_h_box_to_ui([
+                [QLabel(), "%s Location: " % name],
+                [self.ugv_value_labels[-1], ugv.ugv_location.label],
+                [QLabel(), "Move %s To: " % name],
+                [self.move_ugv_boxes[-1]],
+                [QPushButton(), "Move", self.move_ugv, ugv.ugv_number]
+            ])
 
         #  Total Cost
         self.total_value_label = QLabel()
@@ -136,6 +206,12 @@ class Renderer(QMainWindow):
             [self.total_value_label, "0"]
         ])
 
+        #  Overlay of the mine probability, exploration and planned route of every hex
+        self.overlay_box = QCheckBox()
+        self.add_custom_h_box_to_ui([
+            [self.overlay_box, "Show mine probabilities and planned route", self.show_overlay]
+        ])
+
         #  Adding UI to Main Window
         ui_widget = QWidget()
         ui_widget.setLayout(self.ui_layout)
@@ -150,8 +226,9 @@ class Renderer(QMainWindow):
         Params:
             widget_list - A list of lists containing the widgets including
                 [QLabel(), label_string],
-                [QLineEdit()], OR
-                [QPushButtom(), button_string, button_function]
+                [QLineEdit()],
+                [QPushButtom(), button_string, button_function], OR
+                [QCheckBox(), check_box_string, toggled_function]
         """
 
         horizontal_layout = QHBoxLayout()
@@ -162,6 +239,10 @@ class Renderer(QMainWindow):
                 new_widget.setStyleSheet("QLabel { color: black; alignment: center}")
             elif type(new_widget) is QLineEdit:
                 pass
+            elif type(new_widget) is QCheckBox:
+                new_widget.setText(list[1])
+                new_widget.setStyleSheet("QCheckBox { color: black }")
+                new_widget.toggled.connect(list[2])
             elif type(new_widget) is QPushButton:
                 new_widget.setText(list[1])
                 if len(list) == 4:
@@ -186,24 +267,30 @@ class Renderer(QMainWindow):
             hex_label (str): The label for the hex to find
         """
 
-        if len(hex_label) == 2 and hex_label.isalpha:
-            chosen_hex = self.mission.get_chosen_hex(hex_label)
-            if chosen_hex is not None:
-                if chosen_hex.ai_1_queried:
-                    self.ai_1_query_value_label.setText(str(chosen_hex.ai_1_confidence))
-                else:
-                    self.ai_1_query_value_label.setText("Hex %s not yet estimated by AI 1" % (hex_label))
-                if chosen_hex.ai_2_queried:
-                    self.ai_2_query_value_label.setText(str(chosen_hex.ai_2_confidence))
-                else:
-                    self.ai_2_query_value_label.setText("Hex %s not yet estimated by AI 2" % (hex_label))
-                if chosen_hex.human_queried:
-                    self.human_query_value_label.setText(str(chosen_hex.human_confidence))
+        chosen_hex = self.mission.get_chosen_hex(hex_label)
+        if chosen_hex is not None:
+            for uav, label in zip(self.mission.uavs, self.ai_query_value_labels):
+                if chosen_hex.ai_queried_by(uav.uav_number):
+                    label.setText(str(chosen_hex.ai_confidence(uav.ai_scan)))
                 else:
-                    self.human_query_value_label.setText("Hex %s not yet estimated by humans" % (hex_label))
-                self.terrain_value_label.setText(chosen_hex.terrain)
+                    label.setText("Hex %s not yet estimated by AI %d" % (hex_label, uav.uav_number))
+            if chosen_hex.human_queried:
+                self.human_query_value_label.setText(str(chosen_hex.human_confidence))
+            else:
+                self.human_query_value_label.setText("Hex %s not yet estimated by humans" % (hex_label))
+            self.terrain_value_label.setText(chosen_hex.terrain)
+            self.update_probability()
         self.mission_report.setText(self.mission.current_log)
 
+    def update_probability(self):
+        """
+        Show the fused mine probability of the selected hex
+        """
+
+        if self.mission.selected_hexagon is not None:
+            probability = self.mission.mine_probabilities()[self.mission.selected_hexagon.index]
+            self.probability_value_label.setText("%.2f" % probability)
+
     def query_ai(self, num_uav: int):
         """
         Provide the AI cost and increase the total
@@ -214,10 +301,10 @@ class Renderer(QMainWindow):
 
         self.mission_report.setText("")
         if self.mission.query_ai(num_uav):
-            if num_uav == 1:
-                self.ai_1_query_value_label.setText(str(self.mission.selected_hexagon.ai_1_confidence))
-            elif num_uav == 2:
-                self.ai_2_query_value_label.setText(str(self.mission.selected_hexagon.ai_2_confidence))
+            ai_scan = self.mission.uavs[num_uav - 1].ai_scan
+            self.ai_query_value_labels[num_uav - 1].setText(str(self.mission.selected_hexagon.ai_confidence(ai_scan)))
+            self.update_probability()
+            self.update_overlay()
             self.total_value_label.setText(str(self.mission.total))
         self.mission_report.setText(self.mission.current_log)
 
@@ -229,86 +316,88 @@ class Renderer(QMainWindow):
         self.mission_report.setText("")
         if self.mission.query_human():
             self.human_query_value_label.setText(str(self.mission.selected_hexagon.human_confidence))
+            self.update_probability()
+            self.update_overlay()
             self.total_value_label.setText(str(self.mission.total))
         self.mission_report.setText(self.mission.current_log)
 
     def move_uav(self, num_uav: int):
         """
-        Move the UAV to a valid adjacent location and increase the cost
+        Move the UAV to a valid adjacent location, or along a route of several separated by spaces or
+        commas, and increase the cost
 
         Parameters:
             num_uav (int): The number of the uav to move
         """
 
-        uav_box_text = ""
-        label = None
-        uav = None
-        if num_uav == 1:
-            uav_box_text = self.move_uav_1_box.text().upper()
-            label = self.uav_1_value_label
-            uav = self.mission.uav_1
-        elif num_uav == 2:
-            uav_box_text = self.move_uav_2_box.text().upper()
-            label = self.uav_2_value_label
-            uav = self.mission.uav_2
+        path = self.move_uav_boxes[num_uav - 1].text().upper().replace(",", " ").split()
+        label = self.uav_value_labels[num_uav - 1]
+        uav = self.mission.uavs[num_uav - 1]
         self.mission_report.setText("")
         old_uav_location = uav.uav_location.label
-        hex = self.mission.move_uav(uav, uav_box_text)
+        if len(path) > 1:
+            hex = self.mission.move_uav_path(uav, path)
+        else:
+            hex = self.mission.move_uav(uav, path[0] if path else "")
         if hex is not None:
-            self.set_hex_color(old_uav_location, uav_box_text, f'uav{uav.uav_number}')
-            label.setText(uav_box_text)
+            self.set_hex_color(old_uav_location, hex.label, f'uav{uav.uav_number}')
+            self.update_overlay()
+            label.setText(hex.label)
             self.total_value_label.setText(str(self.mission.total))
         self.mission_report.setText(self.mission.current_log)
 
-    def move_ugv(self):
+    def move_ugv(self, num_ugv: int = 1):
         """
-        Move the UGV to a valid adjacent location and increase the cost
+        Move the UGV to a valid adjacent location, or along a route of several separated by spaces or
+        commas, and increase the cost
+
+        Parameters:
+            num_ugv (int): The number of the ugv to move
         """
 
         self.mission_report.setText("")
-        ugv_box_text = self.move_ugv_box.text().upper()
-        old_ugv_location = self.mission.ugv_location.label
-        status = self.mission.move_ugv(ugv_box_text)
-        if status != -1 and status != 0:
-            self.set_hex_color(old_ugv_location, ugv_box_text, "ugv")
-        if status == 2:
-            self.ugv_value_label.setText(ugv_box_text)
+        path = self.move_ugv_boxes[num_ugv - 1].text().upper().replace(",", " ").split()
+        ugv = self.mission.ugvs[num_ugv - 1]
+        old_ugv_location = ugv.ugv_location.label
+        if len(path) > 1:
+            status = self.mission.move_ugv_path(path, num_ugv)
+        else:
+            status = self.mission.move_ugv(path[0] if path else "", num_ugv)
+        if ugv.ugv_location.label != old_ugv_location:
+            self.set_hex_color(old_ugv_location, ugv.ugv_location.label, f'ugv{num_ugv}')
+            self.ugv_value_labels[num_ugv - 1].setText(ugv.ugv_location.label)
+        if status != -1:
+            self.update_overlay()
         self.total_value_label.setText(str(self.mission.total))
         self.mission_report.setText(self.mission.current_log)
 
-    def set_hex_color(self,  from_hex: str, to_hex: str, moving_vehicle: str):
-        hexes = self.hex_map.scene.items()
-        for hex in hexes:
-            if type(hex).__name__ == "HexagonItem":
-                if hex.label == to_hex:
-                    if moving_vehicle == "ugv":
-                        hex.ugv_present = True
-                        hex.setBrush(QColor("red"))
-                    else:
-                        if moving_vehicle == "uav1":
-                            hex.uav_1_present = True
-                        else:
-                            hex.uav_2_present = True
-                        hex.setBrush(QColor("green"))
-                elif hex.label == from_hex:
-                    if moving_vehicle == "ugv":
-                        hex.ugv_present = False
-                        if hex.uav_1_present or hex.uav_2_present:
-                            hex.setBrush(QColor("green"))
-                        else:
-                            hex.setBrush(QColor(0, 0, 0, 127))
-                    else:
-                        if moving_vehicle == "uav1":
-                            hex.uav_1_present = False
-                        else:
-                            hex.uav_2_present = False
-                        if hex.ugv_present:
-                            hex.setBrush(QColor("red"))
-                        elif hex.uav_1_present or hex.uav_2_present:
-                            hex.setBrush(QColor("green"))
-                        else:
-                            hex.setBrush(QColor(0, 0, 0, 127))
+    def show_overlay(self, shown: bool):
+        """
+        Shows or hides the overlay of every hex's mine probability and exploration and the planned route
+
+        Parameters:
+            shown (bool): Whether to show the overlay
+        """
+        self.hex_map.show_overlay(shown)
+        self.update_overlay()
+
+    def update_overlay(self):
+        """
+        Brings the overlay up to date with the mission after an action
+        """
+        self.hex_map.update_overlay(self.mission)
 
+    def set_hex_color(self, from_hex: str, to_hex: str, moving_vehicle: str):
+        """
+        Moves a vehicle's marker from one hex to another and repaints the two hexes
+
+        Parameters:
+            from_hex (str): The label of the hex the vehicle left
+            to_hex (str): The label of the hex the vehicle moved to
+            moving_vehicle (str): "ugv" or "uav" followed by the vehicle's number, such as "ugv1" or "uav2"
+        """
+        self.hex_map.move_marker(from_hex, to_hex, moving_vehicle)
+        self.hex_map.repaint_changed()
 
     class HexagonItem(QGraphicsPolygonItem):
         def __init__(self, center: QPointF, radius: int, label: str, renderer, parent=None):
@@ -324,9 +413,8 @@ class Renderer(QMainWindow):
             super().__init__(parent)
             self.label = label
             self.renderer = renderer
-            self.uav_1_present = False
-            self.uav_2_present = False
-            self.ugv_present = False
+            self.uavs_present = 0
+            self.ugvs_present = 0
 
             points = []
             for i in range(6):
@@ -344,14 +432,27 @@ class Renderer(QMainWindow):
             rect.moveCenter(self.boundingRect().center())
             self.textItem.setPos(rect.topLeft())
 
-            self.setBrush(QColor(0, 0, 0, 127))
             self.setPen(QColor(255, 255, 255, 127))
 
-            if label == renderer.mission.uav_1.uav_location.label:
-                self.uav_1_present = True
-                self.uav_2_present = True
-                self.ugv_present = True
-                self.setBrush(QColor("red"))
+            mission = renderer.mission
+            self.uavs_present = sum(label == uav.uav_location.label for uav in mission.uavs)
+            self.ugvs_present = sum(label == ugv.ugv_location.label for ugv in mission.ugvs)
+            self.brush_key = None
+            self.update_brush()
+
+        def update_brush(self) -> bool:
+            """
+            Colors the hex by what is on it, any UGV over any UAV over nothing
+
+            Returns:
+                bool - Whether the color changed, only then is the hex repainted
+            """
+            key = "ugv" if self.ugvs_present else "uav" if self.uavs_present else "empty"
+            if key == self.brush_key:
+                return False
+            self.brush_key = key
+            self.setBrush(HEX_BRUSHES[key])
+            return True
 
         def mousePressEvent(self, event):
             """
@@ -363,14 +464,182 @@ class Renderer(QMainWindow):
             if event.button() == Qt.MouseButton.LeftButton:
                 Renderer.get_chosen_hex(self.renderer, hex_label=self.label)
 
+    class HexLayerItem(QGraphicsItem):
+        def __init__(self, grid: HexGrid, radius: float, colors: np.ndarray, renderer=None, inset: float = 1.0, outline: bool = True, parent=None):
+            """
+            Creates the HexLayerItem object, drawing every hex of a grid as one item
+
+            Hexes are laid out as HexagonMap lays out its items. Zoomed out, the hexes are an image of
+            two pixels per hex, one column per grid column, scaled by the painter. Zoomed in, only the
+            hexes in the exposed area are drawn, as polygons grouped by color, and labelled once
+            large enough to read. So the cost of a repaint follows the hexes on screen rather than the
+            size of the grid.
+
+            Parameters:
+                grid (HexGrid): The labels and rows and columns of the hexes to draw
+                radius (float): The radius of a hex in scene units
+                colors (np.ndarray): The uint32 ARGB fill of each hex, 0 to leave one undrawn
+                renderer (Renderer): The Renderer told of clicked hexes, None to let clicks through to the items below
+                inset (float): The share of each hex's radius drawn, below 1 to leave the items below showing around it
+                outline (bool): Whether to outline the hexes
+            """
+            super().__init__(parent)
+            self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+            if renderer is None:
+                self.setAcceptedMouseButtons(Qt.MouseButton.NoButton)
+            self.grid = grid
+            self.radius = radius
+            self.renderer = renderer
+            self.pen = QPen(HEX_PEN) if outline else QPen(Qt.PenStyle.NoPen)
+            self.pen.setCosmetic(True)
+            self.colors = np.ascontiguousarray(colors, dtype=np.uint32)
+
+            row = grid.row.astype(np.int64)
+            col = grid.col.astype(np.int64)
+            self.x = col * radius * 1.5
+            self.y = row * radius * 1.732 + (col % 2) * radius * 0.866
+            # The hex at each row and column, -1 where there is none, for culling and hit testing
+            self.cells = np.full((grid.rows, grid.cols), -1, dtype=np.int64)
+            self.cells[row, col] = np.arange(len(grid))
+            self.hexagon = QPolygonF([QPointF(inset * radius * math.cos(2 * math.pi * i / 6), inset * radius * math.sin(2 * math.pi * i / 6)) for i in range(6)])
+
+            self.pixels = np.zeros((2 * grid.rows + 1, grid.cols), dtype=np.uint32)
+            self.pixel_rows = 2 * row + col % 2
+            self.pixel_cols = col
+            self.pixels[self.pixel_rows, self.pixel_cols] = self.colors
+            self.pixels[self.pixel_rows + 1, self.pixel_cols] = self.colors
+            self.image = None
+            self.image_rect = QRectF(-0.75 * radius, -0.866 * radius, grid.cols * 1.5 * radius, (2 * grid.rows + 1) * 0.866 * radius)
+            self.bounds = QRectF(-radius, -radius, (grid.cols - 1) * 1.5 * radius + 2 * radius, grid.rows * 1.732 * radius + 1.732 * radius)
+
+        def boundingRect(self) -> QRectF:
+            return self.bounds
+
+        def set_colors(self, indices: np.ndarray, colors: np.ndarray) -> int:
+            """
+            Recolors hexes, repainting only their area when there are few
+
+            Parameters:
+                indices (np.ndarray): The indices of the hexes
+                colors (np.ndarray): The uint32 ARGB fill of each
+
+            Returns:
+                int - The number of hexes whose color changed
+            """
+            indices = np.asarray(indices, dtype=np.int64)
+            colors = np.asarray(colors, dtype=np.uint32)
+            changed = self.colors[indices] != colors
+            indices = indices[changed]
+            if len(indices) == 0:
+                return 0
+            colors = colors[changed]
+            self.colors[indices] = colors
+            self.pixels[self.pixel_rows[indices], self.pixel_cols[indices]] = colors
+            self.pixels[self.pixel_rows[indices] + 1, self.pixel_cols[indices]] = colors
+            # Wrapped again on the next paint, so nothing reuses a cached copy of the old pixels
+            self.image = None
+            if len(indices) > 64:
+                self.update()
+            else:
+                radius = self.radius
+                for x, y in zip(self.x[indices].tolist(), self.y[indices].tolist()):
+                    self.update(QRectF(x - radius, y - radius, 2 * radius, 2 * radius))
+            return len(indices)
+
+        def visible(self, rect: QRectF) -> np.ndarray:
+            """
+            Gets the hexes that may overlap an area
+
+            Parameters:
+                rect (QRectF): The area in scene units
+
+            Returns:
+                np.ndarray - The indices of the hexes
+            """
+            radius = self.radius
+            col_0 = max(0, int(math.floor((rect.left() - radius) / (1.5 * radius))))
+            col_1 = min(self.grid.cols, int(math.ceil((rect.right() + radius) / (1.5 * radius))) + 1)
+            row_0 = max(0, int(math.floor((rect.top() - 1.732 * radius) / (1.732 * radius))))
+            row_1 = min(self.grid.rows, int(math.ceil((rect.bottom() + radius) / (1.732 * radius))) + 1)
+            cells = self.cells[row_0:row_1, col_0:col_1].ravel()
+            return cells[cells >= 0]
+
+        def hex_at(self, point: QPointF) -> int:
+            """
+            Finds the hex under a point
+
+            Parameters:
+                point (QPointF): The point in scene units
+
+            Returns:
+                int - The index of the hex, None if there is none
+            """
+            indices = self.visible(QRectF(point.x() - self.radius, point.y() - self.radius, 2 * self.radius, 2 * self.radius))
+            if len(indices) == 0:
+                return None
+            distances = (self.x[indices] - point.x()) ** 2 + (self.y[indices] - point.y()) ** 2
+            nearest = int(np.argmin(distances))
+            return int(indices[nearest]) if distances[nearest] <= self.radius ** 2 else None
+
+        def paint(self, painter: QPainter, option, widget=None):
+            """
+            Draws the hexes in the exposed area
+
+            Parameters:
+                painter (QPainter): The painter
+                option (QStyleOptionGraphicsItem): The exposed area and level of detail
+                widget (QWidget): The widget painted on
+            """
+            pixels = self.radius * option.levelOfDetailFromTransform(painter.worldTransform())
+            if pixels < POLYGON_PIXELS:
+                if self.image is None:
+                    self.image = QImage(self.pixels.data, self.pixels.shape[1], self.pixels.shape[0], self.pixels.shape[1] * 4, QImage.Format.Format_ARGB32)
+                painter.drawImage(self.image_rect, self.image)
+                return
+
+            indices = self.visible(option.exposedRect)
+            colors = self.colors[indices]
+            painter.setPen(self.pen)
+            for color in np.unique(colors).tolist():
+                if color == 0:
+                    continue
+                painter.setBrush(QColor.fromRgba(color))
+                selected = indices[colors == color]
+                for x, y in zip(self.x[selected].tolist(), self.y[selected].tolist()):
+                    painter.drawPolygon(self.hexagon.translated(x, y))
+
+            if pixels >= LABEL_PIXELS:
+                labels = self.grid.labels
+                radius = self.radius
+                painter.setPen(QColor("white"))
+                for index, x, y in zip(indices.tolist(), self.x[indices].tolist(), self.y[indices].tolist()):
+                    painter.drawText(QRectF(x - radius, y - radius, 2 * radius, 2 * radius), Qt.AlignmentFlag.AlignCenter, labels[index])
+
+        def mousePressEvent(self, event):
+            """
+            Selects the clicked hex, then lets the view start dragging
+
+            Parameters:
+                event (QGraphicsSceneMouseEvent): A mouse event that calls this function
+            """
+            if self.renderer is not None and event.button() == Qt.MouseButton.LeftButton:
+                index = self.hex_at(event.pos())
+                if index is not None:
+                    self.renderer.get_chosen_hex(self.grid.labels[index])
+            event.ignore()
+
     class HexagonMap(QGraphicsView):
-        def __init__(self, renderer, labels: list[str]):
+        def __init__(self, renderer, grid: HexGrid, batched: bool = None):
             """
             Creates the HexagonMap object
 
+            Small grids get an item per hex. Larger ones are drawn by a single HexLayerItem, holding
+            the vehicle markers in an array, and the view zooms with the wheel and pans by dragging.
+
             Parameters:
                 renderer (Renderer): A local reference to the Renderer object
-                labels (list[str]): A list of labels to be put in the middle of the hexes
+                grid (HexGrid): The labels and rows and columns of the hexes to draw
+                batched (bool): Whether to draw one batched layer, by default for grids of more than BATCH_THRESHOLD hexes
             """
             super().__init__()
 
@@ -379,30 +648,182 @@ class Renderer(QMainWindow):
             self.renderer = renderer
 
             self.radius = 30
-            self.rows = 10
-            self.cols = 10
-            self.labels = labels
-            self.create_hexagons()
+            self.grid = grid
+            self.rows = grid.rows
+            self.cols = grid.cols
+            self.batched = len(grid) > BATCH_THRESHOLD if batched is None else batched
+            # Each hex's item by label, so a move touches only the items it changes
+            self.hexagon_items = {}
+            self.changed = set()
+            self.layer = None
+            self.overlay = None
+            self.route = None
+            if self.batched:
+                self.create_layer()
+            else:
+                self.create_hexagons()
+
+        def create_layer(self):
+            """
+            Creates the single item drawing every hex, colored by the vehicles on it
+            """
+            mission = self.renderer.mission
+            # The number of each kind of vehicle on every hex
+            self.markers = {"ugv": np.zeros(len(self.grid), dtype=np.uint8), "uav": np.zeros(len(self.grid), dtype=np.uint8)}
+            np.add.at(self.markers["ugv"], [ugv.ugv_location.index for ugv in mission.ugvs], 1)
+            np.add.at(self.markers["uav"], [uav.uav_location.index for uav in mission.uavs], 1)
+            self.layer = Renderer.HexLayerItem(self.grid, self.radius, self.marker_colors(np.arange(len(self.grid))), self.renderer)
+            self.scene.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.NoIndex)
+            self.scene.addItem(self.layer)
+            self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+            self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+
+        def marker_colors(self, indices: np.ndarray) -> np.ndarray:
+            """
+            Gets the fill of hexes of the batched map, any UGV over any UAV over nothing
+
+            Parameters:
+                indices (np.ndarray): The indices of the hexes
+
+            Returns:
+                np.ndarray - The uint32 ARGB color of each hex
+            """
+            colors = np.full(len(indices), HEX_BRUSHES["empty"].color().rgba(), dtype=np.uint32)
+            colors[self.markers["uav"][indices] != 0] = HEX_BRUSHES["uav"].color().rgba()
+            colors[self.markers["ugv"][indices] != 0] = HEX_BRUSHES["ugv"].color().rgba()
+            return colors
+
+        def show_overlay(self, shown: bool):
+            """
+            Shows or hides the overlay, creating it when first shown
+
+            Parameters:
+                shown (bool): Whether to show the overlay
+            """
+            if shown and self.overlay is None:
+                self.overlay = Renderer.HexLayerItem(self.grid, self.radius, np.zeros(len(self.grid), dtype=np.uint32), inset=OVERLAY_INSET, outline=False)
+                self.overlay.setZValue(1)
+                self.scene.addItem(self.overlay)
+                self.route = QGraphicsPathItem()
+                pen = QPen(ROUTE_PEN, 3)
+                pen.setCosmetic(True)
+                self.route.setPen(pen)
+                self.route.setZValue(2)
+                self.route.setAcceptedMouseButtons(Qt.MouseButton.NoButton)
+                self.scene.addItem(self.route)
+            if self.overlay is not None:
+                self.overlay.setVisible(shown)
+                self.route.setVisible(shown)
+
+        def update_overlay(self, mission: Mission) -> int:
+            """
+            Recolors the overlay from the mission and redraws the planned route, if the overlay is shown
+
+            Every hex's color is computed in one array operation, and only hexes whose color changed
+            are written and repainted.
+
+            Parameters:
+                mission (Mission): The mission
+
+            Returns:
+                int - The number of hexes whose color changed
+            """
+            if self.overlay is None or not self.overlay.isVisible():
+                return 0
+            changed = self.overlay.set_colors(np.arange(len(self.grid)), overlay_colors(mission))
+            # An unreachable end node leaves the path empty, clearing the route drawn before
+            path = QPainterPath()
+            layer = self.overlay
+            route = mission.plan_route()
+            for position, label in enumerate(route.labels if route is not None else ()):
+                index = self.grid.index_of(label)
+                point = QPointF(layer.x[index], layer.y[index])
+                if position == 0:
+                    path.moveTo(point)
+                else:
+                    path.lineTo(point)
+            self.route.setPath(path)
+            return changed
+
+        def wheelEvent(self, event):
+            """
+            Zooms the batched map about the cursor, scrolling otherwise
+
+            Parameters:
+                event (QWheelEvent): The wheel event
+            """
+            if not self.batched:
+                super().wheelEvent(event)
+                return
+            factor = 1.15 ** (event.angleDelta().y() / 120)
+            self.scale(factor, factor)
 
         def create_hexagons(self):
             """
             Creates and adds each of the HexagonItems to the scene
             """
-            count = 0
-            for row in range(self.rows):
-                for col in range(self.cols):
-                    x = col * self.radius * 1.5
-                    y = row * self.radius * 1.732
-                    if col % 2 == 1:
-                        y += self.radius * 0.866
+            for label, row, col in zip(self.grid.labels, self.grid.row.tolist(), self.grid.col.tolist()):
+                x = col * self.radius * 1.5
+                y = row * self.radius * 1.732
+                if col % 2 == 1:
+                    y += self.radius * 0.866
+
+                center = QPointF(x, y)
+                hexagon = Renderer.HexagonItem(center, self.radius, label, self.renderer)
+                self.scene.addItem(hexagon)
+                self.hexagon_items[label] = hexagon
+
+        def move_marker(self, from_hex: str, to_hex: str, moving_vehicle: str):
+            """
+            Moves a vehicle's marker between hexes, leaving the repaint to repaint_changed
 
-                    center = QPointF(x, y)
-                    hexagon = Renderer.HexagonItem(center, self.radius, self.labels[count], self.renderer)
-                    self.scene.addItem(hexagon)
-                    count += 1
+            Parameters:
+                from_hex (str): The label of the hex the vehicle left
+                to_hex (str): The label of the hex the vehicle moved to
+                moving_vehicle (str): "ugv" or "uav", optionally followed by the vehicle's number
+            """
+            kind = moving_vehicle[:3]
+            if self.batched:
+                counts = self.markers[kind]
+                for label, step in ((from_hex, -1), (to_hex, 1)):
+                    index = self.grid.index_of(label)
+                    if index is not None:
+                        counts[index] = max(int(counts[index]) + step, 0)
+                        self.changed.add(index)
+                return
+            attribute = kind + "s_present"
+            for label, step in ((from_hex, -1), (to_hex, 1)):
+                hexagon = self.hexagon_items.get(label)
+                if hexagon is not None:
+                    setattr(hexagon, attribute, max(getattr(hexagon, attribute) + step, 0))
+                    self.changed.add(hexagon)
+
+        def repaint_changed(self) -> int:
+            """
+            Recolors the hexes whose markers changed since the last call, once each
+
+            Returns:
+                int - The number of hexes whose color changed
+            """
+            if self.batched:
+                indices = np.fromiter(self.changed, dtype=np.int64, count=len(self.changed))
+                repainted = self.layer.set_colors(indices, self.marker_colors(indices))
+            else:
+                repainted = sum(hexagon.update_brush() for hexagon in self.changed)
+            self.changed.clear()
+            return repainted
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Play a mission scenario in a window")
+    parser.add_argument("scenario", nargs="?", default="example_scenario_two_scans.json", help="a scenario JSON file, within the config directory if a bare name")
+    args = parser.parse_args(argv)
 
-if __name__ == "__main__":
     pyqt_app = QApplication([])
-    renderer = Renderer()
+    renderer = Renderer(args.scenario)
     renderer.render()
     pyqt_app.exec()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import json
+from dataclasses import dataclass
+import numpy as np
+from actiontrace import Trace, SELECT, QUERY_AI, QUERY_HUMAN, MOVE_UAV, MOVE_UGV
+from eventlog import EventLog
+from mission import Mission
+from scenario import config_path
+
+
+# The mission block times a replay counts, in the column order of ReplayResult.counts
+COST_KEYS = ("AI estimate time", "human estimate time", "UAV traversal time", "UGV traversal time", "UGV clear time")
+
+
+@dataclass
+class ReplayResult:
+    scenario: str
+    total: float
+    counts: np.ndarray
+    times: np.ndarray
+    steps: int
+    success: bool
+
+
+class Replayer():
+    def __init__(self, scenario):
+        """
+        Creates the Replayer object, replaying action traces of a scenario without UI or log files
+
+        The scenario is loaded once, and every replay starts from a snapshot of its initial state.
+
+        Params:
+            scenario: The scenario JSON file within the config directory, the path of one, or a Scenario
+        """
+        self.mission = Mission(scenario, log_to_file=False, events=EventLog(capacity=1))
+        self.__initial = self.mission.snapshot()
+        self.__labels = self.mission.grid.labels
+        self.__times = mission_times(self.mission)
+        # Each vehicle's times relative to the first vehicle's, so rescoring scales them all alike
+        times = self.__times
+        self.__weights = {
+            'uav': [uav.uav_traversal_time / times[2] if times[2] else 1.0 for uav in self.mission.uavs],
+            'ugv': [ugv.ugv_traversal_time / times[3] if times[3] else 1.0 for ugv in self.mission.ugvs],
+            'clear': [ugv.ugv_clear_time / times[4] if times[4] else 1.0 for ugv in self.mission.ugvs],
+        }
+
+    def replay(self, trace: Trace) -> ReplayResult:
+        """
+        Takes the actions of a trace from the start of the mission
+
+        Besides the total, the number of each kind of successful timed action is counted. The
+        outcome of an action never depends on how long anything takes, so the total under other
+        mission times is these counts times those times. The times are the first UAV's and UGV's,
+        and the moves of vehicles with other times count in proportion to them.
+
+        Params:
+            trace (Trace): The recorded actions
+
+        Returns:
+            ReplayResult - The total, the count of each of COST_KEYS and the scenario's times for them, the number of actions and whether the UGV reached the end node
+        """
+        mission = self.mission
+        mission.restore(self.__initial)
+        labels = self.__labels
+        weights = self.__weights
+        counts = [0.0, 0.0, 0.0, 0.0, 0.0]
+        for opcode, index, vehicle in trace:
+            label = labels[index] if index is not None else None
+            if opcode == MOVE_UGV:
+                # UGV 1 is recorded as no vehicle
+                number = vehicle or 1
+                moved = mission.move_ugv(label, number)
+                if moved == 1:
+                    counts[4] += weights['clear'][number - 1]
+                elif moved != -1:
+                    counts[3] += weights['ugv'][number - 1]
+            elif opcode == MOVE_UAV:
+                if 0 < vehicle <= len(mission.uavs) and mission.move_uav(mission.uavs[vehicle - 1], label) is not None:
+                    counts[2] += weights['uav'][vehicle - 1]
+            elif opcode == QUERY_AI:
+                counts[0] += mission.query_ai(vehicle)
+            elif opcode == QUERY_HUMAN:
+                counts[1] += mission.query_human()
+            elif opcode == SELECT:
+                if vehicle == 1:
+                    mission.selected_hexagon = None
+                else:
+                    mission.get_chosen_hex(label)
+            else:
+                raise ValueError("Unknown trace opcode %d" % opcode)
+        return ReplayResult(mission.scenario, mission.total, np.array(counts), self.__times, len(trace), mission.complete)
+
+
+def mission_times(mission: Mission) -> np.ndarray:
+    """
+    Gets the times of a mission in the order of COST_KEYS
+
+    Params:
+        mission (Mission): The mission
+
+    Returns:
+        np.ndarray - The float64 times
+    """
+
+    return np.array([mission.ai_estimate_time, mission.human_estimate_time, mission.uav_traversal_time,
+                     mission.ugv_traversal_time, mission.ugv_clear_time], dtype=np.float64)
+
+
+def rescore(results: list[ReplayResult], times: np.ndarray) -> np.ndarray:
+    """
+    Computes the totals replays would have had under other mission times
+
+    Params:
+        results (list[ReplayResult]): The replays
+        times (np.ndarray): The times in the order of COST_KEYS
+
+    Returns:
+        np.ndarray - The float64 total of each replay
+    """
+
+    if not results:
+        return np.zeros(0)
+    return np.stack([result.counts for result in results]) @ np.asarray(times, dtype=np.float64)
+
+
+def replay_files(paths: list[str]) -> list[ReplayResult]:
+    """
+    Replays trace files, loading each scenario they refer to once
+
+    Params:
+        paths (list[str]): The paths of the trace files
+
+    Returns:
+        list[ReplayResult] - The replays in the order of the paths
+    """
+
+    replayers = {}
+    results = []
+    for path in paths:
+        trace = Trace.load(path)
+        if trace.scenario not in replayers:
+            replayers[trace.scenario] = Replayer(trace.scenario)
+        results.append(replayers[trace.scenario].replay(trace))
+    return results
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Replay recorded action traces and rescore them under changed mission times")
+    parser.add_argument("traces", nargs="+", help="trace files, such as those saved beside the logs")
+    parser.add_argument("--times", help="a scenario JSON file, within the config directory if a bare name, whose mission block times to rescore with")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="override one mission block time, such as 'UGV clear time=20'")
+    args = parser.parse_args(argv)
+
+    results = replay_files(args.traces)
+    overrides = {}
+    if args.times:
+        with open(config_path(args.times)) as json_data:
+            overrides.update(json.load(json_data)['mission'])
+    for setting in args.set:
+        key, value = setting.split('=', 1)
+        overrides[key.strip()] = float(value)
+
+    for path, result in zip(args.traces, results):
+        times = [overrides.get(key, default) for key, default in zip(COST_KEYS, result.times.tolist())]
+        print("%s [%s]: %d actions, total %.1f, rescored %.1f, %s" % (
+            path, result.scenario, result.steps, result.total, float(rescore([result], times)[0]), "success" if result.success else "incomplete"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,523 @@
+import argparse
+import dataclasses
+import glob
+import hashlib
+import json
+import os
+import struct
+from collections import OrderedDict
+from dataclasses import dataclass
+import numpy as np
+from gridstate import GridState, MINE_PRESENT, MAX_UAVS
+from hexgrid import HexGrid, format_label
+
+
+# The times of the mission block, in the order a pack stores them
+TIME_KEYS = ("human estimate time", "AI estimate time", "UGV traversal time", "UGV clear time", "UAV traversal time")
+# The times of the example scenarios
+DEFAULT_TIMES = {"human estimate time": 30, "AI estimate time": 5, "UGV traversal time": 20, "UGV clear time": 60, "UAV traversal time": 1}
+
+# The vehicles of a mission block without "UAVs" or "UGVs" entries
+DEFAULT_UAVS = 2
+DEFAULT_UGVS = 1
+MAX_UGVS = 64
+
+MAGIC = b'AICP'
+VERSION = 2
+# Magic, version, count, then the offsets of the index and of the terrain name table and its size
+HEADER = struct.Struct('<4sHxxIQQQ')
+NAME_SIZE = 64
+INDEX_DTYPE_V1 = np.dtype([('name', 'S%d' % NAME_SIZE), ('offset', '<u8'), ('hexes', '<u4'), ('start', '<u4'), ('end', '<u4'), ('times', '<f8', (len(TIME_KEYS),))])
+# Version 2 adds the offset and size of a JSON object of the mission block's other entries, such as its fleet
+INDEX_DTYPE = np.dtype(INDEX_DTYPE_V1.descr + [('extra', '<u8'), ('extra_size', '<u4')])
+INDEX_DTYPES = {1: INDEX_DTYPE_V1, 2: INDEX_DTYPE}
+
+# The directory of the example scenarios, found from this file so nothing depends on the working directory
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config')
+# Where parsed scenarios are kept between runs, AIC_SCENARIO_CACHE moves it or, set empty, turns it off
+CACHE_DIR = os.environ.get('AIC_SCENARIO_CACHE', os.path.join(os.path.dirname(CONFIG_DIR), '.cache', 'scenarios'))
+
+
+def fleet(mission: dict) -> tuple[list[dict], list[dict]]:
+    """
+    Reads the vehicles of a mission block
+
+    "UAVs" and "UGVs" are each a number of vehicles or a list of one object per vehicle. A UAV's
+    object can set its "traversal time" and "AI scan", 0 for the AI Confidence or 1 for the AI
+    Second Scan Confidence, and a UGV's its "traversal time" and "clear time". Anything not set
+    comes from the block's times, and UAVs alternate between the two AI scans, so a block without
+    either entry is the two UAVs, the first with the first scan, and one UGV of the example scenarios.
+
+    Params:
+        mission (dict): The mission block
+
+    Returns:
+        tuple[list[dict], list[dict]] - The "traversal time" and "AI scan" of each UAV, and the "traversal time" and "clear time" of each UGV
+    """
+
+    uavs = mission.get('UAVs', DEFAULT_UAVS)
+    ugvs = mission.get('UGVs', DEFAULT_UGVS)
+    uavs = [{}] * uavs if isinstance(uavs, int) else uavs
+    ugvs = [{}] * ugvs if isinstance(ugvs, int) else ugvs
+    if not isinstance(uavs, list) or not all(isinstance(uav, dict) for uav in uavs):
+        raise ValueError("UAVs must be a number or a list of objects")
+    if not isinstance(ugvs, list) or not all(isinstance(ugv, dict) for ugv in ugvs):
+        raise ValueError("UGVs must be a number or a list of objects")
+    return ([{'traversal time': uav.get('traversal time', mission.get('UAV traversal time')), 'AI scan': uav.get('AI scan', number % 2)}
+             for number, uav in enumerate(uavs)],
+            [{'traversal time': ugv.get('traversal time', mission.get('UGV traversal time')), 'clear time': ugv.get('clear time', mission.get('UGV clear time'))}
+             for ugv in ugvs])
+
+
+@dataclass
+class Scenario:
+    name: str
+    grid: HexGrid
+    terrain_names: tuple
+    terrain: np.ndarray
+    confidence: np.ndarray
+    mines: np.ndarray
+    mission: dict
+
+    @classmethod
+    def from_json(cls, data: dict, name: str = "") -> 'Scenario':
+        """
+        Creates a scenario from a scenario JSON object
+
+        Params:
+            data (dict): The scenario, its hexes keyed by label and its "mission" block
+            name (str): The name of the scenario, usually its file name
+
+        Returns:
+            Scenario - The scenario
+        """
+
+        state = GridState.from_json(data)
+        return cls(name, state.grid, state.terrain_names, state.terrain, state.confidence, state.has(MINE_PRESENT), dict(data['mission']))
+
+    @classmethod
+    def load(cls, path: str) -> 'Scenario':
+        """
+        Loads a scenario JSON file
+
+        Params:
+            path (str): The path of the file
+
+        Returns:
+            Scenario - The scenario, named after the file
+        """
+
+        with open(path) as json_data:
+            return cls.from_json(json.load(json_data), os.path.basename(path))
+
+    def validate(self):
+        """
+        Checks the scenario can be played, raising ValueError if not
+
+        The mission block needs a start and end hex on the grid and every time of TIME_KEYS, a fleet
+        of 1 to 64 UAVs each with an AI scan of 0 or 1 and 1 to 64 UGVs, and there needs to be three
+        confidences between 0 and 1 per hex.
+        """
+
+        missing = [key for key in ('start', 'end') + TIME_KEYS if key not in self.mission]
+        if missing:
+            raise ValueError("%s has no %s in its mission block" % (self.name, ", ".join(missing)))
+        for key in ('start', 'end'):
+            if self.grid.index_of(self.mission[key]) is None:
+                raise ValueError("%s has no %s hex %s" % (self.name, key, self.mission[key]))
+        try:
+            uavs, ugvs = fleet(self.mission)
+        except ValueError as error:
+            raise ValueError("%s: %s" % (self.name, error))
+        if not 1 <= len(uavs) <= MAX_UAVS or not 1 <= len(ugvs) <= MAX_UGVS:
+            raise ValueError("%s needs 1 to %d UAVs and 1 to %d UGVs" % (self.name, MAX_UAVS, MAX_UGVS))
+        if any(uav['AI scan'] not in (0, 1) for uav in uavs):
+            raise ValueError("%s has a UAV whose AI scan isn't 0 or 1" % self.name)
+        if self.confidence.shape != (len(self.grid), 3) or not np.all((self.confidence >= 0) & (self.confidence <= 1)):
+            raise ValueError("%s has confidences that aren't between 0 and 1" % self.name)
+
+    def to_json(self) -> dict:
+        """
+        Creates the scenario JSON object of this scenario, as from_json reads
+
+        Returns:
+            dict - The "mission" block followed by the hexes keyed by label
+        """
+
+        data = {'mission': dict(self.mission)}
+        terrain = [self.terrain_names[code] for code in self.terrain.tolist()]
+        for label, name, (ai, second, human), mine in zip(self.grid.labels, terrain, self.confidence.tolist(), self.mines.tolist()):
+            data[label] = {'Terrain': name, 'AI Confidence': ai, 'Human Confidence': human, 'Mine': int(mine), 'AI Second Scan Confidence': second}
+        return data
+
+    def state(self, uavs: int = None) -> GridState:
+        """
+        Creates the grid state a mission on this scenario starts from
+
+        Params:
+            uavs (int): The number of UAVs to track, that of the mission block's fleet if not given
+
+        Returns:
+            GridState - The grid state sharing this scenario's arrays, with no hexes scanned or queried
+        """
+
+        if uavs is None:
+            uavs = len(fleet(self.mission)[0])
+        return GridState(self.grid, self.terrain_names, self.terrain, self.confidence, self.mines, uavs)
+
+
+def config_path(name: str) -> str:
+    """
+    Resolves a scenario file name the way missions do
+
+    Params:
+        name (str): A bare file name, looked up in the config directory, or any other path
+
+    Returns:
+        str - The path of the file
+    """
+
+    return name if os.path.dirname(name) else os.path.join(CONFIG_DIR, name)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_pack(path: str, scenarios) -> int:
+    """
+    Writes scenarios to a pack file
+
+    The file is a header followed by each scenario's hexes as fixed width columns: the uint16 rows
+    and columns, uint8 terrain codes and mine flags, and float64 AI 1, AI 2 and human confidences,
+    each aligned to 8 bytes, then any other entries of its mission block, such as its fleet, as JSON.
+    After them come the terrain names shared by every scenario and an index of each scenario's name,
+    data offset, hex count, start and end hex, mission times and other entries. Scenarios
+    are written as they are produced, so converting a large set doesn't hold it in memory.
+
+    Params:
+        path (str): The path of the pack file to write
+        scenarios: An iterable of the Scenario objects to write
+
+    Returns:
+        int - The number of scenarios written
+    """
+
+    terrain_codes = {}
+    index = []
+    with open(path, 'wb') as file:
+        file.write(bytes(HEADER.size))
+        offset = _align(HEADER.size)
+        for scenario in scenarios:
+            name = scenario.name.encode('utf-8')
+            if len(name) > NAME_SIZE:
+                raise ValueError("Scenario name %s is longer than %d bytes" % (scenario.name, NAME_SIZE))
+            codes = np.array([terrain_codes.setdefault(terrain, len(terrain_codes)) for terrain in scenario.terrain_names], dtype=np.uint8)
+            hexes = len(scenario.grid)
+            columns = (scenario.grid.row.astype('<u2'), scenario.grid.col.astype('<u2'), codes[scenario.terrain],
+                       np.asarray(scenario.mines, dtype=np.uint8), np.ascontiguousarray(scenario.confidence, dtype='<f8'))
+            start = offset
+            for column in columns:
+                file.seek(offset)
+                file.write(column.tobytes())
+                offset = _align(offset + column.nbytes)
+            extra = {key: value for key, value in scenario.mission.items() if key not in TIME_KEYS and key not in ('start', 'end')}
+            extra = json.dumps(extra).encode('utf-8') if extra else b''
+            extra_offset = offset
+            file.seek(offset)
+            file.write(extra)
+            offset = _align(offset + len(extra))
+            grid = scenario.grid
+            index.append((name, start, hexes, grid.index_of(scenario.mission['start']), grid.index_of(scenario.mission['end']),
+                          [scenario.mission[key] for key in TIME_KEYS], extra_offset, len(extra)))
+
+        terrain_table = json.dumps(sorted(terrain_codes, key=terrain_codes.get)).encode('utf-8')
+        terrain_offset = offset
+        file.seek(terrain_offset)
+        file.write(terrain_table)
+        index_offset = _align(terrain_offset + len(terrain_table))
+        file.seek(index_offset)
+        file.write(np.array(index, dtype=INDEX_DTYPE).tobytes())
+        file.seek(0)
+        file.write(HEADER.pack(MAGIC, VERSION, len(index), index_offset, terrain_offset, len(terrain_table)))
+    return len(index)
+
+
+class ScenarioPack():
+    def __init__(self, path: str):
+        """
+        Creates the ScenarioPack object, opening a pack file written by write_pack
+
+        The file is memory mapped and nothing but its header, index and terrain names is read up
+        front. Getting a scenario makes arrays that view its columns in the mapping, so the operating
+        system only pages in the scenarios used, and scenarios with the same layout share one HexGrid.
+
+        Params:
+            path (str): The path of the pack file
+        """
+
+        self.__path = path
+        self.__data = np.memmap(path, dtype=np.uint8, mode='r')
+        magic, version, count, index_offset, terrain_offset, terrain_size = HEADER.unpack_from(self.__data)
+        if magic != MAGIC or version not in INDEX_DTYPES:
+            raise ValueError("%s is not a version %d scenario pack" % (path, VERSION))
+        self.__version = version
+        self.__index = np.frombuffer(self.__data, INDEX_DTYPES[version], count, index_offset)
+        self.__terrain_names = json.loads(bytes(self.__data[terrain_offset:terrain_offset + terrain_size]))
+        self.__names = None
+        self.__grids = {}
+
+    @property
+    def path(self) -> str:
+        """
+        Gets the path field
+
+        Returns:
+            str - The path of the pack file
+        """
+        return self.__path
+
+    @property
+    def version(self) -> int:
+        """
+        Gets the version field
+
+        Returns:
+            int - The format version the pack was written in
+        """
+        return self.__version
+
+    @property
+    def names(self) -> list[str]:
+        """
+        Gets the names of the scenarios, decoded on first use
+
+        Returns:
+            list[str] - The names in pack order
+        """
+        if self.__names is None:
+            self.__names = [name.decode('utf-8') for name in self.__index['name'].tolist()]
+        return self.__names
+
+    def __len__(self) -> int:
+        return len(self.__index)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def __getitem__(self, key) -> Scenario:
+        """
+        Gets a scenario from the pack
+
+        Params:
+            key: The position of the scenario in the pack, or its name
+
+        Returns:
+            Scenario - The scenario
+        """
+        if isinstance(key, str):
+            key = self.names.index(key)
+        entry = self.__index[key]
+        hexes = int(entry['hexes'])
+        offset = int(entry['offset'])
+        columns = []
+        for dtype, width in (('<u2', 1), ('<u2', 1), (np.uint8, 1), (np.uint8, 1), ('<f8', 3)):
+            column = np.frombuffer(self.__data, dtype, hexes * width, offset)
+            columns.append(column)
+            offset = _align(offset + column.nbytes)
+        rows, cols, codes, mines, confidence = columns
+        confidence = confidence.reshape(hexes, 3)
+
+        layout = (rows.tobytes(), cols.tobytes())
+        grid = self.__grids.get(layout)
+        if grid is None:
+            grid = HexGrid([format_label(row, col) for row, col in zip(rows.tolist(), cols.tolist())], rows, cols)
+            self.__grids[layout] = grid
+        # Terrain codes index the terrain names of the whole pack rather than those of the scenario
+        mission = {key: int(time) if time.is_integer() else time for key, time in zip(TIME_KEYS, entry['times'].tolist())}
+        mission['start'] = grid.labels[int(entry['start'])]
+        mission['end'] = grid.labels[int(entry['end'])]
+        if 'extra' in entry.dtype.names and entry['extra_size']:
+            extra = int(entry['extra'])
+            mission.update(json.loads(bytes(self.__data[extra:extra + int(entry['extra_size'])])))
+        return Scenario(entry['name'].decode('utf-8'), grid, tuple(self.__terrain_names), codes, confidence, mines.view(bool), mission)
+
+
+class ScenarioCache():
+    def __init__(self, capacity: int = 64, directory: str = CACHE_DIR):
+        """
+        Creates the ScenarioCache object, keeping parsed and validated scenarios keyed by the SHA-256
+        of their JSON file's content
+
+        Loading a file whose modification time and size haven't changed since it was last hashed
+        costs a stat and a dictionary lookup, and every mission on it shares the one Scenario, whose
+        arrays are made read only. The capacity most recently used scenarios are kept in memory. With
+        a directory, each scenario parsed is also written there as a single scenario pack named by
+        its hash and the pack format version, so later runs and other processes map it rather than
+        parse the JSON again, and packs of another version are never read.
+
+        Params:
+            capacity (int): The number of scenarios kept in memory
+            directory (str): The directory of the on disk cache, None or empty to keep to memory
+        """
+        self.__capacity = capacity
+        self.__directory = directory or None
+        self.__scenarios = OrderedDict()
+        self.__digests = OrderedDict()
+        self.__stats = {'memory': 0, 'disk': 0, 'parsed': 0}
+
+    @property
+    def directory(self) -> str:
+        """
+        Gets the directory field
+
+        Returns:
+            str - The directory of the on disk cache, None if there is none
+        """
+        return self.__directory
+
+    @property
+    def stats(self) -> dict:
+        """
+        Gets the number of loads served from memory, from disk and by parsing the JSON
+
+        Returns:
+            dict - The 'memory', 'disk' and 'parsed' counts
+        """
+        return dict(self.__stats)
+
+    def __len__(self) -> int:
+        return len(self.__scenarios)
+
+    def clear(self):
+        """
+        Forgets every scenario kept in memory, leaving the on disk cache
+        """
+        self.__scenarios.clear()
+        self.__digests.clear()
+
+    def load(self, path: str) -> Scenario:
+        """
+        Loads a scenario JSON file, from the cache when its content was loaded before
+
+        Params:
+            path (str): The path of the file
+
+        Returns:
+            Scenario - The shared, read only scenario, named after the file
+        """
+        name = os.path.basename(path)
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        data = None
+        known = self.__digests.get(key)
+        if known is not None and known[0] == stamp:
+            digest = known[1]
+            self.__digests.move_to_end(key)
+        else:
+            with open(key, 'rb') as file:
+                data = file.read()
+            digest = hashlib.sha256(data).hexdigest()
+            self.__digests[key] = (stamp, digest)
+            if len(self.__digests) > self.__capacity * 4:
+                self.__digests.popitem(last=False)
+
+        scenario = self.__scenarios.get(digest)
+        if scenario is not None:
+            self.__scenarios.move_to_end(digest)
+            self.__stats['memory'] += 1
+        else:
+            scenario = self.__read(digest)
+            if scenario is not None:
+                scenario.name = name
+                self.__stats['disk'] += 1
+            else:
+                if data is None:
+                    with open(key, 'rb') as file:
+                        data = file.read()
+                scenario = Scenario.from_json(json.loads(data), name)
+                scenario.validate()
+                for array in (scenario.terrain, scenario.confidence, scenario.mines):
+                    array.flags.writeable = False
+                self.__write(digest, scenario)
+                self.__stats['parsed'] += 1
+            self.__scenarios[digest] = scenario
+            if len(self.__scenarios) > self.__capacity:
+                self.__scenarios.popitem(last=False)
+        # Files with the same content share the scenario under their own names
+        return scenario if scenario.name == name else dataclasses.replace(scenario, name=name)
+
+    def __read(self, digest: str) -> Scenario:
+        if self.__directory is None:
+            return None
+        try:
+            pack = ScenarioPack(self.__pack_path(digest))
+            # Older versions may have dropped entries of the mission block, so they're parsed again
+            return pack[0] if pack.version == VERSION else None
+        except (OSError, ValueError, IndexError):
+            # Missing or unreadable, so parsed again and rewritten
+            return None
+
+    def __pack_path(self, digest: str) -> str:
+        # The format version is part of the name, so a cache shared with older code never mixes layouts
+        return os.path.join(self.__directory, '%s.v%d.pack' % (digest, VERSION))
+
+    def __write(self, digest: str, scenario: Scenario):
+        if self.__directory is None:
+            return
+        path = self.__pack_path(digest)
+        # Written aside then moved into place, so processes sharing the cache never see half a file
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            os.makedirs(self.__directory, exist_ok=True)
+            write_pack(temporary, [dataclasses.replace(scenario, name=digest)])
+            os.replace(temporary, path)
+        except OSError:
+            # A cache that can't be written only costs speed
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+# The cache missions load their scenario files through
+SCENARIO_CACHE = ScenarioCache()
+
+
+def convert(paths: list[str], output: str) -> int:
+    """
+    Packs scenario JSON files, skipping files in other formats
+
+    Params:
+        paths (list[str]): The paths of the JSON files
+        output (str): The path of the pack file to write
+
+    Returns:
+        int - The number of scenarios packed
+    """
+
+    def scenarios():
+        for path in paths:
+            with open(path) as json_data:
+                data = json.load(json_data)
+            hexes = [value for key, value in data.items() if key != 'mission'] if isinstance(data, dict) else []
+            if not isinstance(data, dict) or not isinstance(data.get('mission'), dict) or not all(isinstance(value, dict) and 'Terrain' in value for value in hexes):
+                print("Skipping %s, it isn't hexes keyed by label with a mission block" % path)
+                continue
+            yield Scenario.from_json(data, os.path.basename(path))
+
+    return write_pack(output, scenarios())
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Pack scenario JSON files into a memory mapped scenario pack")
+    parser.add_argument("output", help="the pack file to write")
+    parser.add_argument("inputs", nargs="*", help="scenario JSON files, every file in the config directory if not given")
+    args = parser.parse_args(argv)
+
+    inputs = args.inputs or sorted(glob.glob(os.path.join(CONFIG_DIR, '*.json')))
+    print("Packed %d scenarios into %s" % (convert(inputs, args.output), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+import time
+from dataclasses import dataclass
+import numpy as np
+from gridstate import UAV_1_SCANNED, UAV_2_SCANNED
+from planner import Route, a_star
+
+
+@dataclass
+class Sweep:
+    uav_number: int
+    labels: list[str]
+    time: float
+
+
+@dataclass
+class SweepPlan:
+    sweeps: list[Sweep]
+    total: float
+    makespan: float
+
+    def actions(self) -> list[tuple]:
+        """
+        Interleaves the sweeps into simulation actions, each UAV making one move in turn
+
+        Returns:
+            list[tuple] - The ("move_uav", num_uav, label) actions
+        """
+        longest = max((len(sweep.labels) for sweep in self.sweeps), default=0)
+        return [("move_uav", sweep.uav_number, sweep.labels[step]) for step in range(longest) for sweep in self.sweeps if step < len(sweep.labels)]
+
+
+def corridor(mission, width: int = 1, route: Route = None) -> np.ndarray:
+    """
+    Gets the hexes no UAV has scanned within a number of moves of the UGV's planned route
+
+    Params:
+        mission (Mission): The mission
+        width (int): The largest hex distance from the route to include
+        route (Route): The route, the mission's planned route to the end node if not given
+
+    Returns:
+        np.ndarray - The sorted indices of the hexes
+    """
+
+    route = mission.plan_route() if route is None else route
+    grid = mission.grid
+    if route is None:
+        return np.zeros(0, dtype=np.intp)
+    near = np.unique(np.concatenate([grid.ring(grid.index_of(label), width) for label in route.labels])).astype(np.intp)
+    return near[~mission.hexagons.has(UAV_1_SCANNED | UAV_2_SCANNED)[near]]
+
+
+class CoverageScheduler():
+    def __init__(self, mission, balance: float = 0.0, budget: float = 0.25):
+        """
+        Creates the CoverageScheduler object, planning sweeps of every UAV of a mission that between them
+        scan a set of target hexes
+
+        UAVs fly over any hex, so the time between two hexes is the hex distance times the UAV's
+        traversal time. The targets are shared out by a nearest neighbour construction across all the
+        UAVs at once, repeatedly sending whichever UAV can add an unvisited target most cheaply, and
+        each UAV's order is then improved by 2-opt, reversing any stretch of the sweep that shortens it,
+        and by moving single targets elsewhere in the sweep, until nothing improves or the time budget
+        runs out. The sweeps are expanded to one hex per move, avoiding hexes already flown over where
+        a move has the choice, skipping any target an earlier move already flew over and any target
+        that can't be reached.
+
+        A plan costs the mission the sum of its sweeps' times, which one UAV sweeping everything often
+        minimizes, leaving the other UAVs without targets. With a balance above 0 each addition also
+        pays that multiple of the time its UAV would then finish at, so busy UAVs give way to idle ones
+        and the sweeps end sooner.
+
+        Params:
+            mission (Mission): The mission whose UAVs are planned from where they are
+            balance (float): The weight of each UAV's finishing time against the total time
+            budget (float): The seconds the 2-opt improvement may spend
+        """
+        self.mission = mission
+        self.balance = balance
+        self.budget = budget
+
+    def plan(self, targets) -> SweepPlan:
+        """
+        Plans the sweeps of every UAV over the target hexes
+
+        Params:
+            targets: The indices of the hexes to scan, such as those of corridor
+
+        Returns:
+            SweepPlan - The hexes each UAV moves to in order, with the time of each sweep, their total and the longest
+        """
+
+        mission = self.mission
+        grid = mission.grid
+        uavs = mission.uavs
+        starts = np.array([uav.uav_location.index for uav in uavs], dtype=np.intp)
+        targets = np.setdiff1d(np.asarray(targets, dtype=np.intp), starts)
+        speeds = np.array([uav.uav_traversal_time for uav in uavs], dtype=np.float64)
+
+        between = grid.distances(targets[:, None], targets[None, :])
+        from_start = grid.distances(starts[:, None], targets[None, :])
+        orders = self.__construct(between, from_start, speeds)
+        deadline = time.perf_counter() + self.budget
+        for number, order in enumerate(orders):
+            if len(order) > 2:
+                orders[number] = self.__two_opt(between, from_start[number], order, deadline)
+
+        # The hexes flown over so far, so later sweeps skip targets already scanned on the way
+        covered = np.zeros(len(grid), dtype=bool)
+        covered[starts] = True
+        targeted = np.zeros(len(grid), dtype=bool)
+        targeted[targets] = True
+        sweeps = []
+        for uav, start, speed, order in zip(uavs, starts.tolist(), speeds.tolist(), orders):
+            path = self.__expand(start, targets[order].tolist(), covered, targeted)
+            sweeps.append(Sweep(uav.uav_number, [grid.labels[index] for index in path], len(path) * speed))
+        times = [sweep.time for sweep in sweeps]
+        return SweepPlan(sweeps, float(sum(times)), float(max(times, default=0.0)))
+
+    def __construct(self, between: np.ndarray, from_start: np.ndarray, speeds: np.ndarray) -> list[np.ndarray]:
+        """
+        Shares the targets out between the UAVs by nearest neighbour
+
+        Params:
+            between (np.ndarray): The hex distances between targets
+            from_start (np.ndarray): The hex distances from each UAV to each target
+            speeds (np.ndarray): The traversal time of each UAV
+
+        Returns:
+            list[np.ndarray] - The order each UAV visits its targets in, as positions in the targets
+        """
+
+        uavs, count = from_start.shape
+        # The time for each UAV to add each target from where its sweep ends, inf once visited
+        added = from_start * speeds[:, None]
+        finished = np.zeros(uavs)
+        orders = [[] for _ in range(uavs)]
+        for _ in range(count):
+            cost = added
+            if self.balance:
+                cost = added + self.balance * (finished[:, None] + added)
+            uav, target = divmod(int(np.argmin(cost)), count)
+            orders[uav].append(target)
+            finished[uav] += added[uav, target]
+            added[:, target] = np.inf
+            visited = np.isinf(added[uav])
+            added[uav] = between[target] * speeds[uav]
+            added[uav, visited] = np.inf
+        return [np.array(order, dtype=np.intp) for order in orders]
+
+    def __two_opt(self, between: np.ndarray, from_start: np.ndarray, order: np.ndarray, deadline: float) -> np.ndarray:
+        """
+        Shortens a sweep by reversing stretches of it and moving single targets until neither helps
+
+        The sweep is held as a path from the UAV's hex through its targets to a free end, a node at
+        distance 0 from everything, so reversing a stretch that reaches the end, or moving a target
+        to the end, is an ordinary move.
+
+        Params:
+            between (np.ndarray): The hex distances between targets
+            from_start (np.ndarray): The hex distances from the UAV to each target
+            order (np.ndarray): The order the UAV visits its targets in
+            deadline (float): The perf_counter time to stop improving at
+
+        Returns:
+            np.ndarray - The improved order
+        """
+
+        count = len(order)
+        # Node 0 is the UAV, nodes 1 to count its targets in order and node count + 1 the free end
+        distances = np.zeros((count + 2, count + 2), dtype=np.int64)
+        distances[1:-1, 1:-1] = between[np.ix_(order, order)]
+        distances[0, 1:-1] = distances[1:-1, 0] = from_start[order]
+        path = np.arange(count + 2)
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for first in range(1, count):
+                # Reversing path[first:last + 1] for each last after first
+                before, head = path[first - 1], path[first]
+                ends, after = path[first + 1:-1], path[first + 2:]
+                gain = (distances[before, head] + distances[ends, after]) - (distances[before, ends] + distances[head, after])
+                best = int(np.argmax(gain))
+                if gain[best] > 0:
+                    last = first + 1 + best
+                    path[first:last + 1] = path[first:last + 1][::-1].copy()
+                    improved = True
+            for position in range(1, count + 1):
+                # Moving path[position] between path[edge] and path[edge + 1] for each other edge
+                node = path[position]
+                before, after = path[position - 1], path[position + 1]
+                removed = distances[before, node] + distances[node, after] - distances[before, after]
+                added = distances[path[:-1], node] + distances[node, path[1:]] - distances[path[:-1], path[1:]]
+                added[position - 1:position + 1] = np.iinfo(np.int64).max
+                edge = int(np.argmin(added))
+                if removed > added[edge]:
+                    rest = np.delete(path, position)
+                    path = np.insert(rest, edge + 1 if edge < position else edge, node)
+                    improved = True
+        return order[path[1:-1] - 1]
+
+    def __expand(self, start: int, stops: list[int], covered: np.ndarray, targeted: np.ndarray) -> list[int]:
+        """
+        Expands a sweep into the hexes of each move
+
+        Each move steps to a neighbor closer to the next target, preferring one that is itself an
+        unscanned target and then one not yet flown over. Targets already flown over, and targets that
+        can't be reached, are skipped.
+
+        Params:
+            start (int): The index of the UAV's hex
+            stops (list[int]): The indices of its targets in order
+            covered (np.ndarray): True for hexes already flown over, updated with this sweep's
+            targeted (np.ndarray): True for the target hexes
+
+        Returns:
+            list[int] - The index of every hex moved to
+        """
+
+        grid = self.mission.grid
+        path = []
+        current = start
+        for stop in stops:
+            if covered[stop]:
+                continue
+            remaining = grid.distance(current, stop)
+            while remaining:
+                neighbors = np.asarray(grid.neighbors(current), dtype=np.intp)
+                distances = grid.distances(neighbors, stop)
+                closer = neighbors[distances < remaining]
+                if len(closer) == 0:
+                    # Only holes in the grid stop a straight line, so go around them
+                    route = a_star(grid, np.ones(len(grid)), current, stop)
+                    if route is not None:
+                        steps = [grid.index_of(label) for label in route.labels[1:]]
+                        path.extend(steps)
+                        covered[steps] = True
+                        current = stop
+                    # Otherwise the stop is skipped, carrying on from the hex the UAV got to
+                    break
+                fresh = closer[~covered[closer]]
+                preferred = fresh[targeted[fresh]]
+                current = int(preferred[0] if len(preferred) else fresh[0] if len(fresh) else closer[0])
+                path.append(current)
+                covered[current] = True
+                remaining -= 1
+        return path
@@ -0,0 +1,400 @@
+import argparse
+import os
+import random
+import statistics
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from advisor import QueryAdvisor
+from fusion import FusionModel
+from metrics import MetricsExporter, MissionMetrics, clear_profiles, load_profiles, profiled
+from mission import Mission
+from scenario import config_path
+
+
+@dataclass
+class EpisodeResult:
+    scenario: str
+    policy: str
+    seed: int
+    total: int
+    steps: int
+    mines_hit: int
+    success: bool
+
+
+class Policy():
+    """
+    Base class for the strategies driving a Mission in headless episodes
+
+    A policy is handed the mission before every step and returns the next action as a tuple:
+        ("query_ai", label, num_uav)
+        ("query_human", label)
+        ("move_uav", num_uav, label)
+        ("move_ugv", label) or ("move_ugv", label, num_ugv)
+    UAVs and UGVs are numbered from 1, and a move_ugv without a number moves UGV 1. The episode ends
+    once any UGV reaches the end node, or when the policy returns None. Policies are pickled into
+    the worker processes, so any state must be set up in reset rather than shared between episodes.
+    """
+
+    name = "policy"
+
+    def reset(self, mission: Mission, rng: random.Random):
+        """
+        Prepares the policy for a new episode
+
+        Params:
+            mission (Mission): The freshly loaded mission
+            rng (random.Random): The random generator seeded for this episode
+        """
+
+    def next_action(self, mission: Mission, rng: random.Random) -> tuple:
+        """
+        Chooses the next action to take
+
+        Params:
+            mission (Mission): The mission in its current state
+            rng (random.Random): The random generator seeded for this episode
+
+        Returns:
+            tuple - The next action, or None to end the episode
+        """
+        raise NotImplementedError
+
+
+class RandomWalkPolicy(Policy):
+    """
+    Moves the UGV to a uniformly random adjacent hex every step without scouting
+    """
+
+    name = "random"
+
+    def next_action(self, mission: Mission, rng: random.Random) -> tuple:
+        neighbors = mission.adjacent_hexagons(mission.ugv_location)
+        return ("move_ugv", rng.choice(neighbors).label)
+
+
+class ShortestPathPolicy(Policy):
+    """
+    Follows the fewest-hop route from the UGV to the end node, optionally flying UAV 1 ahead of the
+    UGV to query its AI, and the human as well when the AI is less confident than the threshold
+    """
+
+    name = "shortest"
+
+    def __init__(self, scout: bool = True, human_threshold: float = 0.8):
+        """
+        Creates the ShortestPathPolicy object
+
+        Params:
+            scout (bool): True to scan and query each hex before the UGV enters it
+            human_threshold (float): The AI estimate below which the human is also queried
+        """
+        self.scout = scout
+        self.human_threshold = human_threshold
+
+    def reset(self, mission: Mission, rng: random.Random):
+        self.route = deque(fewest_hop_route(mission, mission.ugv_location.label, mission.end_node)[1:])
+
+    def next_hex(self, mission: Mission) -> str:
+        """
+        Chooses the hex the UGV should enter next
+
+        Params:
+            mission (Mission): The mission in its current state
+
+        Returns:
+            str - The label of the next hex, or None once there is nowhere left to go
+        """
+        while self.route and mission.ugv_location.label == self.route[0]:
+            self.route.popleft()
+        return self.route[0] if self.route else None
+
+    def next_action(self, mission: Mission, rng: random.Random) -> tuple:
+        label = self.next_hex(mission)
+        if label is None:
+            return None
+        hex = mission.hexagons[mission.grid.index_of(label)]
+        if self.scout:
+            uav_index = mission.uav_1.uav_location.index
+            if uav_index != hex.index:
+                # Fly one hop at a time, the UAV can fall behind when the route changes
+                neighbors = list(mission.grid.neighbors(uav_index))
+                step = neighbors[int(mission.grid.distances(neighbors, hex.index).argmin())]
+                return ("move_uav", 1, mission.grid.labels[step])
+            if not hex.ai_queried_by(1):
+                return ("query_ai", label, 1)
+            if hex.ai_confidence(mission.uav_1.ai_scan) < self.human_threshold and not hex.human_queried:
+                return ("query_human", label)
+        return ("move_ugv", label)
+
+
+class PlannedRoutePolicy(ShortestPathPolicy):
+    """
+    Replans the least expected cost route before every UGV move, scouting ahead like ShortestPathPolicy
+    """
+
+    name = "planned"
+
+    def __init__(self, scout: bool = True, human_threshold: float = 0.8, fusion: FusionModel = None):
+        """
+        Creates the PlannedRoutePolicy object
+
+        Params:
+            scout (bool): True to scan and query each hex before the UGV enters it
+            human_threshold (float): The AI estimate below which the human is also queried
+            fusion (FusionModel): The model turning estimates into mine probabilities, the mission's default if not given
+        """
+        super().__init__(scout, human_threshold)
+        self.fusion = fusion
+
+    def reset(self, mission: Mission, rng: random.Random):
+        if self.fusion is not None:
+            mission.fusion = self.fusion
+
+    def next_hex(self, mission: Mission) -> str:
+        if mission.ugv_location.label == mission.end_node:
+            return None
+        route = mission.plan_route()
+        return route.labels[1] if route is not None else None
+
+
+class AdvisedPolicy(PlannedRoutePolicy):
+    """
+    Takes the query or UAV move the QueryAdvisor values most while any is worth its cost, otherwise
+    moves the UGV along the least expected cost route
+    """
+
+    name = "advised"
+
+    def __init__(self, fusion: FusionModel = None, depth: int = 1):
+        """
+        Creates the AdvisedPolicy object
+
+        Params:
+            fusion (FusionModel): The model turning estimates into mine probabilities, the mission's default if not given
+            depth (int): The most queries the advisor looks ahead
+        """
+        super().__init__(False, 0.0, fusion)
+        self.depth = depth
+
+    def next_action(self, mission: Mission, rng: random.Random) -> tuple:
+        advice = QueryAdvisor(mission, self.depth).best()
+        if advice is not None:
+            return advice.action
+        return super().next_action(mission, rng)
+
+
+POLICIES = {
+    RandomWalkPolicy.name: RandomWalkPolicy,
+    ShortestPathPolicy.name: ShortestPathPolicy,
+    PlannedRoutePolicy.name: PlannedRoutePolicy,
+    AdvisedPolicy.name: AdvisedPolicy,
+}
+
+
+def fewest_hop_route(mission: Mission, start: str, end: str) -> list[str]:
+    """
+    Finds the route between two hexes with the fewest moves, ignoring costs
+
+    Params:
+        mission (Mission): The mission to route across
+        start (str): The label of the first hex
+        end (str): The label of the last hex
+
+    Returns:
+        list[str] - The labels along the route including start and end, or an empty list if unreachable
+    """
+
+    hexagons = {hex.label: hex for hex in mission.hexagons}
+    previous = {start: None}
+    frontier = deque([start])
+    while frontier:
+        label = frontier.popleft()
+        if label == end:
+            route = []
+            while label is not None:
+                route.append(label)
+                label = previous[label]
+            return route[::-1]
+        for neighbor in mission.adjacent_hexagons(hexagons[label]):
+            if neighbor.label not in previous:
+                previous[neighbor.label] = label
+                frontier.append(neighbor.label)
+    return []
+
+
+def run_episode(scenario: str, policy: Policy, seed: int, max_steps: int = 1000, metrics: MissionMetrics = None) -> EpisodeResult:
+    """
+    Plays a single headless episode of a scenario
+
+    Params:
+        scenario (str): The scenario JSON file within the config directory
+        policy (Policy): The policy choosing the actions
+        seed (int): The seed for the episode's random generator
+        max_steps (int): The number of actions after which the episode is abandoned
+        metrics (MissionMetrics): The metrics to record the mission's operations to, None to leave it uninstrumented
+
+    Returns:
+        EpisodeResult - The cost, number of actions and mines hit during the episode
+    """
+
+    mission = Mission(scenario, log_to_file=False)
+    if metrics is not None:
+        mission.metrics = metrics
+    rng = random.Random(seed)
+    policy.reset(mission, rng)
+    steps = 0
+    mines_hit = 0
+    while steps < max_steps and not mission.complete:
+        action = policy.next_action(mission, rng)
+        if action is None:
+            break
+        steps += 1
+        if action[0] == "move_ugv":
+            if mission.move_ugv(*action[1:]) == 0:
+                mines_hit += 1
+        elif action[0] == "move_uav":
+            mission.move_uav(mission.uavs[action[1] - 1], action[2])
+        elif action[0] == "query_ai":
+            mission.get_chosen_hex(action[1])
+            mission.query_ai(action[2])
+        elif action[0] == "query_human":
+            mission.get_chosen_hex(action[1])
+            mission.query_human()
+        else:
+            raise ValueError("Unknown action %s" % (action[0],))
+    return EpisodeResult(scenario, policy.name, seed, mission.total, steps, mines_hit, mission.complete)
+
+
+def _run_chunk(scenario: str, policy: Policy, seeds: range, max_steps: int, metrics: MissionMetrics = None, profile_dir: str = None) -> tuple[list[EpisodeResult], MissionMetrics]:
+    """
+    Plays a chunk of episodes within a worker process
+
+    Params:
+        scenario (str): The scenario JSON file within the config directory
+        policy (Policy): The policy choosing the actions
+        seeds (range): The seeds of the episodes in this chunk
+        max_steps (int): The number of actions after which an episode is abandoned
+        metrics (MissionMetrics): The metrics to record the episodes' operations to, None to leave them uninstrumented
+        profile_dir (str): The directory to write this process's cProfile stats to, None to not profile
+
+    Returns:
+        tuple[list[EpisodeResult], MissionMetrics] - The results of the episodes in seed order, and the metrics
+    """
+
+    with profiled(profile_dir):
+        return [run_episode(scenario, policy, seed, max_steps, metrics) for seed in seeds], metrics
+
+
+def run_batch(scenarios: list[str], policy: Policy, episodes: int, seed: int = 0, max_steps: int = 1000, workers: int = None,
+              metrics: MissionMetrics = None, profile_dir: str = None) -> list[EpisodeResult]:
+    """
+    Plays many episodes of each scenario across a pool of worker processes
+
+    Episodes are handed out in chunks so each task amortizes the cost of shipping the policy to the
+    worker, and the chunks are sized to give every worker several so the pool stays balanced.
+
+    Params:
+        scenarios (list[str]): The scenario JSON files within the config directory
+        policy (Policy): The policy choosing the actions
+        episodes (int): The number of episodes to play per scenario
+        seed (int): The seed of the first episode, later episodes use consecutive seeds
+        max_steps (int): The number of actions after which an episode is abandoned
+        workers (int): The number of worker processes, defaults to the number of CPUs; 1 runs in process
+        metrics (MissionMetrics): The metrics to aggregate every episode's operations into, None to leave them uninstrumented
+        profile_dir (str): The directory each process writes its aggregated cProfile stats to after clearing earlier runs' stats, None to not profile
+
+    Returns:
+        list[EpisodeResult] - The results ordered by scenario then seed
+    """
+
+    if profile_dir is not None:
+        clear_profiles(profile_dir)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [result for scenario in scenarios for result in _run_chunk(scenario, policy, range(seed, seed + episodes), max_steps, metrics, profile_dir)[0]]
+
+    chunk_size = max(1, episodes // (workers * 4))
+    tasks = [(scenario, range(first, min(first + chunk_size, seed + episodes)))
+             for scenario in scenarios
+             for first in range(seed, seed + episodes, chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Each chunk fills metrics of its own in the worker, merged here as the chunks finish
+        futures = [executor.submit(_run_chunk, scenario, policy, seeds, max_steps, metrics.empty() if metrics is not None else None, profile_dir)
+                   for scenario, seeds in tasks]
+        results = []
+        for future in futures:
+            chunk, chunk_metrics = future.result()
+            results.extend(chunk)
+            if metrics is not None:
+                metrics.merge(chunk_metrics)
+        return results
+
+
+def summarize(results: list[EpisodeResult]) -> dict:
+    """
+    Aggregates episode results per scenario and policy
+
+    Params:
+        results (list[EpisodeResult]): The episode results
+
+    Returns:
+        dict - Summary statistics keyed by (scenario, policy)
+    """
+
+    groups = {}
+    for result in results:
+        groups.setdefault((result.scenario, result.policy), []).append(result)
+    summary = {}
+    for key, group in groups.items():
+        totals = [result.total for result in group]
+        summary[key] = {
+            "episodes": len(group),
+            "mean_total": statistics.fmean(totals),
+            "stdev_total": statistics.pstdev(totals),
+            "mean_steps": statistics.fmean(result.steps for result in group),
+            "mean_mines_hit": statistics.fmean(result.mines_hit for result in group),
+            "success_rate": sum(result.success for result in group) / len(group),
+        }
+    return summary
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Play headless Monte Carlo episodes of mission scenarios")
+    parser.add_argument("scenarios", nargs="+", help="scenario JSON files, within the config directory if bare names")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default=ShortestPathPolicy.name)
+    parser.add_argument("--episodes", type=int, default=1000, help="episodes per scenario")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-steps", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to the number of CPUs")
+    parser.add_argument("--calibrate", action="store_true", help="fit the planned or advised policy's fusion model to the scenarios' mines")
+    parser.add_argument("--metrics", metavar="FILE", help="record call counts, latencies and costs of mission operations to a .json or Prometheus text file")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, help="seconds between rewrites of the metrics file")
+    parser.add_argument("--profile", metavar="DIR", help="profile every worker process with cProfile, writing one stats file per worker to DIR")
+    args = parser.parse_args(argv)
+
+    policy = POLICIES[args.policy]()
+    if args.calibrate:
+        policy.fusion = FusionModel.fit_files([config_path(scenario) for scenario in args.scenarios])
+    metrics = MissionMetrics() if args.metrics else None
+    exporter = MetricsExporter(metrics, args.metrics, args.metrics_interval) if args.metrics else None
+    try:
+        results = run_batch(args.scenarios, policy, args.episodes, args.seed, args.max_steps, args.workers, metrics, args.profile)
+    finally:
+        if exporter is not None:
+            exporter.close()
+    for (scenario, policy), stats in summarize(results).items():
+        print("%s [%s]: %d episodes, mean total %.1f (sd %.1f), mean steps %.1f, mean mines hit %.2f, success rate %.1f%%" % (
+            scenario, policy, stats["episodes"], stats["mean_total"], stats["stdev_total"], stats["mean_steps"],
+            stats["mean_mines_hit"], stats["success_rate"] * 100))
+    if args.profile:
+        stats = load_profiles(args.profile)
+        if stats is None:
+            print("No profiles were written to %s" % args.profile)
+        else:
+            stats.sort_stats("cumulative").print_stats(20)
+
+
+if __name__ == "__main__":
+    main()
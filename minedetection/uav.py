@@ -6,3 +6,5 @@ class UAV:
     uav_number: int
     uav_location: str
     uav_traversal_time: str
+    # The AI scan its estimates come from, 0 for the AI Confidence and 1 for the AI Second Scan Confidence
+    ai_scan: int = 0
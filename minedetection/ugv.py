@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class UGV:
+    ugv_number: int
+    ugv_location: str
+    ugv_traversal_time: str
+    ugv_clear_time: str